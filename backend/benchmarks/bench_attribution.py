@@ -0,0 +1,56 @@
+"""
+Latency and accuracy of the /shap-summary attribution methods: exact
+GradientExplainer versus integrated gradients (several step counts) and
+segment occlusion, per model, on windows from the seeded SHAP background.
+
+Run from the backend directory:
+    python -m benchmarks.bench_attribution [--models lstm,cnn_lstm,transformer] [--windows 5]
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from ml.backgrounds import load_background
+from ml.shap_worker import compute_attribution
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'ml' / 'models'
+CONFIGS = [
+    ("exact", {}),
+    ("ig", {"steps": 8}),
+    ("ig", {"steps": 32}),
+    ("ig", {"steps": 128}),
+    ("segment", {"segments": 4, "refine": 1}),
+    ("segment", {"segments": 8, "refine": 2}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", default="lstm,cnn_lstm,transformer")
+    parser.add_argument("--windows", type=int, default=5)
+    parser.add_argument("--length", type=int, default=24)
+    args = parser.parse_args()
+
+    print(f"{'model':>12} {'method':>24} {'ms':>8} {'exact ms':>9} {'rel L1':>8} {'rank corr':>10}")
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        path = str(MODEL_DIR / f"{name}_model.h5")
+        windows = load_background(MODEL_DIR, name, args.length)[-args.windows:]
+        # Warm up: explainer construction and tracing are not part of the steady state
+        compute_attribution(name, path, "none", windows[:1, :, None], method="exact")
+        for method, params in CONFIGS:
+            rows = [compute_attribution(name, path, "none", w.reshape(1, -1, 1), method=method,
+                                        compare=method != "exact", **params) for w in windows]
+            label = method + "".join(f" {k}={v}" for k, v in params.items())
+            ms = np.median([r["latency_ms"] for r in rows])
+            if method == "exact":
+                print(f"{name:>12} {label:>24} {ms:>8.1f} {'':>9} {'':>8} {'':>10}")
+                continue
+            exact_ms = np.median([r["exact_latency_ms"] for r in rows])
+            rel_l1 = np.median([r["divergence"]["relative_l1"] for r in rows])
+            rank = np.median([r["divergence"]["rank_correlation"] for r in rows])
+            print(f"{name:>12} {label:>24} {ms:>8.1f} {exact_ms:>9.1f} {rel_l1:>8.3f} {rank:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Request body formats for /predict and /forecast: payload size and server-side
+parse time of a float32 series sent as JSON, CSV, raw float32, .npy, Arrow
+IPC and Parquet, decoded the way the handlers do (json.loads + np.array for
+JSON, parse_csv_stream for CSV uploads, parse_binary for the rest). Also
+reports whether the decoded array shares memory with the request body, i.e.
+was decoded without a copy.
+
+Run from the backend directory:
+    python -m benchmarks.bench_binary [--lengths 24,1000,100000] [--repeat 20]
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+
+from ml.parsing import parse_binary, parse_csv_stream
+
+
+def encode(kind, values):
+    if kind == "json":
+        return json.dumps({"data": values.tolist()}).encode()
+    if kind == "csv":
+        return ("value\n" + "\n".join(f"{v:.7g}" for v in values)).encode()
+    if kind == "raw":
+        return values.astype("<f4").tobytes()
+    if kind == "npy":
+        buf = io.BytesIO()
+        np.save(buf, values)
+        return buf.getvalue()
+    import pyarrow as pa
+    table = pa.table({"value": values})
+    if kind == "arrow":
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    import pyarrow.parquet as pq
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+MEDIA_TYPES = {
+    "raw": "application/octet-stream",
+    "npy": "application/x-npy",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def decode(kind, body):
+    if kind == "json":
+        return np.array(json.loads(body)["data"], dtype=np.float32).reshape(-1, 1)
+    if kind == "csv":
+        return parse_csv_stream(io.BytesIO(body))
+    return parse_binary(body, MEDIA_TYPES[kind])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", default="24,1000,100000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    kinds = ["raw", "npy", "json", "csv"]
+    try:
+        import pyarrow  # noqa: F401
+        kinds += ["arrow", "parquet"]
+    except ImportError:
+        print("pyarrow not installed: skipping Arrow and Parquet")
+
+    print(f"{'length':>8} {'format':>8} {'bytes':>10} {'parse us':>10} {'x raw':>7} {'zero-copy':>10} {'max |diff|':>11}")
+    for n in [int(x) for x in args.lengths.split(",")]:
+        values = (np.random.default_rng(0).random(n) * 100).astype(np.float32)
+        timings = {}
+        for kind in kinds:
+            body = encode(kind, values)
+            out = decode(kind, body)
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                decode(kind, body)
+                best = min(best, time.perf_counter() - t0)
+            timings[kind] = best
+            shared = isinstance(out, np.ndarray) and np.shares_memory(out, np.frombuffer(body, dtype=np.uint8))
+            diff = float(np.abs(np.asarray(out, dtype=np.float32).reshape(-1) - values).max())
+            ratio = best / timings["raw"]
+            print(f"{n:>8} {kind:>8} {len(body):>10} {best * 1e6:>10.1f} {ratio:>6.1f}x "
+                  f"{'yes' if shared else 'no':>10} {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
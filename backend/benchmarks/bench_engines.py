@@ -0,0 +1,81 @@
+"""
+Single-window inference latency (p50/p99) and RSS per inference engine:
+Keras `predict`, the compiled Keras step function and each exported TFLite
+variant that exists under ml/models (see `python -m ml.export`). Every
+(model, engine) pair runs in a fresh interpreter so RSS is comparable.
+
+Run from the backend directory:
+    python -m benchmarks.bench_engines [--models lstm,cnn_lstm,transformer] [--calls 500]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BACKEND_DIR / 'ml' / 'models'
+ENGINES = ["keras-predict", "keras", "tflite", "tflite-float16", "tflite-int8"]
+
+
+def run_worker(model_name, engine, calls):
+    import psutil
+    from ml.engines import load_engine
+    from ml.forecasting import predict_batch, window_length
+
+    model = load_engine("keras" if engine == "keras-predict" else engine, MODEL_DIR, model_name,
+                        f"{model_name}_model.h5")
+    x = np.random.default_rng(0).random((1, window_length(model) or 24, 1), dtype=np.float32)
+    if engine == "keras-predict":
+        call = lambda: model.predict(x, verbose=0)
+    else:
+        call = lambda: predict_batch(model, x)
+    for _ in range(10):
+        call()
+    latencies = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    lat = np.array(latencies) * 1e3
+    print(json.dumps({
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "rss_mb": psutil.Process(os.getpid()).memory_info().rss / 2**20,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", default="lstm,cnn_lstm,transformer")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--worker", nargs=2, metavar=("MODEL", "ENGINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args.worker[0], args.worker[1], args.calls)
+        return
+
+    from ml.engines import tflite_path
+    print(f"{'model':>12} {'engine':>15} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        for engine in ENGINES:
+            if engine.startswith("tflite") and not tflite_path(MODEL_DIR, name, engine.partition("-")[2]).exists():
+                continue
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_engines", "--worker", name, engine,
+                 "--calls", str(args.calls)],
+                cwd=BACKEND_DIR, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{name:>12} {engine:>15}  failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{name:>12} {engine:>15} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
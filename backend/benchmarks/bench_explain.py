@@ -0,0 +1,85 @@
+"""
+Time-to-first-token and total latency of /explain, non-streaming versus
+streaming, cold versus cached, against the fake Ollama server. Starts the
+fake server and the backend (uvicorn) as subprocesses; needs no network.
+
+Run from the backend directory:
+    python -m benchmarks.bench_explain [--requests 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FAKE_PORT = 11500
+API_PORT = 8765
+
+
+def wait_until_up(url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def timed_explain(client, question, stream):
+    body = {"question": question, "shap_values": {"Timestep t0": 0.12, "Timestep t1": -0.03}, "stream": stream}
+    t0 = time.perf_counter()
+    first = None
+    if stream:
+        with client.stream("POST", "/explain", json=body) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if first is None and line.strip() and "token" in json.loads(line):
+                    first = time.perf_counter() - t0
+    else:
+        client.post("/explain", json=body).raise_for_status()
+        first = time.perf_counter() - t0
+    return first, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {**os.environ, "OLLAMA_HOST": f"http://127.0.0.1:{FAKE_PORT}"}
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(FAKE_PORT)], cwd=BACKEND_DIR),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(API_PORT), "--log-level", "warning"],
+                         cwd=BACKEND_DIR, env=env),
+    ]
+    try:
+        wait_until_up(f"http://127.0.0.1:{FAKE_PORT}/")
+        wait_until_up(f"http://127.0.0.1:{API_PORT}/health")
+        with httpx.Client(base_url=f"http://127.0.0.1:{API_PORT}", timeout=60) as client:
+            print(f"{'mode':>18} {'TTFT ms':>9} {'total ms':>9}")
+            for label, stream, cached in [("blocking, cold", False, False), ("streaming, cold", True, False),
+                                          ("blocking, cached", False, True), ("streaming, cached", True, True)]:
+                firsts, totals = [], []
+                for i in range(args.requests):
+                    # Cold runs use a fresh question each time; cached runs repeat one
+                    question = "Why is the forecast high?" if cached else f"Why is the forecast high ({label} {i})?"
+                    first, total = timed_explain(client, question, stream)
+                    firsts.append(first)
+                    totals.append(total)
+                print(f"{label:>18} {sorted(firsts)[len(firsts) // 2] * 1e3:>9.1f} "
+                      f"{sorted(totals)[len(totals) // 2] * 1e3:>9.1f}")
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
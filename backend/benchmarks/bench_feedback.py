@@ -0,0 +1,94 @@
+"""
+Feedback write throughput: the batched FeedbackStore versus one SQLite commit
+per submission (what a naive synchronous store would do), plus the cost of a
+paginated query by model. Optionally also drives POST /feedback on a running
+server with concurrent clients.
+
+Run from the backend directory:
+    python -m benchmarks.bench_feedback [--records 50000] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from ml.feedback import FeedbackStore
+
+MODELS = ["lstm", "cnn_lstm", "transformer"]
+
+
+def bench_store(path, records):
+    store = FeedbackStore(path)
+    t0 = time.perf_counter()
+    for i in range(records):
+        store.submit(MODELS[i % len(MODELS)], f"feedback {i}")
+    submitted = time.perf_counter() - t0
+    store.flush()
+    durable = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pages, cursor = 0, None
+    while True:
+        _, cursor = store.query(model="lstm", limit=500, cursor=cursor)
+        pages += 1
+        if cursor is None:
+            break
+    query_ms = (time.perf_counter() - t0) * 1000.0 / pages
+    batches = store.metrics()["batches"]
+    store.close()
+    return records / submitted, records / durable, batches, query_ms
+
+
+def bench_per_row(path, records):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE feedback (id INTEGER PRIMARY KEY, model TEXT, feedback TEXT, created REAL)")
+    t0 = time.perf_counter()
+    for i in range(records):
+        conn.execute("INSERT INTO feedback (model, feedback, created) VALUES (?, ?, ?)",
+                     (MODELS[i % len(MODELS)], f"feedback {i}", time.time()))
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return records / elapsed
+
+
+async def bench_http(url, records, clients):
+    import httpx
+    remaining = [records]
+
+    async def worker(client):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            resp = await client.post(f"{url}/feedback", json={"model": "lstm", "feedback": "benchmark"})
+            resp.raise_for_status()
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=clients), timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        return records / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--url", help="also load-test POST /feedback on this server")
+    parser.add_argument("--clients", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        per_row = bench_per_row(os.path.join(tmp, "per_row.db"), min(args.records, 5000))
+        submit_rate, durable_rate, batches, query_ms = bench_store(os.path.join(tmp, "feedback.db"), args.records)
+    print(f"{'store':>22} {'records/s':>12}")
+    print(f"{'commit per record':>22} {per_row:>12.0f}")
+    print(f"{'batched (submit)':>22} {submit_rate:>12.0f}")
+    print(f"{'batched (on disk)':>22} {durable_rate:>12.0f}   ({batches} transactions)")
+    print(f"query by model: {query_ms:.2f} ms per 500-record page")
+    if args.url:
+        rate = asyncio.run(bench_http(args.url, min(args.records, 20000), args.clients))
+        print(f"POST /feedback with {args.clients} clients: {rate:.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Latency of the /forecast rollout against horizon: the original per-step
+`model.predict` + `np.vstack` loop versus ml.forecasting.rollout.
+
+Run from the backend directory:
+    python -m benchmarks.bench_forecast [--model lstm] [--repeat 3]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from tensorflow import keras
+
+from ml.forecasting import rollout, window_length
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'ml' / 'models'
+HORIZONS = [1, 12, 24, 48, 96]
+
+
+def legacy_forecast(model, arr, horizon):
+    """The loop /forecast used before the rollout engine, kept for comparison."""
+    predictions = []
+    for _ in range(horizon):
+        arr_input = arr.reshape(1, arr.shape[0], arr.shape[1])
+        y_pred = model.predict(arr_input, verbose=0)
+        y_val = float(y_pred.flatten()[0])
+        predictions.append(y_val)
+        arr = np.vstack([arr[1:], np.array([[y_val]], dtype=float)])
+    return np.array(predictions)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="lstm")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = keras.models.load_model(str(MODEL_DIR / f"{args.model}_model.h5"), compile=False)
+    L = window_length(model) or 24
+    window = np.random.default_rng(0).random((L, 1))
+
+    # Warm up both paths so tracing is not counted
+    legacy_forecast(model, window, 1)
+    rollout(model, window.reshape(-1), 1)
+
+    print(f"model={args.model} window={L}")
+    print(f"{'horizon':>8} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8} {'max |diff|':>11}")
+    for h in HORIZONS:
+        expected = legacy_forecast(model, window, h)
+        got, _ = rollout(model, window.reshape(-1), h)
+        diff = float(np.max(np.abs(expected - got[0]))) if h else 0.0
+        t_legacy = best_of(lambda: legacy_forecast(model, window, h), args.repeat)
+        t_engine = best_of(lambda: rollout(model, window.reshape(-1), h), args.repeat)
+        print(f"{h:>8} {t_legacy * 1e3:>10.1f} {t_engine * 1e3:>10.1f} "
+              f"{t_legacy / t_engine:>7.1f}x {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
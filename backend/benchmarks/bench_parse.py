@@ -0,0 +1,95 @@
+"""
+CSV ingestion: the original read-everything `parse_input` loop versus the
+streaming parser in ml/parsing.py, on a generated smart-meter style file
+(date,value rows). Reports wall time and peak Python heap (tracemalloc).
+
+Run from the backend directory:
+    python -m benchmarks.bench_parse [--size-mb 100] [--window 24]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from ml.parsing import parse_csv_stream
+
+
+def legacy_parse(fileobj):
+    """The CSV branch of parse_input before streaming, kept for comparison."""
+    values = []
+    content_str = fileobj.read().decode('utf-8', errors='ignore')
+    for line in content_str.splitlines():
+        if not line.strip():
+            continue
+        parts = line.strip().split(',')
+        try:
+            row_vals = [float(x) for x in parts]
+        except ValueError:
+            parts_without_first = parts[1:]
+            if not parts_without_first:
+                continue
+            try:
+                row_vals = [float(x) for x in parts_without_first]
+            except ValueError:
+                continue
+        values.append(row_vals[-1] if len(row_vals) > 1 else row_vals[0])
+    return np.array(values, dtype=float).reshape(-1, 1)
+
+
+def write_csv(path, size_mb):
+    rng = np.random.default_rng(0)
+    target = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        f.write("timestamp,consumption_kwh\n")
+        t = np.datetime64("2015-01-01T00:00")
+        while f.tell() < target:
+            block = rng.random(100_000) * 5
+            stamps = t + np.arange(block.size) * np.timedelta64(15, "m")
+            f.write("".join(f"{s},{v:.4f}\n" for s, v in zip(stamps.astype(str), block)))
+            t = stamps[-1] + np.timedelta64(15, "m")
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--window", type=int, default=24)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_csv(path, args.size_mb)
+        print(f"file: {os.path.getsize(path) / 2**20:.1f} MB")
+        print(f"{'parser':>22} {'seconds':>8} {'peak MB':>8} {'rows kept':>10}")
+        runs = [
+            ("legacy", lambda f: legacy_parse(f)),
+            ("stream (full)", lambda f: parse_csv_stream(f)),
+            (f"stream (last {args.window})", lambda f: parse_csv_stream(f, keep_last=args.window)),
+        ]
+        results = {}
+        for name, fn in runs:
+            with open(path, "rb") as f:
+                arr, elapsed, peak = measure(lambda: fn(f))
+            results[name] = arr
+            print(f"{name:>22} {elapsed:>8.2f} {peak:>8.1f} {arr.shape[0]:>10}")
+        tail = results["legacy"][-args.window:]
+        assert np.allclose(results[f"stream (last {args.window})"], tail, atol=1e-4)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
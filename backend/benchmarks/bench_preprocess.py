@@ -0,0 +1,102 @@
+"""
+Request preprocessing: the original per-handler sequence (trim, scaler.transform,
+apply_transform, reshape, astype) versus a compiled PreprocessPlan, per
+transform. Reports time per call, peak bytes allocated per call (traced with
+tracemalloc), whether the plan reuses its buffer across calls, and the largest
+difference between the two paths and the error of plan.inverse.
+
+Run from the backend directory:
+    python -m benchmarks.bench_preprocess [--length 24] [--history 500] [--calls 20000]
+"""
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from ml.preprocessing import PreprocessPlan
+from ml.transforms import apply_transform
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'ml' / 'models'
+TRANSFORMS = [None, "dct", "dwt", "cs"]
+
+
+class WindowShape:
+    """Stands in for a loaded model: the plan only reads input_shape."""
+
+    def __init__(self, length):
+        self.input_shape = (None, length, 1)
+
+
+def legacy(arr, length, scaler, transform):
+    arr = arr[-length:]
+    arr = scaler.transform(arr)
+    if transform:
+        arr = apply_transform(transform, arr.reshape(1, -1)).reshape(-1, 1)
+    return arr.reshape(1, arr.shape[0], 1).astype(np.float32)
+
+
+def fused(plan, arr):
+    with plan.window(arr) as x:
+        return float(x[0, 0, 0])
+
+
+def per_call(fn, calls):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def peak_bytes(fn, calls=200):
+    """Most memory allocated at once during a call, temporaries included (tracemalloc)."""
+    fn()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--length", type=int, default=24)
+    parser.add_argument("--history", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    scaler = joblib.load(str(MODEL_DIR / 'scaler.save'))
+    rng = np.random.default_rng(0)
+    arr = (rng.random((args.history, 1)) * 100).astype(np.float32)  # what parse_input returns
+    model = WindowShape(args.length)
+
+    print(f"{'transform':>9} {'legacy us':>10} {'plan us':>8} {'legacy peak B':>14} {'plan peak B':>12} "
+          f"{'reuses buf':>11} {'max |diff|':>11} {'inverse err':>12}")
+    for transform in TRANSFORMS:
+        plan = PreprocessPlan(model, transform, scaler)
+        with plan.window(arr) as x:
+            first = x.__array_interface__["data"][0]
+            fused_out = x.copy()
+        with plan.window(arr) as x:
+            reused = x.__array_interface__["data"][0] == first
+        legacy_out = legacy(arr, args.length, scaler, transform)
+        diff = float(np.abs(legacy_out - fused_out).max())
+        scaled = scaler.transform(arr[-args.length:]).reshape(-1)
+        inverse_err = float(np.abs(plan.inverse(scaled) - arr[-args.length:, 0]).max())
+
+        legacy_us = per_call(lambda: legacy(arr, args.length, scaler, transform), args.calls)
+        plan_us = per_call(lambda: fused(plan, arr), args.calls)
+        legacy_peak = peak_bytes(lambda: legacy(arr, args.length, scaler, transform))
+        plan_peak = peak_bytes(lambda: fused(plan, arr))
+        print(f"{transform or 'none':>9} {legacy_us:>10.1f} {plan_us:>8.1f} {legacy_peak:>14} {plan_peak:>12} "
+              f"{'yes' if reused else 'no':>11} {diff:>11.2e} {inverse_err:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
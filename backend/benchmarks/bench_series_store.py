@@ -0,0 +1,92 @@
+"""
+Series store: the per-request cost of getting a model window by series ID
+(memory-mapped lookup, latest and at a random as_of) against re-uploading
+and parsing the history as CSV, plus the cost of writes: in-order appends,
+out-of-order appends to the pending log, and compaction.
+
+Works in a temporary directory.
+
+Run from the backend directory:
+    python -m benchmarks.bench_series_store [--rows 1000000] [--window 24] [--lookups 20000]
+"""
+import argparse
+import io
+import tempfile
+import time
+
+import numpy as np
+
+from ml.parsing import parse_csv_stream
+from ml.series_store import SeriesStore
+
+
+def per_call(fn, calls):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--window", type=int, default=24)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=96, help="rows per append (a day of 15-minute readings)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    start = 1_700_000_000_000
+    times = start + np.arange(args.rows, dtype=np.int64) * 900_000  # 15-minute readings, unix ms
+    values = (rng.random(args.rows) * 100).astype(np.float32)
+    csv = ("timestamp,value\n" + "\n".join(f"{t // 1000},{v:.4f}" for t, v in zip(times, values))).encode()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SeriesStore(root, compact_interval=0)
+        t0 = time.perf_counter()
+        store.append("meter", times, values)
+        ingest_s = time.perf_counter() - t0
+
+        as_of = rng.integers(times[args.window], times[-1], size=args.lookups)
+        it = iter(as_of.tolist() * 2)
+        latest_us = per_call(lambda: store.window("meter", args.window), args.lookups)
+        as_of_us = per_call(lambda: store.window("meter", args.window, as_of=next(it)), args.lookups)
+        csv_calls = max(1, min(20, args.lookups))
+        csv_us = per_call(lambda: parse_csv_stream(io.BytesIO(csv), keep_last=args.window), csv_calls)
+        window, _ = store.window("meter", args.window)
+        zero_copy = isinstance(window.base, np.memmap) or isinstance(window, np.memmap)
+
+        print(f"rows={args.rows} window={args.window} csv={len(csv) / 2**20:.1f} MB ingest={ingest_s * 1e3:.1f} ms")
+        print(f"{'window source':>22} {'us/request':>11}")
+        print(f"{'store, latest':>22} {latest_us:>11.1f}")
+        print(f"{'store, as_of':>22} {as_of_us:>11.1f}")
+        print(f"{'CSV upload + parse':>22} {csv_us:>11.1f}")
+        print(f"window is a view of the memory map: {'yes' if zero_copy else 'no'}")
+
+        end = int(times[-1])
+        batches = 1000
+        t0 = time.perf_counter()
+        for i in range(batches):
+            t = end + (i * args.batch + 1 + np.arange(args.batch, dtype=np.int64)) * 900_000
+            store.append("meter", t, values[:args.batch])
+        in_order_us = (time.perf_counter() - t0) / batches * 1e6
+
+        t0 = time.perf_counter()
+        for i in range(batches):
+            t = times[rng.integers(0, args.rows - args.batch)] + np.arange(args.batch, dtype=np.int64) * 900_000
+            store.append("meter", t, values[:args.batch])
+        late_us = (time.perf_counter() - t0) / batches * 1e6
+        pending = store.info("meter")["pending"]
+        t0 = time.perf_counter()
+        merged = store.compact("meter")
+        compact_ms = (time.perf_counter() - t0) * 1e3
+
+        print(f"{'write':>22} {'us/append':>11}")
+        print(f"{'in order':>22} {in_order_us:>11.1f}")
+        print(f"{'out of order (pending)':>22} {late_us:>11.1f}")
+        print(f"compaction of {merged} pending rows (pending before: {pending}): {compact_ms:.1f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Cold-start cost of the backend: time to import `main` and resident memory
+afterwards, with lazy loading versus PRELOAD_MODELS=all, plus the latency
+of the first forecast call in each case. Each scenario runs in a fresh
+interpreter.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import asyncio, json, os, time
+import psutil
+t0 = time.perf_counter()
+import main
+if main.PRELOAD_MODELS:
+    main.models.preload(main.PRELOAD_MODELS)
+import_s = time.perf_counter() - t0
+rss_mb = psutil.Process(os.getpid()).memory_info().rss / 2**20
+t1 = time.perf_counter()
+model = main.models["lstm"]
+from ml.forecasting import rollout
+import numpy as np
+rollout(model, np.zeros(24, dtype=np.float32), 10)
+first_s = time.perf_counter() - t1
+print(json.dumps({"startup_s": import_s, "rss_mb": rss_mb, "first_forecast_s": first_s,
+                  "rss_after_first_mb": psutil.Process(os.getpid()).memory_info().rss / 2**20}))
+"""
+
+SCENARIOS = {
+    "lazy": {"PRELOAD_MODELS": ""},
+    "preload all": {"PRELOAD_MODELS": "all"},
+}
+
+
+def main():
+    print(f"{'scenario':>12} {'startup s':>10} {'RSS MB':>8} {'1st forecast s':>15} {'RSS after MB':>13}")
+    for name, env in SCENARIOS.items():
+        proc = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env={**os.environ, **env},
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:>12} {r['startup_s']:>10.2f} {r['rss_mb']:>8.1f} "
+              f"{r['first_forecast_s']:>15.3f} {r['rss_after_first_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Microbenchmark of the batch transform kernels in ml/transforms.py against the
+original per-row list-comprehension implementations, for N = 1..10k windows.
+
+Run from the backend directory:
+    python -m benchmarks.bench_transforms [--length 24] [--repeat 5]
+"""
+import argparse
+import time
+
+import numpy as np
+import pywt
+from scipy.fftpack import dct
+
+from ml.transforms import TRANSFORMS
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+
+def legacy_dct(data):
+    return dct(data, norm='ortho', axis=1)
+
+
+def legacy_dwt(data):
+    coeffs = [pywt.dwt(row, 'haar')[0] for row in data]
+    padded = [np.pad(c, (0, data.shape[1] - len(c))) for c in coeffs]
+    return np.array(padded)
+
+
+def legacy_cs(data):
+    compressed = [row[::2] for row in data]
+    padded = [np.pad(row, (0, data.shape[1] - len(row))) for row in compressed]
+    return np.array(padded)
+
+
+LEGACY = {'dct': legacy_dct, 'dwt': legacy_dwt, 'cs': legacy_cs}
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--length", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'transform':>9} {'N':>6} {'legacy us':>11} {'batch us':>10} {'out= us':>9} {'speedup':>8}")
+    for name, kernel in TRANSFORMS.items():
+        for n in BATCH_SIZES:
+            data = rng.random((n, args.length), dtype=np.float32)
+            out = np.empty_like(data)
+            expected = LEGACY[name](data)
+            if not np.allclose(kernel(data), expected, atol=1e-6):
+                raise AssertionError(f"{name} kernel disagrees with the legacy implementation at N={n}")
+            t_legacy = best_of(lambda: LEGACY[name](data), args.repeat)
+            t_batch = best_of(lambda: kernel(data), args.repeat)
+            t_out = best_of(lambda: kernel(data, out=out), args.repeat)
+            print(f"{name:>9} {n:>6} {t_legacy * 1e6:>11.1f} {t_batch * 1e6:>10.1f} "
+                  f"{t_out * 1e6:>9.1f} {t_legacy / t_out:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Latency of probabilistic /forecast sampling against the number of samples K
+and the horizon: K rollouts advanced together as one (K, L, 1) batch versus
+K separate single-series rollouts, next to the plain point rollout.
+
+Uses the model's saved backtest residuals when present, otherwise a seeded
+normal residual pool (the latency does not depend on the values).
+
+Run from the backend directory:
+    python -m benchmarks.bench_uncertainty [--model transformer] [--method auto] [--repeat 3]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from tensorflow import keras
+
+from ml.forecasting import rollout, window_length
+from ml.uncertainty import load_residuals, resolve_method, sample_rollouts
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'ml' / 'models'
+SAMPLES = [1, 10, 100, 1000]
+HORIZONS = [12, 24, 48]
+SEPARATE_MAX_K = 100  # K separate rollouts beyond this take too long to be worth timing
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="transformer")
+    parser.add_argument("--method", default="auto", choices=["auto", "dropout", "bootstrap"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = keras.models.load_model(str(MODEL_DIR / f"{args.model}_model.h5"), compile=False)
+    L = window_length(model) or 24
+    window = np.random.default_rng(0).random(L).astype(np.float32)
+    residuals = load_residuals(MODEL_DIR, args.model)
+    if residuals is None:
+        residuals = np.random.default_rng(0).normal(0, 0.02, 10000).astype(np.float32)
+    method = resolve_method(args.method, model, residuals)
+    seeded = method == "bootstrap"  # seeds are rejected for dropout sampling
+
+    def batched(k, h):
+        return sample_rollouts(model, window, h, k, method=method, residuals=residuals, seed=0 if seeded else None)
+
+    def separate(k, h):
+        return [sample_rollouts(model, window, h, 1, method=method, residuals=residuals, seed=i if seeded else None)
+                for i in range(k)]
+
+    # Warm up: tracing of both step functions is not part of the steady state
+    batched(2, 2)
+    rollout(model, window, 2)
+
+    print(f"model={args.model} method={method} window={L}")
+    print(f"{'horizon':>8} {'K':>6} {'point ms':>9} {'batched ms':>11} {'separate ms':>12} {'x point':>8}")
+    for h in HORIZONS:
+        t_point = best_of(lambda: rollout(model, window, h), args.repeat)
+        for k in SAMPLES:
+            t_batched = best_of(lambda: batched(k, h), args.repeat)
+            t_separate = best_of(lambda: separate(k, h), 1) if k <= SEPARATE_MAX_K else float("nan")
+            print(f"{h:>8} {k:>6} {t_point * 1e3:>9.1f} {t_batched * 1e3:>11.1f} "
+                  f"{t_separate * 1e3:>12.1f} {t_batched / t_point:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Memory and /predict throughput against uvicorn worker count, with every
+worker loading its own models versus all workers sharing one model server.
+
+Each configuration is launched with `python main.py --workers N`, warmed up,
+loaded with concurrent /predict clients, and measured for total RSS and PSS
+(proportional set size, which splits shared pages between processes) across
+the whole process tree.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--requests 2000] [--clients 32]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import psutil
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODELS = ["lstm", "cnn_lstm", "transformer"]
+
+
+def tree_memory(pid):
+    """Total RSS and PSS (MB) of a process and all its descendants."""
+    root = psutil.Process(pid)
+    rss = pss = 0
+    for proc in [root] + root.children(recursive=True):
+        try:
+            info = proc.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        rss += info.rss
+        pss += getattr(info, "pss", info.rss)
+    return rss / 2**20, pss / 2**20
+
+
+async def drive(url, requests, clients, window):
+    latencies = []
+    remaining = [requests]
+
+    async def worker(client):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            data = [random.random() for _ in range(window)]
+            t0 = time.perf_counter()
+            resp = await client.post(f"{url}/predict", json={"model": random.choice(MODELS), "data": data})
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=clients), timeout=120) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return requests / elapsed, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+def wait_ready(url, proc, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+def run_config(workers, shared, port, args):
+    cmd = [sys.executable, "main.py", "--workers", str(workers), "--port", str(port)]
+    if not shared:
+        cmd.append("--no-model-server")
+    # Result caching off, so every request reaches a model
+    env = {**os.environ, "RESULT_CACHE": "0", "PRELOAD_MODELS": "all"}
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, proc)
+        asyncio.run(drive(url, 20 * workers, workers, args.window))
+        rps, p50, p99 = asyncio.run(drive(url, args.requests, args.clients, args.window))
+        rss, pss = tree_memory(proc.pid)
+        return rps, p50, p99, rss, pss
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--window", type=int, default=24)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'models':>14} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>9} {'PSS MB':>9}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        for shared in ([False] if workers == 1 else [False, True]):
+            label = "model server" if shared else "per worker"
+            rps, p50, p99, rss, pss = run_config(workers, shared, args.port, args)
+            print(f"{workers:>8} {label:>14} {rps:>9.1f} {p50:>8.1f} {p99:>8.1f} {rss:>9.1f} {pss:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
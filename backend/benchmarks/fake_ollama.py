@@ -0,0 +1,60 @@
+"""
+Minimal stand-in for the Ollama HTTP API, for exercising /explain without a
+real LLM. Answers every /api/generate call with the same canned text, one
+word per token, with a configurable first-token and per-token delay.
+
+    python -m benchmarks.fake_ollama --port 11500 [--first-token-ms 200] [--token-ms 20]
+then start the backend with OLLAMA_HOST=http://127.0.0.1:11500.
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ANSWER = ("The most recent timesteps carry the largest SHAP contributions, so the forecast "
+          "mostly follows the latest consumption level, while older readings have little influence.")
+
+
+def create_app(first_token_ms=200.0, token_ms=20.0):
+    app = FastAPI()
+    tokens = [w + " " for w in ANSWER.split(" ")]
+    app.state.calls = 0
+
+    @app.get("/")
+    async def root():
+        return "Ollama is running"
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        if not body.get("stream", True):
+            await asyncio.sleep((first_token_ms + token_ms * len(tokens)) / 1000)
+            return {"model": body.get("model"), "response": ANSWER, "done": True}
+
+        async def lines():
+            await asyncio.sleep(first_token_ms / 1000)
+            for token in tokens:
+                yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+                await asyncio.sleep(token_ms / 1000)
+            yield json.dumps({"model": body.get("model"), "response": "", "done": True}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.first_token_ms, args.token_ms), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Concurrent load test for /predict against a running server.
+
+Start the server twice, once per mode, and compare the throughput:
+    PREDICT_BATCHING=0 uvicorn main:app --port 8000
+    PREDICT_BATCHING=1 uvicorn main:app --port 8000
+then, from the backend directory:
+    python -m benchmarks.load_predict --url http://127.0.0.1:8000 --model lstm
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+
+CONCURRENCY = [1, 8, 64]
+
+
+async def run_level(client, url, model, window, clients, total):
+    latencies = []
+    remaining = [total]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            data = [random.random() for _ in range(window)]
+            t0 = time.perf_counter()
+            resp = await client.post(f"{url}/predict", json={"model": model, "data": data})
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return total / elapsed, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--model", default="lstm")
+    parser.add_argument("--window", type=int, default=24)
+    parser.add_argument("--requests", type=int, default=512, help="requests per concurrency level")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=max(CONCURRENCY))
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        # Warm-up so model tracing is not counted
+        await run_level(client, args.url, args.model, args.window, 1, 4)
+        print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for clients in CONCURRENCY:
+            rps, p50, p99 = await run_level(client, args.url, args.model, args.window, clients, args.requests)
+            print(f"{clients:>8} {rps:>9.1f} {p50:>8.1f} {p99:>8.1f}")
+        health = (await client.get(f"{args.url}/health")).json()
+        print("batching:", health.get("predict_batching"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
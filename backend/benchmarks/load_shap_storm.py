@@ -0,0 +1,134 @@
+"""
+/predict latency during a /shap-summary storm, with admission control on
+and off.
+
+For each configuration a server is started (`python main.py`, /predict and
+/forecast result cache off), /predict is driven by a fixed number of clients on its own for
+`--seconds`, then again while `--storm` clients send /shap-summary requests
+back to back. Reports /predict p50/p99 and req/s for both phases and how the
+SHAP requests ended: served, served degraded, or shed with 429/503.
+
+Run from the backend directory:
+    python -m benchmarks.load_shap_storm [--seconds 20] [--clients 16] [--storm 64] [--method exact]
+With --url, drives an already running server once instead of starting two.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_workers import BACKEND_DIR, wait_ready
+
+MODELS = ["lstm", "cnn_lstm", "transformer"]
+
+
+async def predict_clients(client, url, clients, stop, window):
+    latencies, errors = [], collections.Counter()
+
+    async def worker():
+        while not stop.is_set():
+            data = [random.random() for _ in range(window)]
+            t0 = time.perf_counter()
+            resp = await client.post(f"{url}/predict", json={"model": random.choice(MODELS), "data": data})
+            if resp.status_code == 200:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors[resp.status_code] += 1
+
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, errors
+
+
+async def shap_clients(client, url, clients, stop, window, method):
+    outcomes = collections.Counter()
+
+    async def worker():
+        while not stop.is_set():
+            data = [random.random() for _ in range(window)]
+            body = {"model": random.choice(MODELS), "transform": "none", "data": data, "method": method}
+            try:
+                resp = await client.post(f"{url}/shap-summary", json=body)
+            except httpx.HTTPError:
+                outcomes["client error"] += 1
+                continue
+            if resp.status_code == 200:
+                outcomes["degraded" if resp.json().get("degraded") else "served"] += 1
+            else:
+                outcomes[resp.status_code] += 1
+                await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return outcomes
+
+
+async def phase(url, args, storm):
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.clients + args.storm)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        tasks = [asyncio.create_task(predict_clients(client, url, args.clients, stop, args.window))]
+        if storm:
+            tasks.append(asyncio.create_task(shap_clients(client, url, args.storm, stop, args.window, args.method)))
+        t0 = time.perf_counter()
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+    latencies, errors = results[0]
+    lat = np.array(latencies or [float("nan")]) * 1e3
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": float(np.percentile(lat, 50)),
+        "p99": float(np.percentile(lat, 99)),
+        "errors": dict(errors),
+        "shap": dict(results[1]) if storm else {},
+    }
+
+
+def report(label, url, args):
+    quiet = asyncio.run(phase(url, args, storm=False))
+    stormy = asyncio.run(phase(url, args, storm=True))
+    for name, r in (("alone", quiet), ("SHAP storm", stormy)):
+        print(f"{label:>10} {name:>11} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p99']:>8.1f} "
+              f"{sum(r['errors'].values()):>7}  {r['shap'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent /predict clients")
+    parser.add_argument("--storm", type=int, default=64, help="concurrent /shap-summary clients")
+    parser.add_argument("--method", default="exact", choices=["exact", "ig", "segment"])
+    parser.add_argument("--window", type=int, default=24)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--url", help="drive this running server instead of starting one per configuration")
+    args = parser.parse_args()
+
+    print(f"{'admission':>10} {'phase':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  /shap-summary outcomes")
+    if args.url:
+        report("external", args.url.rstrip("/"), args)
+        return
+    for admission in ("1", "0"):
+        env = {**os.environ, "ADMISSION": admission, "RESULT_CACHE": "0", "PRELOAD_MODELS": "all"}
+        cmd = [sys.executable, "main.py", "--port", str(args.port)]
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_ready(url, proc)
+            report("on" if admission == "1" else "off", url, args)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    main()
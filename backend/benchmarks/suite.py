@@ -0,0 +1,384 @@
+"""
+Benchmark suite for the backend hot paths, with results in one JSON file
+that later runs can be compared against.
+
+Two layers:
+  - micro: parse_input (JSON and CSV), binary parsing, each transform in
+    ml/transforms.py (one window and a batch), PreprocessPlan scaling and
+    inverse scaling, and per model a single-step inference and a 24-step
+    rollout, plus the attribution methods for one model.
+  - http: every endpoint driven in process through the ASGI app with
+    httpx.ASGITransport (no sockets), at a fixed concurrency, reporting
+    p50/p99 latency and req/s. --uvicorn repeats it against a real
+    `python main.py` server on localhost.
+
+Everything runs on the CPU (CUDA_VISIBLE_DEVICES=-1) without network
+access: the LLM behind /explain is benchmarks.fake_ollama, mounted in
+process, and stores, caches and profiles go to a temporary directory.
+Result caches are off so every request reaches the model.
+
+Run from the backend directory:
+    python -m benchmarks.suite run [--layers micro,http] [--out bench.json] [--filter predict] [--quick]
+    python -m benchmarks.suite compare baseline.json bench.json [--threshold 0.10]
+`compare` exits with status 1 when any benchmark got worse than baseline by
+more than the threshold (a fraction), so it can gate CI.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODELS = ["lstm", "cnn_lstm", "transformer"]
+TRANSFORMS = ["dct", "dwt", "cs"]
+WINDOW = 48  # values sent per request; the bundled models use the last 24
+
+
+def configure_env(tmp):
+    """Environment for an isolated, CPU-only, cache-free backend. Must run before main is imported."""
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    os.environ.update({
+        "RESULT_CACHE": "0",
+        "FEEDBACK_DB": str(Path(tmp) / "feedback.db"),
+        "SERIES_DIR": str(Path(tmp) / "series"),
+        "PROFILE_DIR": str(Path(tmp) / "profiles"),
+        "OLLAMA_HOST": "http://fake-ollama",
+    })
+
+
+def load_app():
+    """Import main with the LLM replaced by the in-process fake Ollama server."""
+    import httpx
+    import main
+    from benchmarks.fake_ollama import create_app
+    main.ollama._client = httpx.AsyncClient(
+        base_url="http://fake-ollama", transport=httpx.ASGITransport(app=create_app(first_token_ms=0, token_ms=0))
+    )
+    return main
+
+
+# Micro layer
+
+def measure(fn, min_time=0.2, repeat=5):
+    """
+    Time fn() in `repeat` rounds of a loop count calibrated so one round
+    takes about min_time / repeat. Returns per-call microseconds
+    (median, min, max) and the loop count.
+    """
+    fn()
+    loops, target = 1, min_time / repeat
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= target or loops >= 1 << 20:
+            break
+        loops = max(loops * 2, int(loops * target / max(elapsed, 1e-9)))
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - t0) / loops)
+    us = np.array(rounds) * 1e6
+    return {"median_us": float(np.median(us)), "min_us": float(us.min()), "max_us": float(us.max()), "loops": loops}
+
+
+def micro_cases(main, models):
+    """(name, fn) pairs for the micro layer."""
+    from ml.forecasting import predict_batch, rollout, window_length
+    from ml.parsing import parse_binary
+    from ml.shap_worker import compute_attribution
+    from ml.transforms import apply_transform
+
+    class Upload:
+        """Stands in for an UploadFile: parse_input reads .file."""
+
+        def __init__(self, body):
+            self.file = io.BytesIO(body)
+
+    rng = np.random.default_rng(0)
+    series = (rng.random(WINDOW) * 100).astype(np.float32)
+    history = (rng.random(100_000) * 100).astype(np.float32)
+    csv = ("timestamp,value\n" + "\n".join(f"{i},{v:.4f}" for i, v in enumerate(history))).encode()
+    raw = history.tobytes()
+
+    yield "parse.json_48", lambda: main.parse_input(data=series.tolist())
+    yield "parse.csv_100k", lambda: main.parse_input(file=Upload(csv))
+    yield "parse.csv_100k_keep_last", lambda: main.parse_input(file=Upload(csv), keep_last=24)
+    yield "parse.raw_f32_100k", lambda: parse_binary(raw, "application/octet-stream")
+    for name in TRANSFORMS:
+        one = rng.random((1, 24), dtype=np.float32)
+        batch = rng.random((1024, 24), dtype=np.float32)
+        out = np.empty_like(batch)
+        yield f"transform.{name}.1x24", lambda name=name, one=one: apply_transform(name, one)
+        yield f"transform.{name}.1024x24", lambda name=name, b=batch, o=out: apply_transform(name, b, out=o)
+    for model_name in models:
+        model = main.models.load(model_name)
+        length = window_length(model) or 24
+        for transform in [None] + TRANSFORMS:
+            plan = main.preprocess_plan(model_name, transform)
+
+            def scale(plan=plan):
+                with plan.window(series) as x:
+                    return x[0, 0, 0]
+
+            yield f"scale.{model_name}.{transform or 'none'}", scale
+        plan = main.preprocess_plan(model_name, None)
+        outputs = rng.random(24).astype(np.float32)
+        yield f"scale.{model_name}.inverse", lambda plan=plan: plan.inverse(outputs)
+        x = rng.random((1, length, 1), dtype=np.float32)
+        yield f"infer.{model_name}.step", lambda m=model, x=x: predict_batch(m, x)
+        yield f"infer.{model_name}.rollout_24", lambda m=model, w=x[0, :, 0]: rollout(m, w, 24)
+    model_name = models[0]
+    model_path = str(main.MODEL_DIR / main.MODEL_FILES[model_name])
+    x = rng.random((1, 24, 1), dtype=np.float32)
+    for method in ("segment", "ig", "exact"):
+        yield f"attribution.{model_name}.{method}", \
+            lambda method=method: compute_attribution(model_name, model_path, "none", x, method=method)
+
+
+def run_micro(main, models, pattern, quick):
+    results = []
+    for name, fn in micro_cases(main, models):
+        if pattern and not re.search(pattern, name):
+            continue
+        try:
+            stats = measure(fn, min_time=0.05 if quick else 0.5, repeat=3 if quick else 7)
+        except ImportError as e:
+            print(f"  skipped {name}: {e}")
+            continue
+        results.append({"name": f"micro.{name}", "layer": "micro", "unit": "us", "value": stats["median_us"],
+                        "better": "lower", "stats": stats})
+        print(f"  {name:<40} {stats['median_us']:>12.1f} us")
+    return results
+
+
+# HTTP layer
+
+def http_scenarios(models):
+    """(name, method, path, request kwargs factory, requests, concurrency) per endpoint."""
+    rng = np.random.default_rng(1)
+
+    def data():
+        return (rng.random(WINDOW) * 100).round(3).tolist()
+
+    for m in models:
+        yield f"predict.{m}", "POST", "/predict", lambda i, m=m: {"json": {"model": m, "data": data()}}, 400, 16
+        yield f"forecast.{m}.h24", "POST", "/forecast", \
+            lambda i, m=m: {"json": {"model": m, "data": data(), "horizon": 24}}, 200, 8
+    m = models[0]
+    yield "predict.binary", "POST", f"/predict?model={m}", lambda i: {
+        "content": (rng.random(WINDOW) * 100).astype("<f4").tobytes(),
+        "headers": {"content-type": "application/octet-stream"}}, 400, 16
+    yield "predict.series_id", "POST", "/predict", \
+        lambda i: {"json": {"model": m, "series_id": "bench", "as_of": 1_700_000_000 + int(rng.integers(100, 9999)) * 60}}, 400, 16
+    yield "forecast.samples100", "POST", "/forecast", \
+        lambda i: {"json": {"model": "transformer" if "transformer" in models else m, "data": data(), "horizon": 24,
+                            "samples": 100, "uncertainty": "dropout" if "transformer" in models else "auto"}}, 50, 4
+    yield "forecast_batch.64x24", "POST", "/forecast/batch", lambda i: {"json": {
+        "model": m, "horizon": 24, "series": {f"s{j}": data() for j in range(64)}}}, 40, 4
+    for method in ("segment", "exact"):
+        yield f"shap_summary.{method}", "POST", "/shap-summary", lambda i, method=method: {"json": {
+            "model": m, "transform": "none", "data": data(), "method": method}}, 20, 2
+    yield "explain", "POST", "/explain", lambda i: {"json": {
+        "question": f"Why did the forecast move? ({i})", "shap_values": {f"t{j}": 0.1 * j for j in range(24)}}}, 100, 8
+    yield "feedback", "POST", "/feedback", lambda i: {"json": {"model": m, "feedback": f"ok {i}"}}, 400, 16
+    yield "health", "GET", "/health", lambda i: {}, 200, 8
+    yield "metrics", "GET", "/metrics", lambda i: {}, 200, 8
+
+
+async def setup_http(client):
+    """State some scenarios need: a stored series for the series_id requests."""
+    times = 1_700_000_000 + np.arange(10_000) * 60
+    values = (np.random.default_rng(2).random(10_000) * 100).round(3)
+    resp = await client.post("/series/bench", json={"timestamps": times.tolist(), "values": values.tolist()})
+    resp.raise_for_status()
+
+
+async def drive(client, method, path, make_kwargs, requests, concurrency):
+    latencies, statuses, counter = [], {}, iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            kwargs = make_kwargs(i)
+            t0 = time.perf_counter()
+            resp = await client.request(method, path, **kwargs)
+            await resp.aread()
+            latencies.append(time.perf_counter() - t0)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return {"p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99)),
+            "rps": requests / elapsed, "statuses": {str(k): v for k, v in sorted(statuses.items())}}
+
+
+async def run_http(client, layer, models, pattern, quick):
+    await setup_http(client)
+    results = []
+    for name, method, path, make_kwargs, requests, concurrency in http_scenarios(models):
+        if pattern and not re.search(pattern, name):
+            continue
+        requests = max(concurrency, requests // 5) if quick else requests
+        await drive(client, method, path, make_kwargs, concurrency, concurrency)  # warm-up: load, trace, spawn
+        stats = await drive(client, method, path, make_kwargs, requests, concurrency)
+        stats.update(requests=requests, concurrency=concurrency)
+        if set(stats["statuses"]) != {"200"}:
+            print(f"  warning: {name} returned {stats['statuses']}")
+        for metric, unit, better in (("p50_ms", "ms", "lower"), ("p99_ms", "ms", "lower"), ("rps", "req/s", "higher")):
+            results.append({"name": f"{layer}.{name}.{metric.split('_')[0]}", "layer": layer, "unit": unit,
+                            "value": stats[metric], "better": better, "stats": stats})
+        print(f"  {name:<28} p50 {stats['p50_ms']:>9.1f} ms  p99 {stats['p99_ms']:>9.1f} ms  {stats['rps']:>8.1f} req/s")
+    return results
+
+
+async def run_asgi(main, models, pattern, quick):
+    import httpx
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=300) as client:
+            return await run_http(client, "http", models, pattern, quick)
+    finally:
+        await main.shutdown_pools()
+
+
+def run_uvicorn(models, pattern, quick, port):
+    """The http scenarios against `python main.py` on localhost, with fake_ollama as a second process."""
+    import httpx
+    from benchmarks.bench_workers import wait_ready
+    env = {**os.environ, "OLLAMA_HOST": f"http://127.0.0.1:{port + 1}"}
+    fake = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(port + 1),
+                             "--first-token-ms", "0", "--token-ms", "0"], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    server = subprocess.Popen([sys.executable, "main.py", "--port", str(port)], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+
+    async def go():
+        limits = httpx.Limits(max_connections=64)
+        async with httpx.AsyncClient(base_url=url, timeout=300, limits=limits) as client:
+            return await run_http(client, "uvicorn", models, pattern, quick)
+
+    try:
+        wait_ready(url, server)
+        return asyncio.run(go())
+    finally:
+        for proc in (server, fake):
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def metadata():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": version("numpy"),
+        "tensorflow": version("tensorflow"),
+    }
+
+
+def run(args):
+    models = [m for m in args.models.split(",") if m]
+    layers = set(args.layers.split(","))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(tmp)
+        main = load_app()
+        if "micro" in layers:
+            print("micro")
+            results += run_micro(main, models, args.filter, args.quick)
+        if "http" in layers:
+            print("http (in-process ASGI)")
+            results += asyncio.run(run_asgi(main, models, args.filter, args.quick))
+        if args.uvicorn:
+            print(f"http (uvicorn on port {args.port})")
+            results += run_uvicorn(models, args.filter, args.quick, args.port)
+    report = {"meta": metadata() | {"quick": args.quick, "models": models}, "results": results}
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"{len(results)} results written to {args.out}")
+
+
+def compare(args):
+    """Print current vs baseline per benchmark; return 1 if any got worse than the threshold allows."""
+    base = {r["name"]: r for r in json.loads(Path(args.baseline).read_text())["results"]}
+    current = json.loads(Path(args.current).read_text())["results"]
+    regressions = 0
+    print(f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for r in current:
+        b = base.get(r["name"])
+        if b is None or not b["value"]:
+            print(f"{r['name']:<48} {'-':>12} {r['value']:>12.2f} {'new':>8}")
+            continue
+        change = r["value"] / b["value"] - 1.0
+        worse = change if r["better"] == "lower" else -change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "  improved"
+        print(f"{r['name']:<48} {b['value']:>12.2f} {r['value']:>12.2f} {change:>+7.1%}{flag}")
+    missing = sorted(set(base) - {r["name"] for r in current})
+    if missing:
+        print(f"{len(missing)} baseline benchmarks not in this run: {', '.join(missing[:10])}"
+              f"{' ...' if len(missing) > 10 else ''}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="run the benchmarks and write a JSON report")
+    p_run.add_argument("--layers", default="micro,http", help="comma-separated: micro, http")
+    p_run.add_argument("--models", default=",".join(MODELS))
+    p_run.add_argument("--filter", help="only benchmarks whose name matches this regex")
+    p_run.add_argument("--quick", action="store_true", help="fewer rounds and requests, for smoke runs")
+    p_run.add_argument("--uvicorn", action="store_true", help="also run the http scenarios against a real server")
+    p_run.add_argument("--port", type=int, default=8767)
+    p_run.add_argument("--out", default="bench.json")
+    p_cmp = sub.add_parser("compare", help="compare a report against a baseline report")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,273 @@
-from fastapi import FastAPI, File, UploadFile, Form, Body, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, Body, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 import numpy as np
 import joblib
-import shap
 import psutil
 from pathlib import Path
-import shap
 import os
-import requests
-from transformers import pipeline
-from tensorflow import keras
+import json
+import asyncio
+import math
+import threading
 from fastapi.middleware.cors import CORSMiddleware
-from ml.transforms import apply_dct, apply_dwt, apply_cs
+from starlette.routing import Match
+from ml.transforms import TRANSFORM_NAMES, resolve_transform
+from ml.forecasting import rollout, predict_batch, window_length, forecast_batch, forecast_scaled
+from ml.parsing import (parse_csv_stream, parse_wide_csv, parse_parquet_columns, parse_binary, parse_timed_csv,
+                        BINARY_MEDIA_TYPES)
+from ml.batching import MicroBatcher, QueueFullError
+from ml.executors import ExecutionPool, PoolBusyError
+from ml.shap_worker import compute_attribution
+from ml.attribution import METHODS as ATTRIBUTION_METHODS
+from ml.cache import LRUCache, ResultCache, hash_key
+from ml.registry import ModelRegistry
+from ml.engines import parse_engine_spec
+from ml.sessions import SessionManager
+from ml.llm import OllamaClient, prompt_cache_key
+from ml.preprocessing import PreprocessPlan
+from ml.uncertainty import DEFAULT_QUANTILES, load_residuals, quantile_bands, resolve_method, sample_rollouts
+from ml.model_server import ModelServerClient
+from ml.feedback import FeedbackStore, FeedbackBacklogError
+from ml.series_store import SeriesStore, SeriesNotFoundError, to_millis
+from ml.admission import AdmissionController, AdmissionRejected, CostClass, degraded as admission_degraded
+from ml.admission import parse_class_spec
+from ml.instrumentation import registry as metrics_registry, begin_request, end_request, stage, set_labels, sampler
 
 # Initialize FastAPI app
 app = FastAPI()
 
+# Determine base path and model directory
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_DIR = BASE_DIR / 'ml' / 'models'
+
+# Global containers for models and scaler. Models are loaded on first use;
+# PRELOAD_MODELS (comma-separated names, or 'all') loads some at startup instead.
+MODEL_FILES = {
+    'lstm': 'lstm_model.h5',
+    'cnn_lstm': 'cnn_lstm_model.h5',
+    'transformer': 'transformer_model.h5',
+}
+PRELOAD_MODELS = [m.strip() for m in os.environ.get("PRELOAD_MODELS", "").split(",") if m.strip()]
+# Inference engine per model, e.g. MODEL_ENGINES="lstm=tflite,transformer=tflite-float16" (default: keras)
+MODEL_ENGINES = parse_engine_spec(os.environ.get("MODEL_ENGINES", ""))
+# Set by the multi-worker launcher (python main.py --workers N): models live in one shared model server process
+MODEL_SERVER = os.environ.get("MODEL_SERVER")
+models = ModelRegistry(
+    MODEL_DIR, MODEL_FILES, engines=MODEL_ENGINES, warmup=os.environ.get("MODEL_WARMUP", "1") != "0",
+    remote=ModelServerClient(MODEL_SERVER) if MODEL_SERVER else None,
+)
+scaler = None
+
+# Local Ollama LLM (default localhost:11434), reached through one pooled async HTTP client;
+# availability is checked on first use and re-checked periodically
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama2-uncensored")  # default model name for Ollama (adjust if needed)
+ollama = OllamaClient(OLLAMA_HOST, OLLAMA_MODEL)
+
+# /explain answers keyed by normalized question + rounded SHAP values
+explain_cache = LRUCache(
+    max_entries=int(os.environ.get("EXPLAIN_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("EXPLAIN_CACHE_TTL", "3600")),
+)
+
+# Cross-request micro-batching for /predict (set PREDICT_BATCHING=0 to call the model per request)
+PREDICT_BATCHING = os.environ.get("PREDICT_BATCHING", "1") != "0"
+PREDICT_MAX_BATCH = int(os.environ.get("PREDICT_MAX_BATCH", "32"))
+PREDICT_MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_MAX_QUEUE = int(os.environ.get("PREDICT_MAX_QUEUE", "1024"))
+
+# /forecast prediction intervals: cap on Monte-Carlo rollouts per request
+FORECAST_MAX_SAMPLES = int(os.environ.get("FORECAST_MAX_SAMPLES", "1000"))
+
+# /forecast/batch: series per rollout chunk (caps peak memory) and per request
+BATCH_FORECAST_CHUNK = int(os.environ.get("BATCH_FORECAST_CHUNK", "1024"))
+BATCH_FORECAST_MAX_SERIES = int(os.environ.get("BATCH_FORECAST_MAX_SERIES", "100000"))
+
+# Live forecast sessions over WebSocket (/ws/forecast)
+forecast_sessions = SessionManager(
+    max_sessions=int(os.environ.get("FORECAST_SESSIONS_MAX", "1000")),
+    idle_timeout=float(os.environ.get("FORECAST_SESSION_IDLE_S", "300")),
+)
+
+# Bounded executors so blocking work never runs on the event loop:
+# threads for Keras inference and LLM calls, processes for SHAP
+inference_pool = ExecutionPool(
+    "inference",
+    max_workers=int(os.environ.get("INFERENCE_WORKERS", "4")),
+    queue_timeout=float(os.environ.get("INFERENCE_QUEUE_TIMEOUT", "5")),
+)
+llm_pool = ExecutionPool(
+    "llm",
+    max_workers=int(os.environ.get("LLM_WORKERS", "2")),
+    queue_timeout=float(os.environ.get("LLM_QUEUE_TIMEOUT", "30")),
+    max_pending=16,
+)
+shap_pool = ExecutionPool(
+    "shap",
+    max_workers=int(os.environ.get("SHAP_WORKERS", "2")),
+    queue_timeout=float(os.environ.get("SHAP_QUEUE_TIMEOUT", "30")),
+    max_pending=16,
+    kind="process",
+    nice=int(os.environ.get("SHAP_NICE", "10")),  # SHAP yields the CPU to /predict and /forecast
+)
+
+# /predict and /forecast responses keyed by a hash of the scaled window, model version, transform and horizon.
+# RESULT_CACHE_BACKEND=sqlite:/path/cache.db shares results between uvicorn workers on one host.
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "1") != "0"
+result_cache = ResultCache.from_spec(
+    os.environ.get("RESULT_CACHE_BACKEND", "memory"),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", "60")),
+    max_bytes=int(float(os.environ.get("RESULT_CACHE_MB", "64")) * 1024 * 1024),
+)
+
+# Feedback is appended to a SQLite log by a background batch writer; FEEDBACK_DB can be shared by all workers
+feedback_store = FeedbackStore(
+    os.environ.get("FEEDBACK_DB", str(BASE_DIR / "feedback.db")),
+    batch_size=int(os.environ.get("FEEDBACK_BATCH_SIZE", "512")),
+    flush_interval=float(os.environ.get("FEEDBACK_FLUSH_MS", "50")) / 1000.0,
+)
+# GET /feedback queries run here, off the event loop; the store serializes reads, so one worker is enough
+feedback_pool = ExecutionPool(
+    "feedback",
+    max_workers=int(os.environ.get("FEEDBACK_READ_WORKERS", "1")),
+    queue_timeout=float(os.environ.get("FEEDBACK_QUEUE_TIMEOUT", "5")),
+)
+
+# Stored histories for series_id requests: memory-mapped float32 files, appended in place, compacted in the background
+series_store = SeriesStore(
+    os.environ.get("SERIES_DIR", str(BASE_DIR / "series")),
+    compact_rows=int(os.environ.get("SERIES_COMPACT_ROWS", "100000")),
+    compact_interval=float(os.environ.get("SERIES_COMPACT_INTERVAL_S", "60")),
+)
+# Store reads and writes (file I/O, flock waits) run here, never on the event loop
+series_pool = ExecutionPool(
+    "series",
+    max_workers=int(os.environ.get("SERIES_WORKERS", "4")),
+    queue_timeout=float(os.environ.get("SERIES_QUEUE_TIMEOUT", "5")),
+)
+
+# Finished /shap-summary responses keyed by a hash of (model, transform, scaled input)
+shap_result_cache = LRUCache(max_entries=int(os.environ.get("SHAP_RESULT_CACHE_SIZE", "512")))
+# /shap-summary: caps on integrated-gradients path samples (one (steps, L, 1) batch) and occlusion blocks
+SHAP_MAX_STEPS = int(os.environ.get("SHAP_MAX_STEPS", "1024"))
+SHAP_MAX_SEGMENTS = int(os.environ.get("SHAP_MAX_SEGMENTS", "256"))
+
+# Admission control per endpoint cost class: a concurrency budget, a bounded queue and a default deadline
+# (ms) each, overridable per class, e.g. ADMISSION_CONCURRENCY="shap=4" ADMISSION_DEADLINE_MS="light=500".
+# Requests that queued are served degraded where a cheaper variant exists. ADMISSION=0 disables it.
+ADMISSION = os.environ.get("ADMISSION", "1") != "0"
+ADMISSION_DEFAULTS = {  # class: (concurrency, queue, deadline ms, expected service ms)
+    "light": (64, 1024, 2000, 5),
+    "batch": (4, 16, 30000, 1000),
+    "shap": (shap_pool.max_workers, 16, 30000, 2000),
+    "llm": (llm_pool.max_workers, 16, 60000, 5000),
+}
+ADMISSION_ROUTES = {
+    "/predict": "light",
+    "/forecast": "light",
+    "/forecast/batch": "batch",
+    "/shap-summary": "shap",
+    "/explain": "llm",
+}
+admission_concurrency = parse_class_spec(os.environ.get("ADMISSION_CONCURRENCY", ""), int)
+admission_queue = parse_class_spec(os.environ.get("ADMISSION_QUEUE", ""), int)
+admission_deadline_ms = parse_class_spec(os.environ.get("ADMISSION_DEADLINE_MS", ""))
+admission = AdmissionController(
+    [
+        CostClass(
+            name,
+            max_concurrent=admission_concurrency.get(name, concurrency),
+            max_queue=admission_queue.get(name, queue),
+            deadline=admission_deadline_ms.get(name, deadline_ms) / 1000.0,
+            expected_s=expected_ms / 1000.0,
+        )
+        for name, (concurrency, queue, deadline_ms, expected_ms) in ADMISSION_DEFAULTS.items()
+    ],
+    ADMISSION_ROUTES,
+)
+# Degraded variants, used for requests admitted after queueing
+SHAP_DEGRADED_BACKGROUND = int(os.environ.get("SHAP_DEGRADED_BACKGROUND", "10"))
+SHAP_DEGRADED_STEPS = int(os.environ.get("SHAP_DEGRADED_STEPS", "8"))
+FORECAST_DEGRADED_SAMPLES = int(os.environ.get("FORECAST_DEGRADED_SAMPLES", "100"))
+
+class AdmissionMiddleware:
+    """
+    Hold a slot of the path's cost class for the whole request, or shed it with 429/503 and
+    Retry-After. Clients may set how long they are willing to wait with an X-Deadline-Ms header
+    or a deadline_ms query parameter. A plain ASGI middleware rather than an @app.middleware
+    function, so the slot stays held until a streamed body has been sent (or the client has
+    gone), not just until the handler returns its response. CORS preflights are not admitted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS" or not ADMISSION
+                or admission.cost_class(scope["path"]) is None):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        deadline = request.headers.get("x-deadline-ms") or request.query_params.get("deadline_ms")
+        try:
+            deadline = float(deadline) / 1000.0 if deadline else None
+        except ValueError:
+            response = JSONResponse({"detail": "Deadline must be a number of milliseconds"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        try:
+            with stage("admission"):
+                ticket = await admission.admit(scope["path"], deadline)
+        except AdmissionRejected as e:
+            response = JSONResponse({"detail": str(e)}, status_code=e.status,
+                                    headers={"Retry-After": str(math.ceil(e.retry_after))})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(ticket)
+
+# Added before profile_requests (so its wait is profiled) and CORS (so its rejections carry CORS headers)
+app.add_middleware(AdmissionMiddleware)
+
+def allows_degraded(value):
+    """Whether a request's 'allow_degraded' parameter (default true) lets it be served degraded."""
+    return str(value).lower() not in ("0", "false", "no")
+
+# Stage timings come back in Server-Timing / X-Stage-Timings when a request sends "X-Profile: 1"
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "1") != "0"
+
+def route_template(scope):
+    """
+    The path template of the route serving a request (/series/{series_id}), used as the endpoint metric
+    label so that label values stay bounded; "unmatched" for 404s. Requests answered before routing
+    (admission rejections) are matched against the routes here.
+    """
+    route = scope.get("route")
+    if route is None:
+        route = next((r for r in app.router.routes if r.matches(scope)[0] == Match.FULL), None)
+    return getattr(route, "path", None) or "unmatched"
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Open a stage profile for the request and record it (and any slow-request stack dump) when it finishes."""
+    profile, token = begin_request("unmatched")
+    sampler.attach(profile)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        profile.endpoint = route_template(request.scope)
+        end_request(profile, token, status)
+    if PROFILE_HEADER and request.headers.get("x-profile", "").lower() in ("1", "true", "yes"):
+        response.headers["Server-Timing"] = profile.server_timing()
+        response.headers["X-Stage-Timings"] = json.dumps(profile.timings_ms())
+    return response
+
+# Outermost, so every response (admission rejections included) gets CORS headers and preflights are answered first
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # or ["*"] if you're unsure
@@ -25,32 +276,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Determine base path and model directory
-BASE_DIR = Path(__file__).resolve().parent
-MODEL_DIR = BASE_DIR / 'ml' / 'models'
+# Compiled preprocessing (window length, float32 scaler affine, transform) per (model, transform)
+preprocess_plans = {}
 
-# Global containers for loaded models and scaler
-models = {}
-scaler = None
+def preprocess_plan(model_name, transform_name):
+    """
+    The cached PreprocessPlan for a loaded model and a transform name. The name is resolved against
+    the transform registry first (400 if unknown), so the cache holds one plan per real transform.
+    """
+    transform_name = transform_param(transform_name)
+    key = (model_name, transform_name)
+    plan = preprocess_plans.get(key)
+    if plan is None or plan.model is not models[model_name]:
+        plan = preprocess_plans[key] = PreprocessPlan(models[model_name], transform_name, scaler)
+    return plan
 
-# Check for local Ollama LLM availability (running on default localhost:11434)
-OLLAMA_URL = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "llama2-uncensored"  # default model name for Ollama (adjust if needed)
-try:
-    # Ping Ollama API to see if it's running
-    requests.get("http://localhost:11434", timeout=1)
-    OLLAMA_AVAILABLE = True
-except:
-    OLLAMA_AVAILABLE = False
+def transform_param(name):
+    """A request's transform resolved against the registry ('none' if absent), or 400 for unknown names."""
+    try:
+        return resolve_transform(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def busy_response(e):
+    """503 for a saturated execution pool, asking the client to retry shortly."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that calls on_close() exactly once when the response ends: body sent,
+    sending failed, or the client gone before the body was iterated (when the body generator's
+    own finally block never runs).
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            on_close, self.on_close = self.on_close, None
+            if on_close is not None:
+                on_close()
 
 # HuggingFace pipeline for LLM (initialized only if needed)
 hf_pipeline = None
+hf_pipeline_lock = threading.Lock()
 HF_MODEL_NAME = "google/flan-t5-base"  # fallback LLM model (can be changed to any local free model)
 
 # Pydantic models for request bodies
 class ExplainRequest(BaseModel):
     question: str
     shap_values: dict
+    stream: bool = False  # stream tokens back as NDJSON instead of one JSON answer
 
 class FeedbackRequest(BaseModel):
     model: str
@@ -59,16 +339,15 @@ class FeedbackRequest(BaseModel):
 class ShapRequest(BaseModel):
     model: str
     transform: str
-    data: list  # List of list or list of floats
-
-# Load pre-trained models into memory
-try:
-    models['lstm'] = keras.models.load_model(str(MODEL_DIR / 'lstm_model.h5'), compile=False)
-    models['cnn_lstm'] = keras.models.load_model(str(MODEL_DIR / 'cnn_lstm_model.h5'), compile=False)
-    models['transformer'] = keras.models.load_model(str(MODEL_DIR / 'transformer_model.h5'), compile=False)
-    print("Models loaded:", list(models.keys()))
-except Exception as e:
-    print(f"Error loading models: {e}")
+    data: list = None  # List of list or list of floats
+    series_id: str = None  # or a stored series (see /series), windowed up to as_of
+    as_of: str = None  # unix seconds or ISO 8601; default the latest value
+    method: str = "exact"  # 'exact' (GradientExplainer), 'ig' (integrated gradients) or 'segment'
+    steps: int = 32  # integrated-gradients path samples
+    segments: int = 8  # 'segment' mode: number of timestep blocks
+    refine: int = 2  # 'segment' mode: top blocks refined per timestep
+    compare: bool = False  # also run the exact explainer and report the divergence
+    allow_degraded: bool = True  # under load, accept a smaller background / fewer steps / no comparison
 
 # Load scaler (for data normalization) if available
 try:
@@ -76,42 +355,60 @@ try:
 except:
     scaler = None
 
-def parse_input(file: UploadFile = None, data=None):
+@app.on_event("startup")
+async def preload_models():
+    if PRELOAD_MODELS:
+        await inference_pool.run(models.preload, PRELOAD_MODELS)
+
+async def require_model(model_name):
+    """
+    Return the named model, loading it on the inference pool if this is its
+    first use, or raise 404 if it is unknown or fails to load.
+    """
+    if model_name not in models:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not loaded or available")
+    if models.is_loaded(model_name):
+        return models[model_name]
+    try:
+        return await inference_pool.run(models.load, model_name)
+    except PoolBusyError as e:
+        raise busy_response(e)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not loaded or available: {e}")
+
+async def run_timed(pool, stage_name, fn, *args, **kwargs):
+    """pool.run(fn, ...) with the wait for a worker timed as stage 'queue' and the call as `stage_name`."""
+    with stage("queue"):
+        await pool.acquire()
+    failed = True
+    try:
+        with stage(stage_name):
+            result = await pool.submit(fn, *args, **kwargs)
+        failed = False
+        return result
+    finally:
+        pool.release(failed)
+
+async def run_predict_batch(key, batch):
+    """Run one micro-batch of (N, timesteps, 1) windows for the model named in key[0]."""
+    return await inference_pool.run(predict_batch, models[key[0]], batch)
+
+predict_batcher = MicroBatcher(
+    run_predict_batch,
+    max_batch_size=PREDICT_MAX_BATCH,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    max_queue=PREDICT_MAX_QUEUE,
+)
+
+def parse_input(file: UploadFile = None, data=None, keep_last=None):
     """
     Parse input data from an uploaded CSV file or a JSON-provided list.
     Returns a numpy array of shape (timesteps, 1) containing the target series values.
+    CSV uploads are streamed in chunks; with `keep_last` only the trailing
+    `keep_last` values are kept, so memory does not grow with the file size.
     """
-    values = []
     if file:
-        content = file.file.read()
-        if not content:
-            raise ValueError("Uploaded file is empty")
-        content_str = content.decode('utf-8', errors='ignore')
-        lines = content_str.splitlines()
-        for line in lines:
-            if not line.strip():
-                continue  # skip empty lines
-            parts = line.strip().split(',')
-            try:
-                # Try to convert the entire row to floats
-                row_vals = [float(x) for x in parts]
-            except:
-                # If conversion fails, likely the first column is non-numeric (e.g., a date or header)
-                parts_without_first = parts[1:]
-                if not parts_without_first:
-                    continue
-                try:
-                    row_vals = [float(x) for x in parts_without_first]
-                except:
-                    continue  # skip this line if still not numeric
-            # If multiple columns, take the last column as the target value
-            if len(row_vals) > 1:
-                values.append(row_vals[-1])
-            else:
-                values.append(row_vals[0])
-        if not values:
-            raise ValueError("No numeric data found in file (after skipping headers)")
-        arr = np.array(values, dtype=float).reshape(-1, 1)
+        arr = parse_csv_stream(file.file, keep_last=keep_last)
     elif data is not None:
         # Data given directly as JSON (flatten if nested)
         try:
@@ -125,315 +422,652 @@ def parse_input(file: UploadFile = None, data=None):
         raise ValueError("No input data provided.")
     return arr
 
+def stored_window(series_id, as_of, model_name):
+    """
+    The model's input window from a stored series, ending at the last value at or before
+    `as_of` (unix seconds or ISO 8601; default the latest), as a (timesteps, 1) view of the store's memory map.
+    """
+    as_of_ms = None if as_of in (None, "") else int(to_millis([as_of])[0])
+    values, _ = series_store.window(str(series_id), window_length(models[model_name]), as_of=as_of_ms)
+    return values.reshape(-1, 1)
+
+async def read_request(request: Request):
+    """
+    Split a /predict or /forecast request into (params, json_data, upload, binary).
+    Multipart forms and JSON bodies carry their parameters inline. Binary bodies
+    (raw float32, .npy, Arrow IPC or Parquet, by Content-Type; see ml.parsing.BINARY_MEDIA_TYPES)
+    take them from the query string, and `binary` is (body, media_type, declared_length).
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == "multipart/form-data":
+        form = await request.form()
+        return form, None, form.get("file"), None
+    if media_type in BINARY_MEDIA_TYPES:
+        length = request.headers.get("x-series-length") or request.query_params.get("length")
+        return request.query_params, None, None, (await request.body(), media_type, length)
+    body = await request.json()
+    return body, body.get("data"), None, None
+
+def binary_output_format(request: Request, params):
+    """'npy' or 'raw' when the client asked for a binary forecast (format= or Accept), else None."""
+    fmt = str(params.get("format") or "").lower()
+    accept = request.headers.get("accept", "")
+    if fmt == "npy" or (not fmt and "application/x-npy" in accept):
+        return "npy"
+    if fmt == "raw" or (not fmt and "application/octet-stream" in accept):
+        return "raw"
+    return None
+
+def binary_forecast_response(result, fmt):
+    """
+    A /forecast result as one (rows, horizon) float32 array: forecast, baseline, then one row per
+    quantile, NaN-padded to the horizon. Row names are listed in the X-Forecast-Rows header;
+    'raw' bodies are little-endian float32 in row-major order with the shape in X-Shape.
+    """
+    names = ["forecast", "baseline"] + [f"q{q}" for q in result.get("quantiles", {})]
+    rows = [result["forecast"], result["baseline"]] + list(result.get("quantiles", {}).values())
+    width = max((len(r) for r in rows), default=0)
+    out = np.full((len(rows), width), np.nan, dtype="<f4")
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row
+    headers = {"X-Forecast-Rows": ",".join(names), "X-Shape": f"{out.shape[0]},{out.shape[1]}"}
+    if fmt == "npy":
+        import io
+        buf = io.BytesIO()
+        np.save(buf, out)
+        return Response(buf.getvalue(), media_type="application/x-npy", headers=headers)
+    return Response(out.tobytes(), media_type="application/octet-stream", headers=headers)
+
 @app.post("/predict")
 async def predict_endpoint(request: Request):
     """
     Endpoint to get a model prediction for the next time step.
-    Accepts JSON (with 'data') or multipart form (with file upload) input.
+    Accepts JSON (with 'data'), multipart form (with file upload) or a binary body
+    (see read_request) input.
     Query parameters:
       - model: which model to use (e.g. 'lstm', 'cnn_lstm', 'transformer')
       - transform: optional transform to apply ('DCT', 'DWT', 'CS')
     """
-    # Determine request content type and extract parameters accordingly
-    content_type = request.headers.get("content-type", "")
-    model_name = None
-    transform_name = None
-    input_data = None
-    file_obj = None
-    if content_type.startswith("multipart/form-data"):
-        form = await request.form()
-        model_name = form.get("model")
-        transform_name = form.get("transform") or None
-        file_obj = form.get("file")
-    else:
-        body = await request.json()
-        model_name = body.get("model")
-        transform_name = body.get("transform") or None
-        input_data = body.get("data")
+    params, input_data, file_obj, binary = await read_request(request)
+    model_name = params.get("model")
+    transform_name = transform_param(params.get("transform"))
     if not model_name:
         raise HTTPException(status_code=400, detail="Model name is required")
-    if model_name not in models or models[model_name] is None:
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not loaded or available")
+    with stage("load_model"):
+        await require_model(model_name)
+    set_labels(model=model_name, transform=transform_name)  # only once both are known to be valid
     try:
-        if file_obj is not None:
-            if isinstance(file_obj, UploadFile):
-                arr = parse_input(file=file_obj)
+        with stage("parse"):
+            if params.get("series_id"):
+                arr = await series_pool.run(stored_window, params.get("series_id"), params.get("as_of"), model_name)
+            elif file_obj is not None:
+                if isinstance(file_obj, UploadFile):
+                    arr = parse_input(file=file_obj, keep_last=window_length(models[model_name]))
+                else:
+                    raise HTTPException(status_code=400, detail="Invalid file upload")
+            elif binary is not None:
+                arr = parse_binary(*binary, column=params.get("column"))
             else:
-                raise HTTPException(status_code=400, detail="Invalid file upload")
-        else:
-            arr = parse_input(data=input_data)
+                arr = parse_input(data=input_data)
+    except SeriesNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PoolBusyError as e:
+        raise busy_response(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Input parsing error: {e}")
     if arr.size == 0:
         raise HTTPException(status_code=400, detail="No data provided for prediction")
-    # Adjust input length if model expects a fixed window size
-    needed_len = None
+    # Trim to the model window, scale and transform into a (1, timesteps, 1) float32 buffer
+    plan = preprocess_plan(model_name, transform_name)
     try:
-        shape = models[model_name].input_shape  # e.g. (None, timesteps, features)
-        if shape is not None and len(shape) >= 3:
-            seq_len = shape[1]
-            if seq_len is not None:
-                needed_len = seq_len
-    except:
-        pass
-    if needed_len:
-        if arr.shape[0] < needed_len:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Input sequence too short for model (need ≥ {needed_len} timesteps)"
-            )
-        elif arr.shape[0] > needed_len:
-            # Trim to the last `needed_len` timesteps
-            arr = arr[-needed_len:]
-    # Scale the data if a scaler was loaded (models trained on normalized data)
-    if scaler:
+        series = plan.trim(arr)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with plan.window(series) as arr_input:
+        cache_key = None
+        if RESULT_CACHE:
+            with stage("cache"):
+                cache_key = hash_key("predict", model_name, models.version(model_name), plan.transform, arr_input)
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
-            arr = scaler.transform(arr)
-        except Exception as e:
-            print(f"Warning: scaler.transform failed (skipping scaling): {e}")
-    # Apply transformation if specified
-    if transform_name:
-        t = transform_name.lower()
-        arr_series = arr.flatten()
-        if t == 'dct':
-            arr_trans = apply_dct(arr_series)
-        elif t == 'dwt':
-            arr_trans = apply_dwt(arr_series)
-        elif t == 'cs':
-            arr_trans = apply_cs(arr_series)
-        else:
-            arr_trans = arr_series  # unknown transform; proceed without transform
-        arr_trans = np.array(arr_trans, dtype=float)
-        if arr_trans.ndim == 1:
-            arr_trans = arr_trans.reshape(-1, 1)
-        elif arr_trans.ndim == 0:
-            arr_trans = np.array([float(arr_trans)]).reshape(-1, 1)
-        arr = arr_trans
-    # Prepare input shape for prediction: (batch=1, timesteps, features)
-    # Ensure correct shape: (1, timesteps, 1)
-    if arr.shape[0] == 1:  # (1, N)
-        arr_input = arr.T.reshape(1, -1, 1)
-    else:  # (N, 1)
-        arr_input = arr.reshape(1, arr.shape[0], arr.shape[1])
-    try:
-        y_pred = models[model_name].predict(arr_input)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Model prediction failed: {e}")
-    # Inverse transform the prediction back to original scale if scaler is available
-    y_pred_val = y_pred
-    if scaler:
-        try:
-            if hasattr(scaler, "inverse_transform"):
-                y_pred_val = scaler.inverse_transform(y_pred_val)
+            if PREDICT_BATCHING:
+                # The window is already transformed, so requests differing only in transform share a batch
+                key = (model_name, arr_input.shape[1])
+                # Includes the batching window and the shared model call
+                with stage("predict_batched"):
+                    y_pred = (await predict_batcher.submit(key, arr_input[0])).reshape(1, -1)
+            else:
+                y_pred = await run_timed(inference_pool, "predict", predict_batch, models[model_name], arr_input)
+        except (QueueFullError, PoolBusyError) as e:
+            raise busy_response(e)
         except Exception as e:
-            print(f"Warning: inverse_transform failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Model prediction failed: {e}")
+    # Inverse transform the prediction back to original scale
+    with stage("inverse_transform"):
+        y_pred_val = plan.inverse(y_pred)
     # Extract the scalar prediction value
     try:
         y_value = float(y_pred_val.flatten()[0])
     except:
         # If model returns multiple outputs, convert all to list (not expected in /predict)
         y_value = y_pred_val.flatten().tolist()
-    return {"prediction": y_value}
+    result = {"prediction": y_value}
+    if cache_key is not None:
+        result_cache.put(cache_key, result)
+    return result
+
+def parse_uncertainty(params):
+    """(samples, quantiles, method, seed) from /forecast parameters, or None when 'samples' is absent or 0."""
+    try:
+        samples = int(params.get("samples") or 0)
+        seed = int(params["seed"]) if params.get("seed") not in (None, "") else None
+        quantiles = params.get("quantiles") or DEFAULT_QUANTILES
+        if isinstance(quantiles, str):
+            quantiles = quantiles.split(",")
+        quantiles = [float(q) for q in quantiles]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'samples' and 'seed' must be integers and 'quantiles' numbers")
+    if samples <= 0:
+        return None
+    if samples > FORECAST_MAX_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"At most {FORECAST_MAX_SAMPLES} samples per forecast")
+    if not all(0.0 <= q <= 1.0 for q in quantiles):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    return samples, quantiles, params.get("uncertainty") or "auto", seed
 
 @app.post("/forecast")
 async def forecast_endpoint(request: Request):
     """
     Endpoint to get a multi-step forecast.
-    Accepts the same inputs as /predict plus an optional 'horizon' parameter for number of future steps.
+    Accepts the same inputs as /predict plus an optional 'horizon' parameter for number of future steps
+    and an optional 'mode' ('recursive', 'direct' or 'auto') selecting how multi-output models are rolled out.
+    With 'samples' = K > 0 it also runs K stochastic rollouts in one batch ('uncertainty': 'auto',
+    'dropout' or 'bootstrap'; optional 'seed', bootstrap only) and returns per-step 'quantiles' (default 5/25/50/75/95%).
+    'format=npy' / 'format=raw' (or an Accept header of application/x-npy / application/octet-stream)
+    returns the result as one float32 array instead of JSON, see binary_forecast_response.
     """
-    content_type = request.headers.get("content-type", "")
-    model_name = None
-    transform_name = None
-    input_data = None
-    file_obj = None
+    params, input_data, file_obj, binary = await read_request(request)
+    model_name = params.get("model")
+    transform_name = transform_param(params.get("transform"))
     horizon = 10  # default forecast horizon
-    if content_type.startswith("multipart/form-data"):
-        form = await request.form()
-        model_name = form.get("model")
-        transform_name = form.get("transform") or None
-        if form.get("horizon"):
-            try:
-                horizon = int(form.get("horizon"))
-            except:
-                raise HTTPException(status_code=400, detail="Horizon must be an integer")
-        file_obj = form.get("file")
-    else:
-        body = await request.json()
-        model_name = body.get("model")
-        transform_name = body.get("transform") or None
-        if body.get("horizon") is not None:
-            try:
-                horizon = int(body.get("horizon"))
-            except:
-                raise HTTPException(status_code=400, detail="Horizon must be an integer")
-        input_data = body.get("data")
+    if params.get("horizon") not in (None, ""):
+        try:
+            horizon = int(params.get("horizon"))
+        except:
+            raise HTTPException(status_code=400, detail="Horizon must be an integer")
+    forecast_mode = params.get("mode") or "auto"  # 'recursive', 'direct' (multi-output models) or 'auto'
+    uncertainty = requested_uncertainty = parse_uncertainty(params)
+    degraded = {}
+    if (uncertainty and uncertainty[0] > FORECAST_DEGRADED_SAMPLES and admission_degraded()
+            and allows_degraded(params.get("allow_degraded", True))):
+        uncertainty = (FORECAST_DEGRADED_SAMPLES,) + uncertainty[1:]
+        degraded["samples"] = FORECAST_DEGRADED_SAMPLES
+    output_format = binary_output_format(request, params)
     if not model_name:
         raise HTTPException(status_code=400, detail="Model name is required")
-    if model_name not in models or models[model_name] is None:
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not loaded or available")
+    with stage("load_model"):
+        await require_model(model_name)
+    set_labels(model=model_name, transform=transform_name)  # only once both are known to be valid
     try:
-        if file_obj is not None:
-            if isinstance(file_obj, UploadFile):
-                arr = parse_input(file=file_obj)
+        with stage("parse"):
+            if params.get("series_id"):
+                arr = await series_pool.run(stored_window, params.get("series_id"), params.get("as_of"), model_name)
+            elif file_obj is not None:
+                if isinstance(file_obj, UploadFile):
+                    arr = parse_input(file=file_obj, keep_last=window_length(models[model_name]))
+                else:
+                    raise HTTPException(status_code=400, detail="Invalid file upload")
+            elif binary is not None:
+                arr = parse_binary(*binary, column=params.get("column"))
             else:
-                raise HTTPException(status_code=400, detail="Invalid file upload")
-        else:
-            arr = parse_input(data=input_data)
+                arr = parse_input(data=input_data)
+    except SeriesNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PoolBusyError as e:
+        raise busy_response(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Input parsing error: {e}")
     if arr.size == 0:
         raise HTTPException(status_code=400, detail="No data provided for forecast")
-    # Adjust input sequence length if model expects a fixed window size
-    needed_len = None
+    # Trim to the model window, scale and transform into a float32 buffer
+    plan = preprocess_plan(model_name, transform_name)
     try:
-        shape = models[model_name].input_shape  # e.g. (None, timesteps, features)
-        if shape is not None and len(shape) >= 3:
-            seq_len = shape[1]
-            if seq_len is not None:
-                needed_len = seq_len
-    except:
-        pass
-    if needed_len:
-        if arr.shape[0] < needed_len:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Input sequence too short for model (need ≥ {needed_len} timesteps)"
-            )
-        elif arr.shape[0] > needed_len:
-            # Trim to the last `needed_len` timesteps
-            arr = arr[-needed_len:]
-        window_size = needed_len
-    else:
-        # If model can handle variable length, use current length as window
-        window_size = arr.shape[0]
-    # Scale the data if a scaler was loaded (models trained on normalized data)
-    if scaler:
+        series = plan.trim(arr)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with plan.window(series) as arr_input:
+        window = arr_input[:, :, 0]  # (1, timesteps)
+        cache_key = None
+        if RESULT_CACHE:
+            with stage("cache"):
+                # Key on what the client asked for; a degraded result gets its own key, so it is
+                # never served to a later request that was admitted without degradation
+                cache_key = hash_key("forecast", model_name, models.version(model_name),
+                                     plan.transform, horizon, forecast_mode, window, repr(requested_uncertainty))
+                if degraded:
+                    cache_key = hash_key(cache_key, repr(sorted(degraded.items())))
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                return binary_forecast_response(cached, output_format) if output_format else cached
+        # Roll the window forward through the compiled step function
         try:
-            arr = scaler.transform(arr)
-        except Exception as e:
-            print(f"Warning: scaler.transform failed (skipping scaling): {e}")
-    # Apply transformation if specified
-    if transform_name:
-        t = transform_name.lower()
-        arr_series = arr.flatten()
-        if t == 'dct':
-            arr_trans = apply_dct(arr_series)
-        elif t == 'dwt':
-            arr_trans = apply_dwt(arr_series)
-        elif t == 'cs':
-            arr_trans = apply_cs(arr_series)
-        else:
-            arr_trans = arr_series
-        arr_trans = np.array(arr_trans, dtype=float)
-        if arr_trans.ndim == 1:
-            arr_trans = arr_trans.reshape(-1, 1)
-        elif arr_trans.ndim == 0:
-            arr_trans = np.array([float(arr_trans)]).reshape(-1, 1)
-        arr = arr_trans
-        # If transform changed length, adjust window size if no fixed length
-        if not needed_len:
-            window_size = arr.shape[0]
-    predictions = []
-    for i in range(horizon):
-        # Ensure correct shape: (1, timesteps, 1)
-        if arr.shape[0] == 1:  # (1, N)
-            arr_input = arr.T.reshape(1, -1, 1)
-        else:  # (N, 1)
-            arr_input = arr.reshape(1, arr.shape[0], arr.shape[1])
-        try:
-            y_pred = models[model_name].predict(arr_input)
+            preds, final_window = await run_timed(
+                inference_pool, "rollout", rollout, models[model_name], window, horizon, mode=forecast_mode
+            )
+        except PoolBusyError as e:
+            raise busy_response(e)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Model prediction failed during forecast: {e}")
-        # Assume single-step output
-        if hasattr(y_pred, "flatten"):
-            y_val = float(y_pred.flatten()[0])
-        else:
-            raise HTTPException(status_code=500, detail="Model output is not numeric")
-        predictions.append(y_val)
-        # Slide the window: append new prediction, drop oldest
-        new_val = np.array([[y_val]], dtype=float)
-        arr = arr.reshape(-1, 1)  # enforce 2D shape
-        arr = np.vstack([arr[1:], new_val])
-    # Inverse scale the predictions list if applicable
-    if scaler:
-        try:
-            if hasattr(scaler, "inverse_transform"):
-                inv_preds = scaler.inverse_transform(np.array(predictions).reshape(-1, 1))
-                predictions = inv_preds.flatten().tolist()
-        except Exception as e:
-            print(f"Warning: inverse_transform on predictions failed: {e}")
+        paths = None
+        if uncertainty:
+            samples, quantiles, method, seed = uncertainty
+            residuals = load_residuals(MODEL_DIR, model_name, plan.transform)
+            try:
+                method = resolve_method(method, models[model_name], residuals)
+                paths = await run_timed(
+                    inference_pool, "sample_rollouts", sample_rollouts, models[model_name], window[0], horizon,
+                    samples, method=method, residuals=residuals, seed=seed,
+                )
+            except PoolBusyError as e:
+                raise busy_response(e)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Sampled rollouts failed during forecast: {e}")
+    # Inverse scale the predictions (and sampled paths)
+    with stage("inverse_transform"):
+        predictions = plan.inverse(preds[0]).tolist()
+        if paths is not None:
+            bands = quantile_bands(plan.inverse(paths), quantiles)
 
     # Create a simple baseline from the last observed values (same length as forecast)
-    baseline_values = arr.flatten().tolist()[-len(predictions):]
+    baseline_values = final_window[0].tolist()[-len(predictions):]
     
-    return {
+    result = {
         "forecast": predictions,
         "baseline": baseline_values
     }
+    if paths is not None:
+        result["quantiles"] = bands
+        result["uncertainty"] = {"method": method, "samples": samples}
+    if degraded:
+        result["degraded"] = degraded
+    if cache_key is not None:
+        result_cache.put(cache_key, result)
+    if output_format:
+        return binary_forecast_response(result, output_format)
+    return result
 
-@app.post("/explain")
-async def explain_endpoint(req: ExplainRequest):
+def collect_series(series_input):
     """
-    Endpoint to get an AI-generated explanation for a prediction.
-    Expects a question and corresponding SHAP values in the request body.
+    Normalise the JSON 'series' field into {series_id: values}. Accepts either
+    {"id": [values...]} or [{"id": ..., "data": [values...]}, ...].
+    """
+    if isinstance(series_input, dict):
+        return {str(k): v for k, v in series_input.items()}
+    if isinstance(series_input, list):
+        out = {}
+        for i, item in enumerate(series_input):
+            if not isinstance(item, dict) or "data" not in item:
+                raise ValueError("Each series must be an object with 'id' and 'data'")
+            out[str(item.get("id", i))] = item["data"]
+        return out
+    raise ValueError("'series' must be an object or a list")
+
+def stack_windows(series, needed_len):
     """
+    Trim every series to the model window and stack them into an (N, L) array.
+    Series that are too short or not numeric are reported in `errors` instead.
+    """
+    ids, rows, errors = [], [], {}
+    if not needed_len:
+        # Variable-length model: use the shortest series as the common window
+        lengths = [len(v) for v in series.values() if len(v)]
+        needed_len = min(lengths) if lengths else 0
+    for series_id, values in series.items():
+        try:
+            arr = np.asarray(values, dtype=np.float32).reshape(-1)
+        except (TypeError, ValueError) as e:
+            errors[series_id] = f"Input parsing error: {e}"
+            continue
+        if needed_len == 0 or arr.shape[0] < needed_len:
+            errors[series_id] = f"Input sequence too short for model (need ≥ {needed_len} timesteps)"
+            continue
+        ids.append(series_id)
+        rows.append(arr[-needed_len:])
+    windows = np.stack(rows) if rows else np.empty((0, needed_len), dtype=np.float32)
+    return ids, windows, errors
+
+@app.post("/forecast/batch")
+async def forecast_batch_endpoint(request: Request):
+    """
+    Multi-step forecast for many series in one request.
+    Accepts JSON with 'series' ({id: values} or [{id, data}]) or a multipart upload
+    of a wide CSV / Parquet file (one column per series). Parameters as for /forecast,
+    plus 'stream' to return one NDJSON line per series as chunks finish.
+    All series are scaled, transformed and rolled out together, in chunks of
+    BATCH_FORECAST_CHUNK series, with one model call per step per chunk.
+    """
+    content_type = request.headers.get("content-type", "")
+    horizon = 10
+    try:
+        with stage("parse"):
+            if content_type.startswith("multipart/form-data"):
+                form = await request.form()
+                params = form
+                file_obj = form.get("file")
+                if not isinstance(file_obj, UploadFile):
+                    raise HTTPException(status_code=400, detail="A wide CSV or Parquet 'file' upload is required")
+                if (file_obj.filename or "").lower().endswith((".parquet", ".pq")):
+                    series = parse_parquet_columns(file_obj.file)
+                else:
+                    series = parse_wide_csv(file_obj.file)
+            else:
+                params = await request.json()
+                series = collect_series(params.get("series"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Input parsing error: {e}")
+    model_name = params.get("model")
+    transform_name = transform_param(params.get("transform"))
+    forecast_mode = params.get("mode") or "auto"
+    stream = str(params.get("stream", "false")).lower() in ("1", "true", "yes")
+    if params.get("horizon") is not None:
+        try:
+            horizon = int(params.get("horizon"))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Horizon must be an integer")
+    if not model_name:
+        raise HTTPException(status_code=400, detail="Model name is required")
+    with stage("load_model"):
+        await require_model(model_name)
+    set_labels(model=model_name, transform=transform_name)  # only once both are known to be valid
+    if not series:
+        raise HTTPException(status_code=400, detail="No series provided for forecast")
+    if len(series) > BATCH_FORECAST_MAX_SERIES:
+        raise HTTPException(status_code=413, detail=f"Too many series (max {BATCH_FORECAST_MAX_SERIES})")
+
+    model = models[model_name]
+    with stage("stack"):
+        ids, windows, errors = stack_windows(series, window_length(model))
+    del series
+
+    async def run_chunks():
+        for start in range(0, len(ids), BATCH_FORECAST_CHUNK):
+            chunk_ids = ids[start:start + BATCH_FORECAST_CHUNK]
+            forecasts, baselines = await run_timed(
+                inference_pool, "forecast_batch", forecast_batch, model, windows[start:start + len(chunk_ids)], horizon,
+                transform=transform_name, scaler=scaler, mode=forecast_mode,
+            )
+            yield chunk_ids, forecasts, baselines
+
+    if stream:
+        async def ndjson_lines():
+            for series_id, message in errors.items():
+                yield json.dumps({"id": series_id, "error": message}) + "\n"
+            try:
+                async for chunk_ids, forecasts, baselines in run_chunks():
+                    yield "".join(
+                        json.dumps({"id": sid, "forecast": f.tolist(), "baseline": b.tolist()}) + "\n"
+                        for sid, f, b in zip(chunk_ids, forecasts, baselines)
+                    )
+            except Exception as e:
+                yield json.dumps({"error": f"Model prediction failed during forecast: {e}"}) + "\n"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    results = {}
+    try:
+        async for chunk_ids, forecasts, baselines in run_chunks():
+            for sid, f, b in zip(chunk_ids, forecasts, baselines):
+                results[sid] = {"forecast": f.tolist(), "baseline": b.tolist()}
+    except PoolBusyError as e:
+        raise busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model prediction failed during forecast: {e}")
+    return {"results": results, "errors": errors}
+
+def scale_values(values):
+    """Scale raw readings with the loaded scaler (if any); returns a flat float32 array."""
+    arr = np.asarray(values, dtype=np.float32).reshape(-1, 1)
+    if scaler:
+        try:
+            arr = scaler.transform(arr)
+        except Exception as e:
+            print(f"Warning: scaler.transform failed (skipping scaling): {e}")
+    return np.asarray(arr, dtype=np.float32).reshape(-1)
+
+async def session_forecast(session):
+    """Forecast from a session's current window, or report how many readings are still needed."""
+    if not session.ready():
+        return {**session.info(), "needed": session.window - session.values.size}
+    forecasts, baselines = await inference_pool.run(
+        forecast_scaled, models[session.model_name], session.current_window(), session.horizon,
+        transform=session.transform, scaler=scaler, mode=session.mode,
+    )
+    return {**session.info(), "forecast": forecasts[0].tolist(), "baseline": baselines[0].tolist()}
+
+@app.websocket("/ws/forecast")
+async def forecast_session_socket(websocket: WebSocket):
+    """
+    Incremental forecasting session. Messages are JSON objects with an 'action':
+      - open:   {"action": "open", "model", "transform", "horizon", "mode", "data": [history]}
+      - resume: {"action": "resume", "session_id"}  (reattach after a reconnect)
+      - append: {"action": "append", "value": x} or {"action": "append", "values": [...]}
+      - close:  {"action": "close"}
+    After open, resume and every append the server replies with the updated forecast
+    (or with 'needed' while the window is still filling). Errors are sent as {"error": ...}
+    and leave the connection open.
+    """
+    await websocket.accept()
+    session = None
+    try:
+        while True:
+            msg = await websocket.receive_json()
+            action = msg.get("action") if isinstance(msg, dict) else None
+            try:
+                if action == "open":
+                    model_name = msg.get("model")
+                    if not model_name:
+                        raise ValueError("Model name is required")
+                    model = await require_model(model_name)
+                    window = window_length(model)
+                    if not window:
+                        raise ValueError(f"Model '{model_name}' has no fixed window length")
+                    session = forecast_sessions.create(
+                        model_name, window, transform=resolve_transform(msg.get("transform")),
+                        horizon=int(msg.get("horizon", 10)), mode=msg.get("mode") or "auto",
+                    )
+                    if msg.get("data"):
+                        session.append(scale_values(parse_input(data=msg["data"], keep_last=window)))
+                elif action == "resume":
+                    session = forecast_sessions.get(msg.get("session_id"))
+                    if session is None:
+                        raise ValueError("Unknown or expired session")
+                elif action == "append":
+                    if session is None:
+                        raise ValueError("No open session; send 'open' or 'resume' first")
+                    values = msg["values"] if "values" in msg else [msg.get("value")]
+                    session.append(scale_values(values))
+                elif action == "close":
+                    if session is not None:
+                        forecast_sessions.close(session.id)
+                    await websocket.close()
+                    return
+                else:
+                    raise ValueError(f"Unknown action '{action}'")
+                await websocket.send_json(await session_forecast(session))
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail})
+            except (ValueError, TypeError, KeyError) as e:
+                await websocket.send_json({"error": str(e)})
+            except Exception as e:
+                await websocket.send_json({"error": f"Model prediction failed during forecast: {e}"})
+    except WebSocketDisconnect:
+        # The session stays resumable until it goes idle
+        pass
+
+async def sweep_idle_sessions():
+    while True:
+        await asyncio.sleep(max(1.0, forecast_sessions.idle_timeout / 4))
+        forecast_sessions.evict_idle()
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    asyncio.get_running_loop().create_task(sweep_idle_sessions())
+
+def get_hf_pipeline():
+    """Create the HuggingFace fallback pipeline once, even when LLM workers race for it."""
     global hf_pipeline
-    question = req.question
-    shap_values = req.shap_values
+    with hf_pipeline_lock:
+        if hf_pipeline is None:
+            from transformers import pipeline
+            hf_pipeline = pipeline("text2text-generation", model=HF_MODEL_NAME)
+    return hf_pipeline
+
+def hf_generate(prompt):
+    """Blocking generation with the local HuggingFace pipeline (runs on the LLM pool)."""
+    result = get_hf_pipeline()(prompt)
+    if isinstance(result, list) and result:
+        return result[0].get('generated_text', '')
+    return str(result)
+
+async def generate_answer(prompt):
+    """
+    Full answer from Ollama if it is available, otherwise (or on any Ollama
+    error) from the local HuggingFace pipeline. Callers hold an LLM pool slot.
+    """
+    if await ollama.available():
+        try:
+            return await ollama.generate(prompt)
+        except Exception as e:
+            print(f"Warning: Ollama generation failed, falling back to HuggingFace: {e}")
+    return await llm_pool.submit(hf_generate, prompt)
+
+async def stream_answer(prompt):
+    """Yield answer tokens: streamed from Ollama when possible, else the whole HuggingFace answer at once."""
+    if await ollama.available():
+        started = False
+        try:
+            async for token in ollama.stream(prompt):
+                started = True
+                yield token
+            return
+        except Exception as e:
+            if started:
+                raise
+            print(f"Warning: Ollama streaming failed, falling back to HuggingFace: {e}")
+    yield await llm_pool.submit(hf_generate, prompt)
+
+def build_explain_prompt(question, shap_values):
     # Format SHAP values for the LLM prompt (e.g., "feature1: 0.5, feature2: -0.3, ...")
     if isinstance(shap_values, dict):
         shap_str = ", ".join([f"{k}: {v}" for k, v in shap_values.items()])
     else:
         shap_str = str(shap_values)
     # Construct a prompt that provides context and the user's question to the LLM
-    prompt = (f"Given the following SHAP feature contributions: {shap_str}\n"
-              f"Question: {question}\n"
-              "Answer:")
-    answer_text = ""
-    if OLLAMA_AVAILABLE:
-        # Use Ollama local LLM if available
+    return (f"Given the following SHAP feature contributions: {shap_str}\n"
+            f"Question: {question}\n"
+            "Answer:")
+
+@app.post("/explain")
+async def explain_endpoint(req: ExplainRequest):
+    """
+    Endpoint to get an AI-generated explanation for a prediction.
+    Expects a question and corresponding SHAP values in the request body.
+    With "stream": true the answer is sent as NDJSON lines {"token": ...} followed by {"done": true}.
+    Answers are cached by normalized question and rounded SHAP values.
+    """
+    with stage("cache"):
+        cache_key = prompt_cache_key(req.question, req.shap_values)
+        cached = explain_cache.get(cache_key)
+    if cached is not None:
+        if req.stream:
+            lines = [json.dumps({"token": cached}) + "\n", json.dumps({"done": True, "cached": True}) + "\n"]
+            return StreamingResponse(iter(lines), media_type="application/x-ndjson")
+        return {"answer": cached}
+
+    prompt = build_explain_prompt(req.question, req.shap_values)
+    if not req.stream:
         try:
-            payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
-            resp = requests.post(OLLAMA_URL, json=payload)
-            if resp.status_code == 200:
-                result = resp.json()
-                answer_text = result.get("response", "")
-                if not answer_text:
-                    raise RuntimeError("Empty response from LLM")
-            else:
-                raise RuntimeError(f"Ollama API error (status {resp.status_code})")
+            with stage("queue"):
+                await llm_pool.acquire()
+            failed = True
+            try:
+                with stage("generate"):
+                    answer_text = await generate_answer(prompt)
+                failed = False
+            finally:
+                llm_pool.release(failed)
+        except PoolBusyError as e:
+            raise busy_response(e)
+        explain_cache.put(cache_key, answer_text)
+        return {"answer": answer_text}
+
+    # Take the generation slot before responding, so a saturated queue still gets a 503
+    try:
+        await llm_pool.acquire()
+    except PoolBusyError as e:
+        raise busy_response(e)
+
+    outcome = {"failed": True}
+
+    async def ndjson_tokens():
+        parts = []
+        try:
+            async for token in stream_answer(prompt):
+                parts.append(token)
+                yield json.dumps({"token": token}) + "\n"
+            outcome["failed"] = False
+            explain_cache.put(cache_key, "".join(parts))
+            yield json.dumps({"done": True, "cached": False}) + "\n"
         except Exception as e:
-            # If any error with Ollama, fallback to HuggingFace
-            if hf_pipeline is None:
-                hf_pipeline = pipeline("text2text-generation", model=HF_MODEL_NAME)
-            result = hf_pipeline(prompt)
-            if isinstance(result, list) and result:
-                answer_text = result[0].get('generated_text', '')
-            else:
-                answer_text = str(result)
-    else:
-        # Use HuggingFace Transformers pipeline (local model) for explanation
-        if hf_pipeline is None:
-            hf_pipeline = pipeline("text2text-generation", model= HF_MODEL_NAME)
-        result = hf_pipeline(prompt)
-        if isinstance(result, list) and result:
-            answer_text = result[0].get('generated_text', '')
-        else:
-            answer_text = str(result)
-    return {"answer": answer_text}
+            yield json.dumps({"error": f"LLM generation failed: {e}"}) + "\n"
+
+    # The slot is released when the response ends, even if the body is never iterated
+    return ClosingStreamingResponse(ndjson_tokens(), on_close=lambda: llm_pool.release(outcome["failed"]),
+                                    media_type="application/x-ndjson")
 
 @app.post("/shap-summary")
 async def shap_summary(req: ShapRequest):
+    """
+    Per-timestep attributions for one input window. 'method' trades accuracy for speed:
+    'exact' (GradientExplainer), 'ig' (integrated gradients, 'steps' samples) or
+    'segment' (block occlusion, 'segments' blocks with the top 'refine' refined).
+    The response reports the method's latency and, with 'compare', its divergence from exact.
+    """
+    if req.method not in ATTRIBUTION_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method '{req.method}' (expected one of {ATTRIBUTION_METHODS})")
+    if not 1 <= req.steps <= SHAP_MAX_STEPS:
+        raise HTTPException(status_code=400, detail=f"'steps' must be between 1 and {SHAP_MAX_STEPS}")
+    if not 1 <= req.segments <= SHAP_MAX_SEGMENTS or not 0 <= req.refine <= req.segments:
+        raise HTTPException(status_code=400,
+                            detail=f"'segments' must be between 1 and {SHAP_MAX_SEGMENTS}, 'refine' between 0 and segments")
     model_name = req.model
-    transform_name = req.transform
+    transform_name = transform_param(req.transform)
     input_data = req.data
 
-    if model_name not in models or models[model_name] is None:
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not available")
+    with stage("load_model"):
+        await require_model(model_name)
+    set_labels(model=model_name, transform=transform_name)  # only once both are known to be valid
 
     # Parse and reshape input data
     try:
-        arr = parse_input(data=input_data)
+        with stage("parse"):
+            if req.series_id:
+                arr = await series_pool.run(stored_window, req.series_id, req.as_of, model_name)
+            else:
+                arr = parse_input(data=input_data)
+    except SeriesNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PoolBusyError as e:
+        raise busy_response(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Input parsing error: {e}")
     if arr.size == 0:
@@ -443,92 +1077,72 @@ async def shap_summary(req: ShapRequest):
     if arr.ndim != 2 or arr.shape[1] != 1:
         raise HTTPException(status_code=400, detail=f"Expected input shape (timesteps, 1), got {arr.shape}")
 
-    # Adjust input length to match model requirement
-    needed_len = None
+    # Trim to the model window, then scale and transform into a (1, timesteps, 1) float32 buffer
+    plan = preprocess_plan(model_name, transform_name)
     try:
-        shape = models[model_name].input_shape
-        if shape and len(shape) >= 3:
-            needed_len = shape[1]
-    except:
-        pass
-    if needed_len:
-        if arr.shape[0] < needed_len:
-            raise HTTPException(status_code=400, detail=f"Input too short, expected ≥ {needed_len}")
-        elif arr.shape[0] > needed_len:
-            arr = arr[-needed_len:]
+        series = plan.trim(arr)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Input too short, expected ≥ {plan.length}")
+    with plan.window(series) as arr_input:
+        t = plan.transform
+        # Identical inputs give identical explanations (fixed background and seed)
+        cache_key = hash_key(model_name, t, arr_input, req.method, req.steps, req.segments, req.refine, req.compare)
+        cached = shap_result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Queued behind other SHAP work: trade some accuracy for a shorter run
+        steps, compare, background_size, degraded = req.steps, req.compare, None, {}
+        if req.allow_degraded and admission_degraded():
+            if req.method == "exact":
+                background_size = degraded["background_size"] = SHAP_DEGRADED_BACKGROUND
+            elif req.method == "ig" and steps > SHAP_DEGRADED_STEPS:
+                steps = degraded["steps"] = SHAP_DEGRADED_STEPS
+            if compare:
+                compare = degraded["compare"] = False
+        if degraded:
+            cache_key = hash_key(cache_key, background_size, steps, compare)
+            cached = shap_result_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-    # Scale input
-    if scaler:
         try:
-            arr = scaler.transform(arr)
+            model_path = str(MODEL_DIR / MODEL_FILES[model_name])
+            attribution = await run_timed(
+                shap_pool, "attribution", compute_attribution, model_name, model_path, t, arr_input, method=req.method,
+                steps=steps, segments=req.segments, refine=req.refine, compare=compare,
+                background_size=background_size,
+            )
+        except PoolBusyError as e:
+            raise busy_response(e)
         except Exception as e:
-            print(f"Scaler transform failed: {e}")
-
-    # Apply transformation
-    if transform_name and transform_name.lower() != "none":
-        t = transform_name.lower()
-        arr_series = arr.flatten()
-        if t == 'dct':
-            arr_trans = apply_dct(arr_series)
-        elif t == 'dwt':
-            arr_trans = apply_dwt(arr_series)
-        elif t == 'cs':
-            arr_trans = apply_cs(arr_series)
-        else:
-            arr_trans = arr_series
-        arr = np.array(arr_trans, dtype=float).reshape(-1, 1)
-
-    # Final input shape for SHAP
-    arr_input = arr.reshape(1, arr.shape[0], 1).astype(np.float32)
-    # Create background data of same shape
-    L = arr_input.shape[1]
-    features = arr_input.shape[2]
-    background_data = np.random.normal(
-        loc=np.mean(arr_input), 
-        scale=np.std(arr_input) + 1e-6, 
-        size=(50, L, features)
-    ).astype(np.float32)
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"SHAP computation failed: {e}")
 
-    try:
-        model = models[model_name]
-        explainer = shap.GradientExplainer(model, background_data)
-        shap_result = explainer(arr_input)
-
-        # Handle base value safely
-        base_value = shap_result.base_values
-        if base_value is None:
-            base_value = 0.0
-        elif isinstance(base_value, (list, np.ndarray)):
-            base_value = float(np.array(base_value).flatten()[0])
-        else:
-            base_value = float(base_value)
-
-        # SHAP values
-        shap_vals = shap_result.values
-        if isinstance(shap_vals, list):
-            shap_vals = shap_vals[0]
-        shap_flat = np.array(shap_vals).flatten()
-
-        shap_dict = {f"Timestep t{i}": float(val) for i, val in enumerate(shap_flat)}
-        importance_dict = {f"Timestep t{i}": float(abs(val)) for i, val in enumerate(shap_flat)}
-
-        return {
-            "base_value": base_value,
-            "shap_values": shap_dict,
-            "feature_importance": importance_dict
-        }
+    shap_flat = attribution["values"]
+    shap_dict = {f"Timestep t{i}": float(val) for i, val in enumerate(shap_flat)}
+    importance_dict = {f"Timestep t{i}": float(abs(val)) for i, val in enumerate(shap_flat)}
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"SHAP computation failed: {e}")
+    result = {
+        "base_value": attribution["base_value"],
+        "shap_values": shap_dict,
+        "feature_importance": importance_dict,
+        "method": req.method,
+        "latency_ms": attribution["latency_ms"],
+    }
+    if "divergence" in attribution:
+        result["exact_latency_ms"] = attribution["exact_latency_ms"]
+        result["divergence"] = attribution["divergence"]
+    if degraded:
+        result["degraded"] = degraded
+    shap_result_cache.put(cache_key, result)
+    return result
 
 @app.get("/models")
 async def list_models():
-    """List available model names and transform options."""
-    available_models = [name for name, mdl in models.items() if mdl is not None]
-    transforms_list = ["DCT", "DWT", "CS"]
-    return {"models": available_models, "transforms": transforms_list}
+    """List available model names (loaded or loadable on first use), their load status and transform options."""
+    return {"models": models.names(), "transforms": TRANSFORM_NAMES, "model_status": models.info()}
 
 @app.get("/health")
 async def health_check():
@@ -536,22 +1150,202 @@ async def health_check():
     process = psutil.Process(os.getpid())
     mem_bytes = process.memory_info().rss
     mem_mb = mem_bytes / (1024 * 1024)
-    loaded_models = [name for name, mdl in models.items() if mdl is not None]
-    return {"memory_usage_mb": round(mem_mb, 2), "loaded_models": loaded_models}
+    return {
+        "memory_usage_mb": round(mem_mb, 2),
+        "loaded_models": models.loaded(),
+        "model_status": models.info(),
+        "predict_batching": predict_batcher.metrics() if PREDICT_BATCHING else None,
+        "pools": {pool.name: pool.metrics()
+                  for pool in (inference_pool, llm_pool, shap_pool, series_pool, feedback_pool)},
+        "result_cache": result_cache.metrics() if RESULT_CACHE else None,
+        "shap_result_cache": shap_result_cache.metrics(),
+        "forecast_sessions": forecast_sessions.metrics(),
+        "explain_cache": explain_cache.metrics(),
+        "feedback": feedback_store.metrics(),
+        "series_store": series_store.metrics(),
+        "admission": admission.metrics() if ADMISSION else None,
+    }
+
+@metrics_registry.add_collector
+def service_metrics():
+    """Export the cache, pool and batching counters that /health reports, for Prometheus."""
+    caches = {"explain": explain_cache.metrics(), "shap_result": shap_result_cache.metrics()}
+    if RESULT_CACHE:
+        for tier, stats in result_cache.metrics().items():
+            caches[f"result_{tier}"] = stats
+    pools = [pool.metrics() | {"name": pool.name}
+             for pool in (inference_pool, llm_pool, shap_pool, series_pool, feedback_pool)]
+    families = [
+        ("forecast_cache_hits_total", "counter", "Cache lookups that hit",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("forecast_cache_misses_total", "counter", "Cache lookups that missed",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("forecast_cache_entries", "gauge", "Entries currently cached",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("forecast_pool_jobs_total", "counter", "Pool jobs by outcome",
+         [({"pool": p["name"], "outcome": k}, p[k]) for p in pools for k in ("completed", "failed", "rejected")]),
+        ("forecast_pool_active", "gauge", "Jobs running on each pool",
+         [({"pool": p["name"]}, p["active"]) for p in pools]),
+        ("forecast_pool_waiting", "gauge", "Jobs waiting for a pool slot",
+         [({"pool": p["name"]}, p["waiting"]) for p in pools]),
+        ("forecast_feedback_written_total", "counter", "Feedback records written to disk",
+         [({}, feedback_store.metrics()["written"])]),
+        ("forecast_sessions_active", "gauge", "Open /ws/forecast sessions",
+         [({}, forecast_sessions.metrics()["active"])]),
+        ("process_resident_memory_bytes", "gauge", "Resident set size",
+         [({}, psutil.Process(os.getpid()).memory_info().rss)]),
+    ]
+    if ADMISSION:
+        classes = admission.metrics()
+        families += [
+            ("forecast_admission_admitted_total", "counter", "Requests admitted per cost class",
+             [({"class": name}, c["admitted"]) for name, c in classes.items()]),
+            ("forecast_admission_degraded_total", "counter", "Requests admitted after queueing, served degraded",
+             [({"class": name}, c["degraded"]) for name, c in classes.items()]),
+            ("forecast_admission_rejected_total", "counter", "Requests shed per cost class and reason",
+             [({"class": name, "reason": reason}, c[key]) for name, c in classes.items()
+              for reason, key in (("queue_full", "rejected_queue_full"), ("deadline", "rejected_deadline"),
+                                  ("expired", "expired"))]),
+            ("forecast_admission_waiting", "gauge", "Requests queued per cost class",
+             [({"class": name}, c["waiting"]) for name, c in classes.items()]),
+        ]
+    if PREDICT_BATCHING:
+        batching = predict_batcher.metrics()
+        families.append(("forecast_predict_batches_total", "counter", "Micro-batches run for /predict",
+                         [({}, batching["batches"])]))
+    return families
+
+@app.get("/metrics")
+async def metrics():
+    """Stage timings, error counts and cache/pool counters in Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
-# In-memory storage for feedback submissions
-feedback_store = []
+@app.on_event("shutdown")
+async def shutdown_pools():
+    await ollama.close()
+    for pool in (inference_pool, llm_pool, shap_pool, series_pool, feedback_pool):
+        pool.shutdown()
+    feedback_store.close()
+    series_store.close()
+    if models.remote is not None:
+        models.remote.close()
 
 @app.post("/feedback")
 async def submit_feedback(feedback: FeedbackRequest):
     """
     Endpoint to submit feedback about model accuracy or predictions.
-    Stores feedback in memory (could be extended to a database or file).
+    The record is queued for the background writer, so this never waits on disk.
+    """
+    try:
+        record = feedback_store.submit(feedback.model, feedback.feedback)
+    except FeedbackBacklogError as e:
+        raise busy_response(e)
+    return {"status": "success", "message": "Feedback recorded", "feedback_id": record["id"]}
+
+def parse_time(value):
+    """Unix seconds or an ISO 8601 timestamp, for feedback time filters."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        from datetime import datetime
+        return datetime.fromisoformat(value).timestamp()
+
+@app.get("/feedback")
+async def list_feedback(model: str = None, since: str = None, until: str = None, limit: int = 100, cursor: str = None):
+    """
+    Page through stored feedback, oldest first, optionally filtered by model and by
+    time range [since, until) (unix seconds or ISO 8601). Pass the returned
+    'next_cursor' as 'cursor' to get the next page; it is null on the last page.
+    """
+    try:
+        records, next_cursor = await feedback_pool.run(
+            feedback_store.query, model=model, since=parse_time(since), until=parse_time(until), limit=limit,
+            cursor=cursor,
+        )
+    except PoolBusyError as e:
+        raise busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+    return {"feedback": records, "next_cursor": next_cursor}
+
+def ingest_rows(series_id, file=None, times=None, values=None):
+    """Parse a CSV upload (or take the given timestamps/values) and append the rows to a stored series."""
+    if file is not None:
+        times, values = parse_timed_csv(file)
+    return series_store.append(series_id, to_millis(times), values)
+
+@app.post("/series/{series_id}")
+async def ingest_series(series_id: str, request: Request):
+    """
+    Append rows to a stored series, creating it on first use. Send a multipart 'file'
+    (CSV: timestamp first column, value last) or JSON {"timestamps": [...], "values": [...]},
+    timestamps in unix seconds or ISO 8601. Rows older than the stored end are merged at
+    the next compaction. /predict, /forecast and /shap-summary then take 'series_id' (and
+    optionally 'as_of') instead of data.
     """
-    fb_entry = feedback.dict()
-    feedback_store.append(fb_entry)
-    return {"status": "success", "message": "Feedback recorded", "feedback_id": len(feedback_store)}
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            file_obj = form.get("file")
+            if file_obj is None or not hasattr(file_obj, "file"):
+                raise ValueError("Expected a CSV 'file' upload")
+            return await series_pool.run(ingest_rows, series_id, file=file_obj.file)
+        body = await request.json()
+        times, values = body.get("timestamps"), body.get("values")
+        if times is None or values is None:
+            raise ValueError("Expected 'timestamps' and 'values'")
+        return await series_pool.run(ingest_rows, series_id, times=times, values=values)
+    except PoolBusyError as e:
+        raise busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not store series: {e}")
+
+@app.get("/series")
+async def list_series():
+    """IDs of the stored series."""
+    try:
+        return {"series": await series_pool.run(series_store.list)}
+    except PoolBusyError as e:
+        raise busy_response(e)
+
+@app.get("/series/{series_id}")
+async def series_info(series_id: str):
+    """Length, first/last timestamp (unix ms) and rows awaiting compaction of a stored series."""
+    try:
+        return await series_pool.run(series_store.info, series_id)
+    except PoolBusyError as e:
+        raise busy_response(e)
+    except SeriesNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from ml import model_server
+
+    parser = argparse.ArgumentParser(description="Run the forecasting API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-model-server", action="store_true",
+                        help="with --workers > 1, let every worker load its own models")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.no_model_server and not MODEL_SERVER:
+        server, address, authkey = model_server.start(MODEL_FILES, os.environ.get("MODEL_ENGINES", ""))
+        os.environ["MODEL_SERVER"] = address
+        os.environ[model_server.AUTHKEY_ENV] = authkey
+        try:
+            uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+        finally:
+            server.terminate()
+            server.wait()
+    elif args.workers > 1:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,188 @@
+"""
+Admission control by endpoint cost class.
+
+Every class (cheap model calls, batch forecasts, SHAP, LLM explanations)
+has a concurrency budget and a FIFO of requests waiting for it. A request
+that cannot start at once is only queued if its estimated wait (queue
+position over the budget, times a moving average of the class's service
+time) fits in its deadline; otherwise, or when the queue is full, it is
+rejected straight away with a Retry-After hint, instead of piling up CPU
+and memory behind the work already running. Requests admitted while the
+class is congested are marked degraded, so handlers can pick a cheaper
+variant of the work.
+"""
+import asyncio
+import collections
+import contextvars
+import math
+import time
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint in seconds."""
+
+    def __init__(self, message, status=503, retry_after=1.0):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+_ticket = contextvars.ContextVar("admission_ticket", default=None)
+
+
+def degraded():
+    """True inside a request that was admitted while its cost class was congested."""
+    ticket = _ticket.get()
+    return ticket is not None and ticket.degraded
+
+
+class Ticket:
+    """One admitted request: release it when the request finishes."""
+
+    def __init__(self, cost_class, waited_s, degraded):
+        self.cost_class = cost_class
+        self.waited_s = waited_s
+        self.degraded = degraded
+        self.started = time.perf_counter()
+
+
+class CostClass:
+    """
+    Concurrency budget (`max_concurrent`) plus a bounded FIFO (`max_queue`)
+    for one class of endpoints. `deadline` is the default time a request may
+    wait (seconds), `expected_s` the service time assumed until real ones
+    have been measured. Meant to be used from one event loop.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue=64, deadline=10.0, expected_s=0.05):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.deadline = float(deadline)
+        self._service_s = float(expected_s)
+        self._active = 0
+        self._queue = collections.deque()
+        self._stats = {"admitted": 0, "degraded": 0, "rejected_queue_full": 0, "rejected_deadline": 0,
+                       "expired": 0}
+
+    def estimated_wait(self, ahead=None):
+        """Seconds until a request joining the queue now (or behind `ahead` others) would start."""
+        ahead = len(self._queue) if ahead is None else ahead
+        if self._active < self.max_concurrent and ahead == 0:
+            return 0.0
+        return math.ceil((ahead + 1) / self.max_concurrent) * self._service_s
+
+    def _reject(self, reason, message, status):
+        self._stats[reason] += 1
+        retry_after = max(1.0, self.estimated_wait())
+        raise AdmissionRejected(f"{self.name}: {message}", status=status, retry_after=retry_after)
+
+    async def admit(self, deadline=None):
+        """
+        Wait for a slot and return a Ticket, or raise AdmissionRejected: 429
+        when the queue is full, 503 when the deadline (seconds; default the
+        class's) cannot be met or passes while waiting.
+        """
+        deadline = self.deadline if deadline is None else max(0.0, float(deadline))
+        if self._active < self.max_concurrent and not self._queue:
+            self._active += 1
+            self._stats["admitted"] += 1
+            return Ticket(self, 0.0, False)
+        if len(self._queue) >= self.max_queue:
+            self._reject("rejected_queue_full", f"queue full ({len(self._queue)} waiting)", 429)
+        estimate = self.estimated_wait()
+        if estimate > deadline:
+            self._reject("rejected_deadline",
+                         f"estimated wait {estimate * 1000:.0f} ms exceeds deadline {deadline * 1000:.0f} ms", 503)
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), deadline)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self._stats["expired"] += 1
+            raise AdmissionRejected(f"{self.name}: no slot within {deadline * 1000:.0f} ms",
+                                    status=503, retry_after=max(1.0, self.estimated_wait()))
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self._stats["admitted"] += 1
+        self._stats["degraded"] += 1
+        return Ticket(self, time.perf_counter() - t0, True)
+
+    def _abandon(self, waiter):
+        """Drop a waiter that gave up; if a slot was handed to it meanwhile, pass the slot on."""
+        if waiter.done() and not waiter.cancelled():
+            self._handoff()
+            return
+        waiter.cancel()
+        try:
+            self._queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def _handoff(self):
+        """Give a finished request's slot to the next live waiter, or free it."""
+        while self._queue:
+            waiter = self._queue.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def release(self, ticket):
+        # Exponential moving average of service time, for the wait estimate
+        elapsed = time.perf_counter() - ticket.started
+        self._service_s += 0.2 * (elapsed - self._service_s)
+        self._handoff()
+
+    def metrics(self):
+        return self._stats | {
+            "active": self._active,
+            "waiting": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "deadline_ms": round(self.deadline * 1000.0, 1),
+            "service_ms": round(self._service_s * 1000.0, 3),
+            "estimated_wait_ms": round(self.estimated_wait() * 1000.0, 3),
+        }
+
+
+class AdmissionController:
+    """Cost classes by name and the class of each endpoint path; paths not listed are not limited."""
+
+    def __init__(self, classes, routes):
+        self.classes = {c.name: c for c in classes}
+        self.routes = dict(routes)
+
+    def cost_class(self, path):
+        name = self.routes.get(path)
+        return self.classes.get(name) if name else None
+
+    async def admit(self, path, deadline=None):
+        """Ticket for a request to `path` (None for unlimited paths), made current for degraded()."""
+        cost_class = self.cost_class(path)
+        if cost_class is None:
+            return None
+        ticket = await cost_class.admit(deadline)
+        _ticket.set(ticket)
+        return ticket
+
+    def release(self, ticket):
+        if ticket is not None:
+            ticket.cost_class.release(ticket)
+
+    def metrics(self):
+        return {name: c.metrics() for name, c in self.classes.items()}
+
+
+def parse_class_spec(spec, cast=float):
+    """Parse "shap=2,llm=4" style settings into {class_name: value}."""
+    values = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        values[name.strip()] = cast(value)
+    return values
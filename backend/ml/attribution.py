@@ -0,0 +1,94 @@
+"""
+Cheaper per-timestep attribution methods for /shap-summary, as alternatives
+to the exact GradientExplainer in ml/shap_worker.py. Both use the mean of the
+model's seeded SHAP background as the reference ("absent") input, so their
+attributions sum to roughly f(x) - f(reference), like SHAP values.
+"""
+import numpy as np
+
+METHODS = ["exact", "ig", "segment"]
+
+
+def integrated_gradients(model, x, reference, steps=32):
+    """
+    Integrated gradients along the straight path from `reference` to `x`
+    (both (1, L, 1)), using `steps` midpoint samples evaluated in a single
+    batched forward/backward pass. Returns (base_value, (L,) attributions).
+    """
+    import tensorflow as tf
+    steps = max(1, int(steps))
+    alphas = ((np.arange(steps, dtype=np.float32) + 0.5) / steps).reshape(-1, 1, 1)
+    path = tf.constant(reference + alphas * (x - reference))  # (steps, L, 1)
+    with tf.GradientTape() as tape:
+        tape.watch(path)
+        outputs = model(path, training=False)
+        target = tf.reduce_sum(tf.reshape(outputs, (steps, -1))[:, 0])
+    grads = tape.gradient(target, path).numpy()
+    attributions = (x - reference)[0, :, 0] * grads.mean(axis=0)[:, 0]
+    base_value = float(np.asarray(model(tf.constant(reference), training=False)).reshape(-1)[0])
+    return base_value, attributions
+
+
+def segment_attributions(model, x, reference, segments=8, refine=2):
+    """
+    Coarse-to-fine occlusion. The window is split into `segments` blocks of
+    timesteps; each block's attribution is the drop in output when that block
+    is replaced by the reference (one batched forward pass). The `refine`
+    blocks with the largest |attribution| are then split per timestep with a
+    second batched pass, and the per-timestep values are rescaled to sum to
+    the block's attribution. Other blocks share theirs evenly.
+    Returns (base_value, (L,) attributions).
+    """
+    import tensorflow as tf
+    length = x.shape[1]
+    bounds = np.linspace(0, length, min(max(1, int(segments)), length) + 1).astype(int)
+    blocks = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+    def outputs(batch):
+        return np.asarray(model(tf.constant(batch), training=False)).reshape(batch.shape[0], -1)[:, 0]
+
+    # Pass 1: the full input, the reference, and one occluded copy per block
+    batch = np.repeat(x, len(blocks) + 2, axis=0)
+    batch[1] = reference[0]
+    for i, (lo, hi) in enumerate(blocks):
+        batch[i + 2, lo:hi] = reference[0, lo:hi]
+    out = outputs(batch)
+    fx, base_value = out[0], float(out[1])
+    block_attr = fx - out[2:]
+
+    attributions = np.empty(length, dtype=np.float32)
+    for (lo, hi), a in zip(blocks, block_attr):
+        attributions[lo:hi] = a / (hi - lo)
+
+    # Pass 2: per-timestep occlusion inside the most important blocks
+    top = np.argsort(-np.abs(block_attr))[:max(0, int(refine))]
+    timesteps = [t for b in top for t in range(*blocks[b])]
+    if timesteps:
+        batch = np.repeat(x, len(timesteps), axis=0)
+        for row, t in enumerate(timesteps):
+            batch[row, t] = reference[0, t]
+        per_step = dict(zip(timesteps, fx - outputs(batch)))
+        for b in top:
+            lo, hi = blocks[b]
+            fine = np.array([per_step[t] for t in range(lo, hi)], dtype=np.float32)
+            total = fine.sum()
+            if abs(total) > 1e-12:
+                attributions[lo:hi] = fine * (block_attr[b] / total)
+    return base_value, attributions
+
+
+def divergence(approx, exact):
+    """How far approximate attributions are from the exact ones."""
+    approx = np.asarray(approx, dtype=np.float64)
+    exact = np.asarray(exact, dtype=np.float64)
+    denom = np.abs(exact).sum() or 1.0
+    # Spearman rank correlation of |attribution|, i.e. agreement on which timesteps matter
+    ra = np.argsort(np.argsort(-np.abs(approx)))
+    re = np.argsort(np.argsort(-np.abs(exact)))
+    n = len(exact)
+    spearman = 1.0 - 6.0 * float(((ra - re) ** 2).sum()) / (n * (n * n - 1)) if n > 1 else 1.0
+    return {
+        "relative_l1": float(np.abs(approx - exact).sum() / denom),
+        "max_abs": float(np.abs(approx - exact).max()) if n else 0.0,
+        "rank_correlation": spearman,
+    }
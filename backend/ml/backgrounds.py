@@ -0,0 +1,125 @@
+"""
+Fixed SHAP background sets, one per model, stored as <model>_background.npy
+next to the <model>_explainer.save artifacts and committed with them.
+Backgrounds are kept in scaled (pre-transform) space so the same file serves
+every transform. They are built offline and only read at request time; a
+missing or mismatched file is an error, not something to regenerate.
+
+Build them from the backend directory with:
+    python -m ml.backgrounds [--history train.csv] [--size 50]
+With --history, evenly spaced windows of the scaled training series are
+used. Otherwise each model gets the background its explainer artifact was
+fitted on, or, when that artifact holds none, the background of another
+model's artifact with the same window length (scaled inputs are the same
+space for every model).
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+MODEL_DIR = Path(__file__).resolve().parent / 'models'
+BACKGROUND_SIZE = 50
+
+
+class MissingBackgroundError(FileNotFoundError):
+    """Raised when a model has no usable precomputed SHAP background."""
+
+
+def background_path(model_dir, model_name):
+    return Path(model_dir) / f"{model_name}_background.npy"
+
+
+def load_background(model_dir, model_name, length):
+    """The precomputed (size, length) float32 background for a model; MissingBackgroundError if absent or mismatched."""
+    path = background_path(model_dir, model_name)
+    try:
+        background = np.load(path)
+    except FileNotFoundError:
+        raise MissingBackgroundError(
+            f"No SHAP background for '{model_name}' at {path}; build it with python -m ml.backgrounds")
+    if background.ndim != 2 or background.shape[1] != length:
+        raise MissingBackgroundError(
+            f"SHAP background {path.name} has shape {background.shape}, model '{model_name}' needs (n, {length}); "
+            "rebuild it with python -m ml.backgrounds")
+    return background.astype(np.float32, copy=False)
+
+
+def explainer_background(path):
+    """The background an explainer artifact was fitted on, as (n, L) float32, or None if it has none."""
+    import joblib
+    try:
+        explainer = joblib.load(path)
+    except Exception as e:
+        print(f"Warning: could not read {Path(path).name}: {e}")
+        return None
+    data = getattr(getattr(explainer, "explainer", explainer), "data", None)
+    if isinstance(data, (list, tuple)):
+        data = data[0] if data else None
+    if data is None or callable(data):
+        return None
+    data = np.asarray(data, dtype=np.float32)
+    return data.reshape(data.shape[0], -1)
+
+
+def history_background(history_path, scaler, length, size=BACKGROUND_SIZE):
+    """`size` evenly spaced windows of the scaled training series in a CSV (value in the last column)."""
+    from ml.parsing import parse_csv_stream
+    with open(history_path, "rb") as f:
+        series = parse_csv_stream(f)
+    scaled = scaler.transform(series).reshape(-1).astype(np.float32)
+    if scaled.shape[0] < length:
+        raise ValueError(f"{history_path} has {scaled.shape[0]} values, need at least {length}")
+    starts = np.linspace(0, scaled.shape[0] - length, num=size).astype(np.int64)
+    return np.stack([scaled[s:s + length] for s in starts])
+
+
+def save_background(path, background):
+    # Write then rename, so a running server never reads a half-written file
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, background.astype(np.float32))
+    os.replace(tmp_path, path)
+
+
+def main():
+    from tensorflow import keras
+    parser = argparse.ArgumentParser(description="Build the SHAP background sets")
+    parser.add_argument("--history", help="training CSV to take background windows from")
+    parser.add_argument("--size", type=int, default=BACKGROUND_SIZE)
+    args = parser.parse_args()
+
+    lengths = {}
+    for model_path in sorted(MODEL_DIR.glob("*_model.h5")):
+        name = model_path.name[:-len("_model.h5")]
+        lengths[name] = keras.models.load_model(str(model_path), compile=False).input_shape[1]
+
+    backgrounds = {}
+    if args.history:
+        import joblib
+        scaler = joblib.load(str(MODEL_DIR / 'scaler.save'))
+        for name, length in lengths.items():
+            backgrounds[name] = (history_background(args.history, scaler, length, args.size), Path(args.history).name)
+    else:
+        for name, length in lengths.items():
+            background = explainer_background(MODEL_DIR / f"{name}_explainer.save")
+            if background is not None and background.shape[1] == length:
+                backgrounds[name] = (background[:args.size], f"{name}_explainer.save")
+        for name, length in lengths.items():
+            if name not in backgrounds:
+                donor = next((d for d, (b, _) in backgrounds.items() if b.shape[1] == length), None)
+                if donor is not None:
+                    backgrounds[name] = backgrounds[donor]
+
+    missing = sorted(set(lengths) - set(backgrounds))
+    for name, (background, source) in sorted(backgrounds.items()):
+        save_background(background_path(MODEL_DIR, name), background)
+        print(f"{name}: {background.shape} from {source} -> {background_path(MODEL_DIR, name).name}")
+    if missing:
+        print(f"No background source for {', '.join(missing)}; pass --history with the training data")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Offline rolling-origin backtest of the bundled models across transforms.
+
+Reads a historical series (CSV in the same layouts /forecast accepts, or one
+column of a Parquet file), builds every rolling-origin window as a strided
+view (no copies), and forecasts them in large batches with the same scaling,
+transform and rollout code as /forecast. Writes per-origin MAE/RMSE/MAPE to a
+columnar file (Parquet with pyarrow, otherwise compressed .npz) and a
+throughput report (windows per second) next to it as JSON. With
+--save-residuals the one-step errors (in scaled units) are also saved per
+(model, transform) for bootstrap prediction intervals (see ml/uncertainty.py).
+
+Run from the backend directory:
+    python -m ml.backtest history.csv --out results.parquet \
+        [--models lstm,cnn_lstm,transformer] [--transforms none,dct,dwt,cs] \
+        [--horizon 24] [--stride 1] [--batch-size 4096] [--workers 4] [--save-residuals]
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ml.forecasting import forecast_batch, window_length
+from ml.parsing import parse_csv_stream, parse_parquet_columns
+from ml.preprocessing import scaler_affine
+from ml.transforms import resolve_transform
+from ml.uncertainty import residuals_path
+
+MODEL_DIR = Path(__file__).resolve().parent / 'models'
+MAX_RESIDUALS = 100_000
+
+# Per worker process: models and scaler loaded once
+_models = {}
+_scaler = None
+
+
+def _load(model_name, engine="keras"):
+    global _scaler
+    if _scaler is None:
+        import joblib
+        try:
+            _scaler = joblib.load(str(MODEL_DIR / 'scaler.save'))
+        except Exception:
+            _scaler = False
+    key = (model_name, engine)
+    if key not in _models:
+        from ml.engines import load_engine
+        _models[key] = load_engine(engine, MODEL_DIR, model_name, f"{model_name}_model.h5")
+    return _models[key], (_scaler or None)
+
+
+def load_series(path, column=None):
+    """Read the target series as a flat float32 array."""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        with open(path, "rb") as f:
+            columns = parse_parquet_columns(f)
+        if not columns:
+            raise ValueError(f"No numeric columns in {path}")
+        name = column or list(columns)[-1]
+        return columns[name]
+    with open(path, "rb") as f:
+        return parse_csv_stream(f).reshape(-1)
+
+
+def rolling_windows(series, length, horizon, stride=1):
+    """
+    (inputs, targets) views of shape (origins, length) and (origins, horizon)
+    for every origin spaced `stride` apart. Both share the series' memory.
+    """
+    views = np.lib.stride_tricks.sliding_window_view(series, length + horizon)[::stride]
+    return views[:, :length], views[:, length:]
+
+
+def error_metrics(forecasts, targets):
+    """Per-origin MAE, RMSE and MAPE (percent, ignoring zero targets)."""
+    err = forecasts - targets
+    mae = np.abs(err).mean(axis=1)
+    rmse = np.sqrt((err ** 2).mean(axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(targets != 0, np.abs(err / targets), np.nan)
+    mape = np.nanmean(pct, axis=1) * 100.0 if pct.size else np.empty(0)
+    return mae.astype(np.float32), rmse.astype(np.float32), mape.astype(np.float32)
+
+
+def run_shard(model_name, transform, series, length, horizon, stride, batch_size, engine="keras"):
+    """
+    Backtest one contiguous slice of the series for one (model, transform).
+    Runs in a worker process when --workers > 1. Returns (mae, rmse, mape,
+    residuals, seconds); residuals are the one-step errors in scaled units.
+    """
+    model, scaler = _load(model_name, engine)
+    inputs, targets = rolling_windows(series, length, horizon, stride)
+    n = inputs.shape[0]
+    mae, rmse, mape, residuals = (np.empty(n, dtype=np.float32) for _ in range(4))
+    affine = scaler_affine(scaler)
+    mul = affine[0] if affine is not None else np.ones(1, dtype=np.float32)
+    t0 = time.perf_counter()
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        forecasts, _ = forecast_batch(model, inputs[start:stop], horizon, transform=transform, scaler=scaler)
+        mae[start:stop], rmse[start:stop], mape[start:stop] = error_metrics(forecasts, targets[start:stop])
+        residuals[start:stop] = (targets[start:stop, 0] - forecasts[:, 0]) * mul
+    return mae, rmse, mape, residuals, time.perf_counter() - t0
+
+
+def shard_bounds(n_origins, shards):
+    """Split origin indices into contiguous shards; returns (first_origin, origin_count) pairs."""
+    edges = np.linspace(0, n_origins, max(1, shards) + 1).astype(int)
+    return [(int(a), int(b - a)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def write_results(out_path, columns):
+    out_path = Path(out_path)
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(columns), out_path.with_suffix(".parquet"), compression="zstd")
+        return out_path.with_suffix(".parquet")
+    except ImportError:
+        np.savez_compressed(out_path.with_suffix(".npz"), **columns)
+        return out_path.with_suffix(".npz")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the bundled models")
+    parser.add_argument("data", help="historical CSV or Parquet file")
+    parser.add_argument("--column", help="Parquet column to use (default: last numeric column)")
+    parser.add_argument("--out", default="backtest_results.parquet")
+    parser.add_argument("--models", default="lstm,cnn_lstm,transformer")
+    parser.add_argument("--transforms", default="none,dct,dwt,cs")
+    parser.add_argument("--engine", default="keras")
+    parser.add_argument("--horizon", type=int, default=24)
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--save-residuals", action="store_true",
+                        help="save one-step residuals per model/transform for /forecast prediction intervals")
+    args = parser.parse_args()
+    # Fail before loading anything: an unknown name would otherwise run as 'none'
+    try:
+        transforms = [resolve_transform(t.strip()) for t in args.transforms.split(",") if t.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    series = load_series(args.data, args.column)
+    print(f"series: {series.shape[0]} values")
+    columns = {k: [] for k in ("model", "transform", "origin", "mae", "rmse", "mape")}
+    report = {"data": str(args.data), "horizon": args.horizon, "stride": args.stride, "runs": []}
+    pool = None
+    if args.workers > 1:
+        pool = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for model_name in [m.strip() for m in args.models.split(",") if m.strip()]:
+            length = window_length(_load(model_name, args.engine)[0])
+            n_origins = max(0, (series.shape[0] - length - args.horizon) // args.stride + 1)
+            for transform in transforms:
+                t0 = time.perf_counter()
+                # Each shard gets only the slice of the series its origins need
+                jobs = []
+                for first, count in shard_bounds(n_origins, args.workers):
+                    lo = first * args.stride
+                    hi = lo + (count - 1) * args.stride + length + args.horizon
+                    shard_args = (model_name, transform, series[lo:hi], length, args.horizon,
+                                  args.stride, args.batch_size, args.engine)
+                    jobs.append((first, pool.submit(run_shard, *shard_args) if pool else run_shard(*shard_args)))
+                run_mae, run_rmse, run_residuals = [], [], []
+                for first, job in jobs:
+                    mae, rmse, mape, residuals, _ = job.result() if pool else job
+                    run_residuals.append(residuals)
+                    run_mae.append(mae)
+                    run_rmse.append(rmse)
+                    columns["model"] += [model_name] * mae.shape[0]
+                    columns["transform"] += [transform] * mae.shape[0]
+                    columns["origin"].append(np.arange(first, first + mae.shape[0], dtype=np.int64) * args.stride)
+                    columns["mae"].append(mae)
+                    columns["rmse"].append(rmse)
+                    columns["mape"].append(mape)
+                elapsed = time.perf_counter() - t0
+                run = {
+                    "model": model_name,
+                    "transform": transform,
+                    "windows": n_origins,
+                    "seconds": round(elapsed, 3),
+                    "windows_per_second": round(n_origins / elapsed, 1) if elapsed else None,
+                    "mean_mae": float(np.concatenate(run_mae).mean()) if n_origins else None,
+                    "mean_rmse": float(np.concatenate(run_rmse).mean()) if n_origins else None,
+                }
+                if args.save_residuals and n_origins:
+                    pool_values = np.concatenate(run_residuals)
+                    if pool_values.size > MAX_RESIDUALS:
+                        pool_values = np.random.default_rng(0).choice(pool_values, MAX_RESIDUALS, replace=False)
+                    path = residuals_path(MODEL_DIR, model_name, transform)
+                    np.save(path, pool_values.astype(np.float32))
+                    run["residuals"] = str(path)
+                report["runs"].append(run)
+                print(f"{model_name:>12} {transform:>5}: {n_origins} windows in {elapsed:.2f}s "
+                      f"({run['windows_per_second']} windows/s), MAE {run['mean_mae']}")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    arrays = {
+        "model": np.array(columns["model"]),
+        "transform": np.array(columns["transform"]),
+        "origin": np.concatenate(columns["origin"]) if columns["origin"] else np.empty(0, dtype=np.int64),
+    }
+    for key in ("mae", "rmse", "mape"):
+        arrays[key] = np.concatenate(columns[key]) if columns[key] else np.empty(0, dtype=np.float32)
+    out = write_results(args.out, arrays)
+    report_path = out.with_suffix(".report.json")
+    report_path.write_text(json.dumps(report, indent=2))
+    print(f"wrote {out} and {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+
+
+class QueueFullError(Exception):
+    """Raised when a batcher queue already holds `max_queue` pending requests."""
+
+
+class MicroBatcher:
+    """
+    Dynamic request batcher for single-window inference.
+
+    Concurrent callers `submit` one (timesteps, 1) window under a key such as
+    (model, timesteps); windows arrive already transformed, so requests that
+    differ only in transform share a batch. A worker task per key collects
+    windows until `max_batch_size` is reached or `max_wait_ms` has passed since
+    the first one arrived, runs them as a single (N, timesteps, 1) batch
+    through `run_batch` and hands each caller its own row of the result.
+    """
+
+    def __init__(self, run_batch, max_batch_size=32, max_wait_ms=5.0, max_queue=1024):
+        # run_batch: async callable (key, np.ndarray of shape (N, L, 1)) -> array of shape (N, k)
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self._queues = {}
+        self._workers = {}
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "rejected": 0,
+            "errors": 0,
+            "max_batch_seen": 0,
+            "max_queue_depth_seen": 0,
+        }
+
+    async def submit(self, key, window):
+        """Queue one window and wait for its model output (a 1-D array)."""
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.get_running_loop().create_task(self._worker(key, queue))
+        if queue.qsize() >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise QueueFullError(f"Inference queue for {key[0]} is full ({self.max_queue} pending)")
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((window, future))
+        self._stats["requests"] += 1
+        self._stats["max_queue_depth_seen"] = max(self._stats["max_queue_depth_seen"], queue.qsize())
+        return await future
+
+    async def _worker(self, key, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch_size:
+                if not queue.empty():
+                    items.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Callers that gave up (e.g. client disconnect) do not need a slot
+            items = [(w, f) for w, f in items if not f.done()]
+            if not items:
+                continue
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(items))
+            try:
+                batch = np.stack([np.asarray(w, dtype=np.float32) for w, _ in items])
+                outputs = await self.run_batch(key, batch)
+            except Exception as e:
+                self._stats["errors"] += 1
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), out in zip(items, outputs):
+                if not future.done():
+                    future.set_result(out)
+
+    def metrics(self):
+        """Counters and current queue depths, suitable for /health."""
+        stats = dict(self._stats)
+        stats["avg_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["queue_depth"] = {"/".join(str(k) for k in key): q.qsize() for key, q in self._queues.items()}
+        stats["config"] = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue": self.max_queue,
+        }
+        return stats
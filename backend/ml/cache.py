@@ -0,0 +1,212 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def hash_key(*parts):
+    """Stable hex digest of strings, numbers and array/bytes buffers."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        elif hasattr(part, "tobytes"):
+            h.update(str(part.dtype).encode())
+            h.update(str(part.shape).encode())
+            h.update(part.tobytes())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and by an
+    approximate byte budget (callers pass each entry's size to `put`).
+    With `ttl` (seconds) set, entries also expire that long after being stored.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, ttl=None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, nbytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                del self._data[key]
+                self._bytes -= entry[1]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=0):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (value, nbytes, expires_at)
+            self._bytes += nbytes
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, size, _) = self._data.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def metrics(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCache:
+    """
+    Cache of JSON-serialisable values in a local SQLite file, so several
+    uvicorn workers on one host can share results. Entries expire after
+    `ttl` seconds; when the stored total exceeds `max_bytes` the least
+    recently used entries are deleted.
+    """
+
+    def __init__(self, path, ttl=None, max_bytes=None):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB, nbytes INTEGER, expires REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self._conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value, nbytes=None):
+        blob = json.dumps(value).encode()
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, nbytes, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), expires, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self.evictions += self._conn.execute("DELETE FROM cache WHERE expires <= ?", (now,)).rowcount
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until the budget is met
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, nbytes FROM cache ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def metrics(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM cache").fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ResultCache:
+    """
+    Response cache for inference endpoints: an in-process LRU, optionally
+    backed by a shared SQLiteCache. Local misses fall through to the shared
+    store, and shared hits are copied into the local LRU.
+    """
+
+    def __init__(self, ttl=60.0, max_bytes=64 * 1024 * 1024, max_entries=100_000, shared=None):
+        self.local = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.shared = shared
+
+    @classmethod
+    def from_spec(cls, backend, ttl, max_bytes):
+        """Build from RESULT_CACHE_BACKEND: 'memory' or 'sqlite:<path>'."""
+        shared = None
+        if backend.startswith("sqlite:"):
+            shared = SQLiteCache(backend[len("sqlite:"):], ttl=ttl, max_bytes=max_bytes)
+        elif backend != "memory":
+            raise ValueError(f"Unknown result cache backend '{backend}'")
+        return cls(ttl=ttl, max_bytes=max_bytes, shared=shared)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.put(key, value, len(json.dumps(value)))
+        return value
+
+    def put(self, key, value):
+        nbytes = len(json.dumps(value))
+        self.local.put(key, value, nbytes)
+        if self.shared is not None:
+            self.shared.put(key, value)
+
+    def metrics(self):
+        stats = {"local": self.local.metrics()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.metrics()
+        return stats
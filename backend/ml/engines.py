@@ -0,0 +1,98 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Engine names accepted in MODEL_ENGINES; the TFLite variants differ only in
+# which exported file they load (see tflite_path and ml/export.py)
+ENGINES = ["keras", "tflite", "tflite-float16", "tflite-int8"]
+
+
+def tflite_path(model_dir, model_name, quantize=None):
+    """Path of an exported TFLite model: <model>_model[.<quantize>].tflite."""
+    suffix = f".{quantize}" if quantize and quantize != "none" else ""
+    return Path(model_dir) / f"{model_name}_model{suffix}.tflite"
+
+
+def parse_engine_spec(spec):
+    """
+    Parse MODEL_ENGINES, e.g. "lstm=tflite,transformer=tflite-float16", into
+    {model_name: engine}. Models not listed use Keras.
+    """
+    engines = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, engine = item.partition("=")
+        engine = engine.strip() or "keras"
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine '{engine}' for model '{name.strip()}' (expected one of {ENGINES})")
+        engines[name.strip()] = engine
+    return engines
+
+
+class TFLiteEngine:
+    """
+    Runs an exported .tflite model with the TFLite interpreter (XNNPACK is
+    applied by default to float models on CPU). Exposes the same
+    input_shape / output_shape / predict_batch surface the rest of the
+    backend uses for Keras models, so it can stand in for one anywhere
+    except SHAP, which needs gradients and always uses the Keras model.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        import tensorflow as tf
+        self.model_path = str(model_path)
+        self.interpreter = tf.lite.Interpreter(model_path=self.model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = int(self._input["shape"][0])
+        # The interpreter is not thread-safe; inference pool threads take turns
+        self._lock = threading.Lock()
+        self.input_shape = (None,) + tuple(int(d) for d in self._input["shape"][1:])
+        self.output_shape = (None,) + tuple(int(d) for d in self._output["shape"][1:])
+
+    def count_params(self):
+        return 0
+
+    def _quantize(self, x, details):
+        scale, zero_point = details["quantization"]
+        if details["dtype"] == np.float32 or not scale:
+            return x.astype(details["dtype"], copy=False)
+        return np.clip(np.round(x / scale + zero_point), *_int_range(details["dtype"])).astype(details["dtype"])
+
+    def predict_batch(self, x):
+        """Run a (N, timesteps, 1) batch; returns a float32 (N, output_steps) array."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        with self._lock:
+            if x.shape[0] != self._batch:
+                self.interpreter.resize_tensor_input(self._input["index"], list(x.shape))
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch = x.shape[0]
+            self.interpreter.set_tensor(self._input["index"], self._quantize(x, self._input))
+            self.interpreter.invoke()
+            y = self.interpreter.get_tensor(self._output["index"])
+            scale, zero_point = self._output["quantization"]
+            if self._output["dtype"] != np.float32 and scale:
+                y = (y.astype(np.float32) - zero_point) * scale
+        return np.asarray(y, dtype=np.float32).reshape(x.shape[0], -1)
+
+
+def _int_range(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+
+def load_engine(engine, model_dir, model_name, keras_file):
+    """Load `model_name` with the given engine name; returns a Keras model or a TFLiteEngine."""
+    if engine == "keras":
+        from tensorflow import keras
+        return keras.models.load_model(str(Path(model_dir) / keras_file), compile=False)
+    quantize = engine.partition("-")[2] or None
+    path = tflite_path(model_dir, model_name, quantize)
+    if not path.exists():
+        raise FileNotFoundError(f"{path.name} not found; export it with 'python -m ml.export --models {model_name}'")
+    return TFLiteEngine(path)
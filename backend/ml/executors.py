@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+
+class PoolBusyError(Exception):
+    """Raised when a job could not get a worker slot within the pool's queue timeout."""
+
+
+class ExecutionPool:
+    """
+    Bounded executor for blocking work called from async handlers.
+
+    At most `max_workers` jobs run at once; further callers wait for a slot
+    for up to `queue_timeout` seconds (and at most `max_pending` of them may
+    wait) before PoolBusyError is raised, which handlers turn into a 503.
+    `kind` is "thread" for work that releases the GIL (TensorFlow, sockets)
+    or "process" for CPU-bound Python work such as SHAP. Process workers are
+    started with their niceness raised by `nice`, so the OS schedules them
+    behind the server's own threads when cores are contended.
+    """
+
+    def __init__(self, name, max_workers, queue_timeout=10.0, max_pending=64, kind="thread", nice=0):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, int(max_workers))
+        self.queue_timeout = float(queue_timeout)
+        self.max_pending = max(0, int(max_pending))
+        if kind == "process":
+            # spawn, not fork: forking a process that already initialised TensorFlow is unsafe
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=os.nice if nice else None, initargs=(int(nice),) if nice else (),
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._active = 0
+        self._waiting = 0
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0, "max_wait_ms": 0.0, "total_wait_ms": 0.0}
+
+    async def acquire(self):
+        """
+        Wait for a worker slot (raising PoolBusyError on timeout or when too
+        many callers are already waiting). Pair with release(); async work that
+        is not submitted to the executor can hold a slot the same way.
+        """
+        if self._waiting >= self.max_pending and self._slots.locked():
+            self._stats["rejected"] += 1
+            raise PoolBusyError(f"{self.name} pool is saturated ({self._waiting} jobs waiting)")
+        self._waiting += 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            raise PoolBusyError(f"{self.name} pool busy: no worker free within {self.queue_timeout:g}s")
+        finally:
+            self._waiting -= 1
+        wait_ms = (time.perf_counter() - t0) * 1000.0
+        self._stats["total_wait_ms"] += wait_ms
+        self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+        self._active += 1
+
+    def release(self, failed=False):
+        self._stats["failed" if failed else "completed"] += 1
+        self._active -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """`async with pool.slot():` holds one worker slot for the duration of the block."""
+        await self.acquire()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.release(failed)
+
+    async def submit(self, fn, *args, **kwargs):
+        """Run fn on the executor without taking a slot; only for callers already inside `slot()`."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and return its result."""
+        async with self.slot():
+            return await self.submit(fn, *args, **kwargs)
+
+    def metrics(self):
+        """Current load and counters, suitable for /health."""
+        stats = dict(self._stats)
+        started = stats["completed"] + stats["failed"]
+        stats["avg_wait_ms"] = round(stats.pop("total_wait_ms") / started, 3) if started else 0.0
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        stats.update({
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "active": self._active,
+            "waiting": self._waiting,
+            "queue_timeout_s": self.queue_timeout,
+        })
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
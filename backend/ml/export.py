@@ -0,0 +1,84 @@
+"""
+Export the Keras .h5 models to TFLite for the lightweight inference engine,
+then check parity of the exported model against Keras on the SHAP
+background windows, with a looser tolerance for quantized exports.
+
+Run from the backend directory:
+    python -m ml.export [--models lstm,cnn_lstm,transformer] [--quantize none|float16|int8]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from ml.backgrounds import load_background
+from ml.engines import TFLiteEngine, tflite_path
+from ml.forecasting import predict_batch, window_length
+
+MODEL_DIR = Path(__file__).resolve().parent / 'models'
+# Largest |keras - tflite| accepted per quantization (outputs are in scaled units, roughly [0, 1])
+PARITY_TOLERANCES = {None: 1e-4, "float16": 1e-2, "int8": 5e-2}
+
+
+def convert(model, quantize=None, representative=None):
+    """Convert a Keras model to TFLite bytes, optionally quantized to float16 or int8."""
+    import tensorflow as tf
+
+    def make_converter(select_ops):
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if select_ops:
+            # Fallback for layers without a builtin TFLite kernel
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS,
+            ]
+            converter._experimental_lower_tensor_list_ops = False
+        if quantize == "float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantize == "int8":
+            # int8 weights and activations, float32 input/output
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if representative is not None:
+                converter.representative_dataset = lambda: ([w[None, :, None]] for w in representative)
+        return converter
+
+    try:
+        return make_converter(select_ops=False).convert()
+    except Exception as e:
+        print(f"  builtin ops only failed ({e.__class__.__name__}), retrying with SELECT_TF_OPS")
+        return make_converter(select_ops=True).convert()
+
+
+def check_parity(model, engine, windows):
+    """Max absolute difference between Keras and the exported engine on a batch of windows."""
+    x = windows[:, :, None].astype(np.float32)
+    return float(np.max(np.abs(predict_batch(model, x) - engine.predict_batch(x))))
+
+
+def main():
+    from tensorflow import keras
+    parser = argparse.ArgumentParser(description="Export Keras models to TFLite")
+    parser.add_argument("--models", default="lstm,cnn_lstm,transformer")
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="none")
+    args = parser.parse_args()
+    quantize = None if args.quantize == "none" else args.quantize
+
+    failed = False
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        model = keras.models.load_model(str(MODEL_DIR / f"{name}_model.h5"), compile=False)
+        windows = load_background(MODEL_DIR, name, window_length(model))
+        path = tflite_path(MODEL_DIR, name, quantize)
+        print(f"{name}: converting ({args.quantize})")
+        path.write_bytes(convert(model, quantize, representative=windows))
+        diff = check_parity(model, TFLiteEngine(path), windows)
+        tolerance = PARITY_TOLERANCES[quantize]
+        ok = diff <= tolerance
+        failed |= not ok
+        print(f"  {path.name}: {path.stat().st_size / 1024:.0f} KB, max |keras - tflite| = {diff:.2e}"
+              f"{'' if ok else f'  FAILED (tolerance {tolerance:g})'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class FeedbackBacklogError(Exception):
+    """Raised when the write queue is full because the disk cannot keep up."""
+
+
+class FeedbackStore:
+    """
+    Durable feedback log in a SQLite file (WAL mode, so several uvicorn
+    workers can share it and readers never block the writer).
+
+    `submit` only assigns an ID and enqueues the record; a background thread
+    writes queued records in batches of up to `batch_size`, one transaction
+    per batch, at least every `flush_interval` seconds. IDs are random UUIDs,
+    so they are unique across workers and restarts.
+    """
+
+    def __init__(self, path, batch_size=512, flush_interval=0.05, max_queue=100_000):
+        self.path = str(path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._queue = queue.Queue(maxsize=max(0, int(max_queue)))
+        self._stats = {"submitted": 0, "written": 0, "batches": 0, "write_errors": 0, "rejected": 0}
+        self._conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS feedback ("
+            "id TEXT PRIMARY KEY, model TEXT NOT NULL, feedback TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS feedback_model_created ON feedback (model, created, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS feedback_created ON feedback (created, id)")
+        return conn
+
+    def submit(self, model, feedback):
+        """Queue one record for writing and return it (with its new ID) without touching the disk."""
+        record = {"id": uuid.uuid4().hex, "model": str(model), "feedback": str(feedback), "created": time.time()}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._stats["rejected"] += 1
+            raise FeedbackBacklogError(f"Feedback queue is full ({self._queue.maxsize} records pending)")
+        self._stats["submitted"] += 1
+        return record
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if first is None:
+                self._queue.task_done()
+                return
+            batch = [first]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        rows = [(r["id"], r["model"], r["feedback"], r["created"]) for r in batch]
+        try:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO feedback (id, model, feedback, created) VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+            self._stats["written"] += len(rows)
+            self._stats["batches"] += 1
+        except sqlite3.Error as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            self._stats["write_errors"] += len(rows)
+            print(f"Warning: failed to write {len(rows)} feedback records: {e}")
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        self._queue.join()
+
+    def query(self, model=None, since=None, until=None, limit=100, cursor=None):
+        """
+        Records ordered by (created, id), optionally filtered by model and by
+        created time in [since, until). `cursor` is the `next_cursor` of the
+        previous page. Returns (records, next_cursor or None).
+        """
+        limit = min(max(1, int(limit)), 1000)
+        clauses, params = [], []
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        if since is not None:
+            clauses.append("created >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("created < ?")
+            params.append(float(until))
+        if cursor:
+            created, _, last_id = str(cursor).partition(":")
+            clauses.append("(created > ? OR (created = ? AND id > ?))")
+            params.extend([float(created), float(created), last_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT id, model, feedback, created FROM feedback {where} ORDER BY created, id LIMIT ?"
+        with self._read_lock:
+            rows = self._reader.execute(sql, params + [limit + 1]).fetchall()
+        records = [{"id": r[0], "model": r[1], "feedback": r[2], "created": r[3]} for r in rows[:limit]]
+        next_cursor = f"{records[-1]['created']!r}:{records[-1]['id']}" if len(rows) > limit else None
+        return records, next_cursor
+
+    def metrics(self):
+        stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["batch_size"] = self.batch_size
+        return stats
+
+    def close(self):
+        """Write everything still queued and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._conn.close()
+        self._reader.close()
@@ -0,0 +1,171 @@
+import numpy as np
+
+from ml.transforms import apply_transform
+
+# Compiled single-call step functions, keyed by (id(model), training). The model
+# itself is kept alongside the function so the id cannot be recycled while cached.
+_step_fns = {}
+
+
+def window_length(model):
+    """Return the fixed window length a model expects, or None if it is variable."""
+    try:
+        shape = model.input_shape  # e.g. (None, timesteps, features)
+        if shape is not None and len(shape) >= 3:
+            return shape[1]
+    except Exception:
+        pass
+    return None
+
+
+def output_steps(model):
+    """Number of future steps a model emits per call (1 for single-step models)."""
+    try:
+        shape = model.output_shape
+        if shape is not None and len(shape) >= 2 and shape[-1]:
+            return int(shape[-1])
+    except Exception:
+        pass
+    return 1
+
+
+def get_step_fn(model, training=False):
+    """
+    Return a tf.function that runs one forward pass of `model` on a
+    (batch, timesteps, 1) float32 tensor. The input signature is fixed so the
+    graph is traced once per model instead of once per `predict` call.
+    With training=True dropout stays active (used for MC-dropout sampling).
+    """
+    key = (id(model), bool(training))
+    entry = _step_fns.get(key)
+    if entry is not None and entry[0] is model:
+        return entry[1]
+    import tensorflow as tf  # deferred so importing this module stays cheap
+    spec = tf.TensorSpec(shape=(None, window_length(model), 1), dtype=tf.float32)
+
+    @tf.function(input_signature=[spec])
+    def step(x):
+        return model(x, training=bool(training))
+
+    _step_fns[key] = (model, step)
+    return step
+
+
+def predict_batch(model, x):
+    """
+    Run `model` on a (N, timesteps, 1) window batch through its compiled step
+    function, bypassing the `predict` batching machinery. Non-Keras engines
+    (ml.engines) provide their own `predict_batch`.
+    Returns a float32 array of shape (N, output_steps).
+    """
+    if hasattr(model, "predict_batch"):
+        return model.predict_batch(x)
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = get_step_fn(model)(x)
+    if isinstance(y, (list, tuple)):
+        y = y[0]
+    y = y.numpy()
+    return y.reshape(y.shape[0], -1)
+
+
+class RingWindow:
+    """
+    Fixed-length sliding windows for N series, stored in a doubled buffer of
+    shape (N, 2 * L). Every value is written twice (at i and i + L), so the
+    current window is always the contiguous slice buf[:, start:start + L] and
+    pushing a value never shifts or reallocates memory.
+    """
+
+    def __init__(self, windows, dtype=np.float32):
+        windows = np.asarray(windows, dtype=dtype)
+        if windows.ndim == 1:
+            windows = windows.reshape(1, -1)
+        n, length = windows.shape
+        self.length = length
+        self.start = 0
+        self.buf = np.empty((n, 2 * length), dtype=dtype)
+        self.buf[:, :length] = windows
+        self.buf[:, length:] = windows
+
+    def view(self):
+        """Current (N, L) window, oldest value first (a view, not a copy)."""
+        return self.buf[:, self.start:self.start + self.length]
+
+    def push(self, values):
+        """Append one value per series, dropping the oldest one."""
+        self.buf[:, self.start] = values
+        self.buf[:, self.start + self.length] = values
+        self.start = (self.start + 1) % self.length
+
+
+def rollout(model, windows, horizon, mode="auto"):
+    """
+    Autoregressive multi-step forecast for one or many series at once.
+
+    `windows` is a (L,) or (N, L) array of already scaled/transformed inputs.
+    In "recursive" mode the model is called once per step and the first output
+    is fed back into the window, exactly like the original per-step loop.
+    In "direct" mode every output of a multi-output model is used, so a model
+    that emits k steps needs only ceil(horizon / k) calls. "auto" picks
+    "direct" when the model emits more than one step.
+
+    Returns (predictions, final_windows) with shapes (N, horizon) and (N, L).
+    """
+    ring = RingWindow(windows)
+    n = ring.buf.shape[0]
+    horizon = max(int(horizon), 0)
+    predictions = np.empty((n, horizon), dtype=np.float32)
+    steps = output_steps(model)
+    if mode == "auto":
+        mode = "direct" if steps > 1 else "recursive"
+    if mode not in ("recursive", "direct"):
+        raise ValueError(f"Unknown forecast mode '{mode}'")
+    per_call = steps if mode == "direct" else 1
+
+    done = 0
+    while done < horizon:
+        y = predict_batch(model, ring.view()[:, :, None])
+        take = min(per_call, horizon - done)
+        for j in range(take):
+            predictions[:, done + j] = y[:, j]
+            ring.push(y[:, j])
+        done += take
+    return predictions, ring.view()
+
+
+def forecast_batch(model, windows, horizon, transform=None, scaler=None, mode="auto"):
+    """
+    Scale, transform and roll out N series together, as /forecast does for one.
+
+    `windows` is an (N, L) array of raw values. The scaler (fitted on a single
+    feature) is applied to all values at once, the transform to the whole
+    batch, and the rollout makes one model call per step for all N series.
+    Returns (forecasts, baselines): forecasts are inverse-scaled, baselines
+    are the tail of the final rolled windows, matching /forecast.
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    n, length = windows.shape
+    if scaler is not None:
+        try:
+            windows = scaler.transform(windows.reshape(-1, 1)).reshape(n, length)
+        except Exception as e:
+            print(f"Warning: scaler.transform failed (skipping scaling): {e}")
+    return forecast_scaled(model, windows, horizon, transform=transform, scaler=scaler, mode=mode)
+
+
+def forecast_scaled(model, windows, horizon, transform=None, scaler=None, mode="auto"):
+    """
+    Like forecast_batch, for (N, L) windows that are already scaled: applies
+    the transform, rolls out and inverse-scales the forecasts.
+    """
+    horizon = max(int(horizon), 0)
+    windows = apply_transform(transform, windows)
+    n = windows.shape[0]
+    predictions, final_windows = rollout(model, windows, horizon, mode=mode)
+    forecasts = predictions
+    if scaler is not None and hasattr(scaler, "inverse_transform") and predictions.size:
+        try:
+            forecasts = scaler.inverse_transform(predictions.reshape(-1, 1)).reshape(n, -1)
+        except Exception as e:
+            print(f"Warning: inverse_transform on predictions failed: {e}")
+    return forecasts, final_windows[:, -horizon:]
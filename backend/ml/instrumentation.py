@@ -0,0 +1,314 @@
+"""
+Request-path instrumentation: per-stage timers, counters, Prometheus text
+exposition and an optional sampling profiler for slow requests.
+
+A RequestProfile is opened per HTTP request (by middleware in main.py) and
+handlers wrap their work in `with stage("parse"):` blocks. When the request
+finishes every stage is observed into the stage histogram, labelled with the
+endpoint and the model/transform the handler reported via `set_labels`.
+"""
+import contextvars
+import math
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _value(value):
+    """A sample value at full float precision (repr round-trips; '%g' keeps only 6 digits)."""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {_value(total)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram (seconds) with a fixed set of label names."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                running = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    running += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [('le', le)])} {running}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_value(series[-1])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds metrics plus collector callbacks. A collector returns
+    (name, type, help, [(labels_dict, value), ...]) tuples read at scrape
+    time, which is how existing /health counters (caches, pools) are exported.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        """Everything in Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Warning: metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_str = _labels(labels.keys(), labels.values())
+                    lines.append(f"{name}{label_str} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+STAGE_SECONDS = registry.histogram(
+    "forecast_stage_seconds", "Time spent in each request stage",
+    ("endpoint", "stage", "model", "transform"),
+)
+REQUEST_SECONDS = registry.histogram(
+    "forecast_request_seconds", "End-to-end request latency", ("endpoint", "status"),
+)
+ERRORS = registry.counter(
+    "forecast_errors_total", "Requests that ended in an error response", ("endpoint", "status"),
+)
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Stage timings and labels for one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.labels = {"model": "", "transform": ""}
+        self.stages = []  # (name, seconds) in completion order
+        self.samples = None  # folded stack -> count, when the sampler is on
+        self.started = time.perf_counter()
+
+    def timings_ms(self):
+        """Total milliseconds per stage (stages entered more than once are summed)."""
+        totals = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds * 1000.0
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+    def server_timing(self):
+        """The breakdown as a Server-Timing header value."""
+        return ", ".join(f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={ms}" for name, ms in self.timings_ms().items())
+
+
+def begin_request(endpoint):
+    profile = RequestProfile(endpoint)
+    return profile, _current.set(profile)
+
+
+def end_request(profile, token, status):
+    """Record the request's stages and totals, and dump its samples if it was slow."""
+    _current.reset(token)
+    elapsed = time.perf_counter() - profile.started
+    model, transform = profile.labels["model"], profile.labels["transform"]
+    for name, seconds in profile.stages:
+        STAGE_SECONDS.observe(seconds, profile.endpoint, name, model, transform)
+    REQUEST_SECONDS.observe(elapsed, profile.endpoint, str(status))
+    if status >= 400:
+        ERRORS.inc(profile.endpoint, str(status))
+    if profile.samples is not None:
+        sampler.detach(profile, elapsed)
+    return elapsed
+
+
+def current_profile():
+    return _current.get()
+
+
+def set_labels(model=None, transform=None):
+    """Label the current request's stages with the model and transform it used."""
+    profile = _current.get()
+    if profile is None:
+        return
+    if model is not None:
+        profile.labels["model"] = str(model)
+    if transform is not None:
+        profile.labels["transform"] = str(transform or "none").lower()
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage `name` of the current request (no-op outside a request)."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.stages.append((name, time.perf_counter() - t0))
+
+
+class StackSampler:
+    """
+    Samples every thread's Python stack at a fixed interval while requests are
+    in flight, and writes the stacks of requests slower than `slow_ms` to
+    `out_dir` in folded format ("frame;frame;frame count" per line), ready for
+    flamegraph.pl or speedscope. Work runs on pool threads, so each request's
+    samples cover the whole process while it was in flight.
+    """
+
+    def __init__(self, slow_ms=0.0, interval_ms=5.0, out_dir="profiles"):
+        self.slow_ms = float(slow_ms)
+        self.interval = max(0.001, float(interval_ms) / 1000.0)
+        self.out_dir = Path(out_dir)
+        self.dumped = 0
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.slow_ms > 0
+
+    def attach(self, profile):
+        if not self.enabled:
+            return
+        profile.samples = _Tally()
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def detach(self, profile, elapsed):
+        with self._lock:
+            self._active.discard(profile)
+            samples, profile.samples = profile.samples, None
+        if elapsed * 1000.0 >= self.slow_ms and samples:
+            self._dump(profile.endpoint, samples, elapsed)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._active
+            if idle:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(frames)))
+            with self._lock:
+                for profile in self._active:
+                    profile.samples.update(stacks)
+            time.sleep(self.interval)
+
+    def _dump(self, endpoint, samples, elapsed):
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", endpoint).strip("_") or "root"
+            path = self.out_dir / f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}_{elapsed * 1000.0:.0f}ms.folded"
+            path.write_text("".join(f"{stack} {count}\n" for stack, count in samples.most_common()))
+            self.dumped += 1
+        except OSError as e:
+            print(f"Warning: could not write profile for {endpoint}: {e}")
+
+
+# Slow-request profiling is off unless PROFILE_SLOW_MS is set
+sampler = StackSampler(
+    slow_ms=float(os.environ.get("PROFILE_SLOW_MS", "0")),
+    interval_ms=float(os.environ.get("PROFILE_INTERVAL_MS", "5")),
+    out_dir=os.environ.get("PROFILE_DIR", "profiles"),
+)
@@ -0,0 +1,98 @@
+import json
+import re
+import time
+
+from ml.cache import hash_key
+
+
+def normalize_question(question):
+    """Lower-case, collapse whitespace and drop trailing punctuation so trivially different phrasings share a cache entry."""
+    return re.sub(r"\s+", " ", str(question)).strip().lower().rstrip("?!. ")
+
+
+def prompt_cache_key(question, shap_values, digits=3):
+    """
+    Cache key for an /explain call: normalized question plus SHAP values rounded to `digits`
+    significant digits (not decimals: attributions on scaled inputs are often below 1e-3).
+    """
+    if isinstance(shap_values, dict):
+        items = []
+        for k, v in sorted(shap_values.items()):
+            try:
+                items.append((k, float(f"{float(v):.{digits}g}")))
+            except (TypeError, ValueError):
+                items.append((k, str(v)))
+        shap_part = repr(items)
+    else:
+        shap_part = str(shap_values)
+    return hash_key("explain", normalize_question(question), shap_part)
+
+
+class OllamaClient:
+    """
+    Async Ollama client on a pooled httpx connection. `available()` pings
+    the server and remembers the answer for `recheck_seconds`, so a server
+    started after the backend is picked up without a restart.
+    """
+
+    def __init__(self, host="http://localhost:11434", model="llama2-uncensored",
+                 timeout=120.0, max_connections=8, recheck_seconds=30.0):
+        self.host = host.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.recheck_seconds = recheck_seconds
+        self._client = None
+        self._available = None
+        self._checked_at = 0.0
+
+    def _http(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=httpx.Timeout(self.timeout, connect=2.0),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def available(self):
+        if self._available is None or time.monotonic() - self._checked_at > self.recheck_seconds:
+            try:
+                await self._http().get("/", timeout=1.0)
+                self._available = True
+            except Exception:
+                self._available = False
+            self._checked_at = time.monotonic()
+        return self._available
+
+    async def generate(self, prompt):
+        """Full (non-streaming) generation; returns the response text."""
+        resp = await self._http().post("/api/generate", json={"model": self.model, "prompt": prompt, "stream": False})
+        if resp.status_code != 200:
+            raise RuntimeError(f"Ollama API error (status {resp.status_code})")
+        answer = resp.json().get("response", "")
+        if not answer:
+            raise RuntimeError("Empty response from LLM")
+        return answer
+
+    async def stream(self, prompt):
+        """Yield response tokens as Ollama produces them."""
+        payload = {"model": self.model, "prompt": prompt, "stream": True}
+        async with self._http().stream("POST", "/api/generate", json=payload) as resp:
+            if resp.status_code != 200:
+                raise RuntimeError(f"Ollama API error (status {resp.status_code})")
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
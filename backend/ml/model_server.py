@@ -0,0 +1,252 @@
+"""
+Single-process model server for multi-worker deployments.
+
+With `python main.py --workers N` the launcher starts one model server that
+loads every model once, and the N uvicorn workers reach it over a Unix
+socket instead of each loading their own copy. Tensors are not sent over the
+socket: every client thread owns a shared-memory block, writes its input
+batch there and the server writes the output back into the same block, so
+only a small (model, block, shape) message is pickled per call.
+
+Workers see RemoteModel objects, which expose the same input_shape /
+output_shape / predict_batch surface as the TFLite engine, so forecasting,
+batching and caching code is unchanged. SHAP still loads Keras models in its
+own worker processes, since it needs gradients.
+
+Run standalone (the launcher does this for you):
+    python -m ml.model_server --socket /tmp/models.sock \
+        --models lstm=lstm_model.h5,cnn_lstm=cnn_lstm_model.h5,transformer=transformer_model.h5
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+import numpy as np
+
+AUTHKEY_ENV = "MODEL_SERVER_AUTHKEY"
+MODEL_DIR = Path(__file__).resolve().parent / 'models'
+
+
+def _attach(name):
+    """Open a client's shared-memory block without letting this process's resource tracker unlink it."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _handle(conn, registry):
+    from ml.forecasting import predict_batch
+    shm = None
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                return
+            try:
+                op = msg[0]
+                if op == "info":
+                    model = registry[msg[1]]
+                    conn.send(("ok", {
+                        "input_shape": tuple(model.input_shape),
+                        "output_shape": tuple(model.output_shape),
+                        "parameters": int(model.count_params()),
+                        "version": registry.version(msg[1]),
+                    }))
+                elif op == "predict":
+                    _, name, shm_name, shape = msg
+                    if shm is None or shm.name != shm_name:
+                        if shm is not None:
+                            shm.close()
+                        shm = _attach(shm_name)
+                    x = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+                    try:
+                        y = np.ascontiguousarray(predict_batch(registry[name], x), dtype=np.float32)
+                        offset = x.nbytes
+                    finally:
+                        del x  # no views may outlive the block, or shm.close() fails
+                    if offset + y.nbytes <= shm.size:
+                        np.ndarray(y.shape, dtype=np.float32, buffer=shm.buf, offset=offset)[...] = y
+                        conn.send(("ok", y.shape))
+                    else:
+                        conn.send(("inline", y))
+                elif op == "ping":
+                    conn.send(("ok", registry.loaded()))
+                else:
+                    conn.send(("error", f"Unknown operation '{op}'"))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if shm is not None:
+            shm.close()
+        conn.close()
+
+
+def serve(address, authkey, registry):
+    """Load every model, then answer clients on `address`, one thread per connection."""
+    registry.preload(["all"])
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        print(f"Model server listening on {address} ({', '.join(registry.loaded())})", flush=True)
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle, args=(conn, registry), daemon=True).start()
+
+
+class _Channel:
+    """One connection plus the shared-memory block it exchanges tensors through."""
+
+    def __init__(self, address, authkey):
+        self.conn = Client(address, family="AF_UNIX", authkey=authkey)
+        self.shm = None
+
+    def buffer(self, nbytes):
+        if self.shm is None or self.shm.size < nbytes:
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1 << 16) * 2)
+        return self.shm
+
+    def release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.release()
+        self.conn.close()
+
+
+class ModelServerClient:
+    """Thread-safe client: each calling thread gets its own connection and shared-memory block."""
+
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey if authkey is not None else os.environ.get(AUTHKEY_ENV, "").encode()
+        self._local = threading.local()
+        self._channels = []
+        self._lock = threading.Lock()
+
+    def _channel(self):
+        channel = getattr(self._local, "channel", None)
+        if channel is None:
+            channel = self._local.channel = _Channel(self.address, self.authkey)
+            with self._lock:
+                self._channels.append(channel)
+        return channel
+
+    def _call(self, channel, *msg):
+        channel.conn.send(msg)
+        status, payload = channel.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"Model server: {payload}")
+        return status, payload
+
+    def info(self, name):
+        return self._call(self._channel(), "info", name)[1]
+
+    def ping(self):
+        return self._call(self._channel(), "ping")[1]
+
+    def predict(self, name, x, output_steps=1):
+        """Run a (N, timesteps, 1) batch on the server; returns float32 (N, output_steps)."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        channel = self._channel()
+        shm = channel.buffer(x.nbytes + x.shape[0] * max(1, output_steps) * 4)
+        np.ndarray(x.shape, dtype=np.float32, buffer=shm.buf)[...] = x
+        status, payload = self._call(channel, "predict", name, shm.name, x.shape)
+        if status == "inline":
+            return payload
+        return np.ndarray(payload, dtype=np.float32, buffer=shm.buf, offset=x.nbytes).copy()
+
+    def close(self):
+        with self._lock:
+            channels, self._channels = self._channels, []
+        for channel in channels:
+            try:
+                channel.close()
+            except Exception:
+                pass
+
+
+class RemoteModel:
+    """A model hosted by the model server, usable wherever a Keras model or TFLiteEngine is."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        info = client.info(name)
+        self.input_shape = info["input_shape"]
+        self.output_shape = info["output_shape"]
+        self.version = info["version"]
+        self._parameters = info["parameters"]
+        self._output_steps = int(self.output_shape[-1] or 1) if len(self.output_shape) >= 2 else 1
+
+    def count_params(self):
+        return self._parameters
+
+    def predict_batch(self, x):
+        return self.client.predict(self.name, x, self._output_steps)
+
+
+def start(files, engines_spec="", timeout=300.0):
+    """
+    Launch a model server subprocess for `files` ({name: .h5 file}) and wait
+    until it answers. Returns (process, address, authkey); the caller exports
+    MODEL_SERVER and MODEL_SERVER_AUTHKEY to its workers.
+    """
+    address = os.path.join(tempfile.mkdtemp(prefix="model-server-"), "models.sock")
+    authkey = secrets.token_hex(16)
+    spec = ",".join(f"{name}={path}" for name, path in files.items())
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "ml.model_server", "--socket", address, "--models", spec, "--engines", engines_spec],
+        cwd=str(Path(__file__).resolve().parent.parent),
+        env={**os.environ, AUTHKEY_ENV: authkey},
+    )
+    client = ModelServerClient(address, authkey.encode())
+    deadline = time.monotonic() + timeout
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Model server exited with status {proc.returncode}")
+        try:
+            client.ping()
+            break
+        except (OSError, EOFError):
+            if time.monotonic() > deadline:
+                proc.terminate()
+                raise RuntimeError(f"Model server did not start within {timeout:g}s")
+            time.sleep(0.2)
+    client.close()
+    return proc, address, authkey
+
+
+def main():
+    from ml.engines import parse_engine_spec
+    from ml.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Serve the models to local workers over a Unix socket")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--models", required=True, help="name=file.h5,... under ml/models")
+    parser.add_argument("--engines", default=os.environ.get("MODEL_ENGINES", ""))
+    args = parser.parse_args()
+
+    files = dict(item.split("=", 1) for item in args.models.split(",") if item.strip())
+    registry = ModelRegistry(MODEL_DIR, files, engines=parse_engine_spec(args.engines),
+                             warmup=os.environ.get("MODEL_WARMUP", "1") != "0")
+    serve(args.socket, os.environ.get(AUTHKEY_ENV, "").encode(), registry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import codecs
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20  # bytes read from the upload per iteration
+
+
+class SeriesBuffer:
+    """
+    Growable float32 buffer for parsed values. With `keep_last` set, only the
+    trailing `keep_last` values are retained, so memory is bounded by the
+    model window rather than by the size of the upload.
+    """
+
+    def __init__(self, keep_last=None, capacity=4096):
+        self.keep_last = keep_last
+        self.data = np.empty(max(capacity, keep_last or 0), dtype=np.float32)
+        self.size = 0
+        self.total = 0  # values seen, including discarded ones
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float32)
+        n = values.shape[0]
+        self.total += n
+        if self.keep_last:
+            if n >= self.keep_last:
+                self.data[:self.keep_last] = values[-self.keep_last:]
+                self.size = self.keep_last
+                return
+            if self.size + n > self.data.shape[0]:
+                # Slide the retained tail to the front to make room
+                keep = self.keep_last - n
+                self.data[:keep] = self.data[self.size - keep:self.size]
+                self.size = keep
+        elif self.size + n > self.data.shape[0]:
+            grown = np.empty(max(2 * self.data.shape[0], self.size + n), dtype=np.float32)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:self.size + n] = values
+        self.size += n
+
+    def values(self):
+        out = self.data[:self.size]
+        if self.keep_last and self.size > self.keep_last:
+            out = out[-self.keep_last:]
+        return out
+
+
+def _parse_lines_slow(lines):
+    """
+    Per-line fallback with the original parse_input rules: skip rows whose
+    values (after an optional leading date column) are not all numeric and
+    keep the last column.
+    """
+    values = []
+    for line in lines:
+        if not line.strip():
+            continue
+        parts = line.strip().split(',')
+        try:
+            row_vals = [float(x) for x in parts]
+        except ValueError:
+            parts_without_first = parts[1:]
+            if not parts_without_first:
+                continue
+            try:
+                row_vals = [float(x) for x in parts_without_first]
+            except ValueError:
+                continue
+        values.append(row_vals[-1])
+    return values
+
+
+def _parse_lines(lines, ncols):
+    """Vectorized conversion of the target (last) column, with the per-line rules as fallback for irregular chunks."""
+    # usecols is fixed from the first data row, so only chunks whose rows all have that many columns take the fast
+    # path; otherwise a wider row would be read from the wrong column instead of its last one
+    commas = ncols - 1
+    if all(line.count(',') == commas or not line.strip() for line in lines):
+        try:
+            # comments=None: '#' is data to the per-line rules, not the start of a comment
+            return np.loadtxt(lines, delimiter=',', usecols=(commas,), dtype=np.float32, ndmin=1, comments=None)
+        except ValueError:
+            pass
+    return np.array(_parse_lines_slow(lines), dtype=np.float32)
+
+
+def _detect_layout(lines):
+    """
+    Column count of the first data row and the index of the first data row,
+    so header lines are only inspected once. Returns (None, len(lines)) if
+    no data row is present yet.
+    """
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if _parse_lines_slow([line]):
+            return len(line.split(',')), i
+    return None, len(lines)
+
+
+def parse_csv_stream(fileobj, keep_last=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream a CSV upload in `chunk_size` byte chunks and return the target
+    series (the last column) as a float32 array of shape (timesteps, 1).
+    Header and date columns are detected on the first data row; when
+    `keep_last` is given only the trailing `keep_last` values are kept.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    buffer = SeriesBuffer(keep_last=keep_last)
+    ncols = None
+    tail = ""
+    read_any = False
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        read_any = True
+        text = tail + decoder.decode(chunk)
+        lines = text.splitlines()
+        # The last line may be cut mid-row; carry it into the next chunk
+        tail = lines.pop() if lines and not text.endswith(('\n', '\r')) else ""
+        if ncols is None:
+            ncols, start = _detect_layout(lines)
+            lines = lines[start:]
+            if ncols is None:
+                continue
+        if lines:
+            buffer.extend(_parse_lines(lines, ncols))
+    if not read_any:
+        raise ValueError("Uploaded file is empty")
+    tail += decoder.decode(b"", final=True)
+    if tail.strip():
+        buffer.extend(np.array(_parse_lines_slow([tail]), dtype=np.float32))
+    if buffer.size == 0:
+        raise ValueError("No numeric data found in file (after skipping headers)")
+    return buffer.values().reshape(-1, 1)
+
+
+def parse_timed_csv(fileobj, chunk_size=CHUNK_SIZE):
+    """
+    Stream a CSV upload of timestamped rows for the series store: the first
+    column is the timestamp (unix seconds or ISO 8601), the last column the
+    target series as in parse_csv_stream. Rows whose value is not numeric
+    (headers) are skipped. Returns (timestamps as strings, float32 values).
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    times, values = [], []
+    tail = ""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        final = not chunk
+        text = tail + (decoder.decode(b"", final=True) if final else decoder.decode(chunk))
+        lines = text.splitlines()
+        tail = lines.pop() if not final and lines and not text.endswith(('\n', '\r')) else ""
+        for line in lines:
+            parts = line.split(',')
+            if len(parts) < 2:
+                continue
+            try:
+                value = float(parts[-1])
+            except ValueError:
+                continue
+            times.append(parts[0].strip())
+            values.append(value)
+        if final:
+            break
+    if not values:
+        raise ValueError("No timestamped numeric rows found (expected timestamp,...,value)")
+    return np.array(times), np.array(values, dtype=np.float32)
+
+
+def parse_wide_csv(fileobj):
+    """
+    Parse a wide CSV upload: a header row of series IDs and one row per
+    timestep, with an optional leading date/time column. Empty cells become
+    NaN and are dropped, so series may have different lengths.
+    Returns {series_id: float32 array}.
+    """
+    text = fileobj.read().decode('utf-8', errors='ignore')
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        raise ValueError("Wide CSV needs a header row of series IDs and at least one data row")
+    header = [h.strip() for h in lines[0].split(',')]
+    first_row = lines[1].split(',')
+    # A non-numeric first column (dates, timestamps) is an index, not a series
+    try:
+        float(first_row[0])
+        start = 0
+    except ValueError:
+        start = 1
+    usecols = range(start, len(header))
+    table = np.genfromtxt(lines[1:], delimiter=',', usecols=usecols, dtype=np.float32, ndmin=2)
+    series = {}
+    for j, col in enumerate(usecols):
+        values = table[:, j]
+        series[header[col] or f"series_{col}"] = values[~np.isnan(values)]
+    return series
+
+
+def parse_parquet_columns(fileobj):
+    """
+    Read every numeric column of a Parquet upload as one series (column name
+    = series ID). Non-numeric columns such as timestamps are ignored.
+    Requires pyarrow. Returns {series_id: float32 array}.
+    """
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.types as pa_types
+    except ImportError:
+        raise ValueError("Parquet input requires the 'pyarrow' package")
+    table = pq.read_table(fileobj)
+    series = {}
+    for name, column in zip(table.column_names, table.columns):
+        if not (pa_types.is_floating(column.type) or pa_types.is_integer(column.type)):
+            continue
+        values = column.to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+        series[name] = values[~np.isnan(values)]
+    return series
+
+
+# Binary request bodies for /predict and /forecast, by media type
+BINARY_MEDIA_TYPES = {
+    "application/octet-stream": "raw",  # little-endian float32, length in X-Series-Length or ?length=
+    "application/x-npy": "npy",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def _arrow_column(table, column=None):
+    """One numeric column of a pyarrow Table as float32, zero-copy when it is a single null-free float32 chunk."""
+    import pyarrow.types as pa_types
+    if column is not None:
+        if column not in table.column_names:
+            raise ValueError(f"Column '{column}' not found")
+        chunked = table.column(column)
+    else:
+        numeric = [c for c in table.columns if pa_types.is_floating(c.type) or pa_types.is_integer(c.type)]
+        if not numeric:
+            raise ValueError("No numeric column in the table")
+        chunked = numeric[-1]
+    if chunked.num_chunks == 1 and chunked.null_count == 0 and pa_types.is_float32(chunked.type):
+        return chunked.chunk(0).to_numpy(zero_copy_only=True)
+    values = chunked.to_numpy().astype(np.float32, copy=False)
+    return values[~np.isnan(values)]
+
+
+def parse_binary(body, media_type, length=None, column=None):
+    """
+    Decode a binary request body into a 1-D float32 series without copying
+    where the format allows: raw float32 and float32 .npy payloads become
+    np.frombuffer views of the body, Arrow IPC columns are read straight from
+    their buffers. Parquet is decompressed once by pyarrow.
+    """
+    kind = BINARY_MEDIA_TYPES.get(media_type)
+    buf = memoryview(body)
+    if kind == "raw":
+        if length is not None:
+            length = int(length)
+            if buf.nbytes != 4 * length:
+                raise ValueError(f"Declared length {length} needs {4 * length} bytes, got {buf.nbytes}")
+        elif buf.nbytes % 4:
+            raise ValueError("Raw float32 body length is not a multiple of 4 bytes")
+        return np.frombuffer(buf, dtype="<f4")
+    if kind == "npy":
+        import io
+        header = io.BytesIO(buf[:4096].tobytes())  # magic + header dict; the data itself is not copied
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(header)
+        if dtype.hasobject:
+            raise ValueError("Object arrays are not accepted")
+        count = int(np.prod(shape))
+        if len(shape) > 2 or (len(shape) == 2 and 1 not in shape):
+            raise ValueError(f"Expected a 1-D or (timesteps, 1) array, got shape {shape}")
+        values = np.frombuffer(buf, dtype=dtype, count=count, offset=header.tell())
+        return values.astype(np.float32, copy=False)
+    if kind in ("arrow", "parquet"):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("Arrow and Parquet input require the 'pyarrow' package")
+        if kind == "arrow":
+            source = pa.py_buffer(buf)
+            try:
+                table = pa.ipc.open_stream(source).read_all()
+            except pa.ArrowInvalid:
+                table = pa.ipc.open_file(source).read_all()
+        else:
+            import pyarrow.parquet as pq
+            table = pq.read_table(pa.BufferReader(pa.py_buffer(buf)))
+        return _arrow_column(table, column)
+    raise ValueError(f"Unsupported binary media type '{media_type}'")
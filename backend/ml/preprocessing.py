@@ -0,0 +1,117 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from ml.forecasting import window_length
+from ml.instrumentation import stage
+from ml.transforms import get_transform
+
+
+def scaler_affine(scaler):
+    """
+    (mul, add) float32 vectors such that scaler.transform(x) == x * mul + add,
+    for MinMaxScaler and StandardScaler; None for other scalers.
+    """
+    if scaler is None:
+        return np.ones(1, dtype=np.float32), np.zeros(1, dtype=np.float32)
+    if hasattr(scaler, "min_") and hasattr(scaler, "scale_"):  # MinMaxScaler
+        return np.asarray(scaler.scale_, dtype=np.float32), np.asarray(scaler.min_, dtype=np.float32)
+    if hasattr(scaler, "mean_") and hasattr(scaler, "var_"):  # StandardScaler
+        # mean_ is still fitted with with_mean=False (for var_), but transform does not subtract it
+        scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+        mean = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+        mul = 1.0 / np.asarray(scale, dtype=np.float64) if scale is not None else np.ones(1)
+        add = -np.asarray(mean, dtype=np.float64) * mul if mean is not None else np.zeros(1)
+        return mul.astype(np.float32), add.astype(np.float32)
+    return None
+
+
+class PreprocessPlan:
+    """
+    Scale, transform and reshape for one (model, transform) pair, compiled once.
+
+    The model's window length and the scaler's affine parameters (float32)
+    are looked up at construction. `window(values)` trims a raw series to the
+    window, scales it in place in a float32 buffer taken from a free list
+    (no allocation once warm), writes the transform back into that buffer
+    (the dct/dwt/cs kernels still use temporaries up to about the window's
+    size) and yields it as the (1, L, 1) model input. The buffer is reused
+    by later requests once the block exits, so callers must not keep
+    references to it. `inverse` maps scaled model outputs back to the
+    original units.
+    """
+
+    def __init__(self, model, transform=None, scaler=None):
+        self.model = model
+        self.length = window_length(model)
+        self.transform = (transform or "none").lower()
+        self._kernel = get_transform(transform)
+        self.scaler = scaler
+        affine = scaler_affine(scaler)
+        if affine is None:
+            print(f"Warning: {type(scaler).__name__} is not affine; preprocessing falls back to scaler.transform")
+        self._affine = affine
+        # MinMaxScaler(clip=True) clips scaled values to its feature range
+        self._clip = tuple(scaler.feature_range) if affine is not None and getattr(scaler, "clip", False) else None
+        self._free = {}  # window length -> list of idle (1, L) buffers
+        self._lock = threading.Lock()
+
+    def _take(self, length):
+        with self._lock:
+            buffers = self._free.get(length)
+            if buffers:
+                return buffers.pop()
+        return np.empty((1, length), dtype=np.float32)
+
+    def _give(self, buf):
+        with self._lock:
+            self._free.setdefault(buf.shape[1], []).append(buf)
+
+    def trim(self, values):
+        """The last L values of a (T,) or (T, 1) series, as a view; raises ValueError if T < L."""
+        series = np.asarray(values).reshape(-1)
+        if self.length:
+            if series.shape[0] < self.length:
+                raise ValueError(f"Input sequence too short for model (need ≥ {self.length} timesteps)")
+            series = series[-self.length:]
+        return series
+
+    def fill(self, series, buf):
+        """Scale and transform one trimmed series into the (1, L) float32 `buf`, timed as stages "scale" and "transform"."""
+        row = buf[0]
+        with stage("scale"):
+            if self._affine is not None:
+                mul, add = self._affine
+                np.multiply(series, mul, out=row, casting="same_kind")
+                row += add
+                if self._clip is not None:
+                    np.clip(row, *self._clip, out=row)
+            else:
+                row[...] = self.scaler.transform(series.reshape(-1, 1)).reshape(-1)
+        if self._kernel is not None:
+            with stage("transform"):
+                self._kernel(buf, out=buf)
+        return buf
+
+    @contextmanager
+    def window(self, values):
+        """`with plan.window(series) as x:` gives the (1, L, 1) float32 model input for a raw series."""
+        series = self.trim(values)
+        buf = self._take(series.shape[0])
+        try:
+            self.fill(series, buf)
+            yield buf.reshape(1, -1, 1)
+        finally:
+            self._give(buf)
+
+    def inverse(self, outputs):
+        """Scaled model outputs back in the original units, as a new float32 array."""
+        y = np.array(outputs, dtype=np.float32)
+        if self._affine is not None:
+            mul, add = self._affine
+            y -= add
+            y /= mul
+        elif hasattr(self.scaler, "inverse_transform"):
+            y = self.scaler.inverse_transform(y.reshape(-1, 1)).reshape(y.shape).astype(np.float32)
+        return y
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import psutil
+
+
+class ModelRegistry:
+    """
+    Models loaded on first use instead of at import time.
+
+    `files` maps model names to .h5 files under `model_dir`; `engines` picks
+    the inference engine per model ("keras" by default, or a TFLite export,
+    see ml.engines). Looking a model up (`registry[name]`) loads it once,
+    thread-safely, and runs a warm-up inference so the first real request
+    does not pay graph tracing. Load time, warm-up time and the RSS growth
+    observed while loading are kept per model for /health and /models.
+
+    With `remote` (a ml.model_server.ModelServerClient) models are not loaded
+    in this process: lookups return RemoteModel proxies to the model server.
+    """
+
+    def __init__(self, model_dir, files, engines=None, warmup=True, remote=None):
+        self.model_dir = Path(model_dir)
+        self.files = dict(files)
+        self.engines = {name: (engines or {}).get(name, "keras") for name in self.files}
+        self.warmup = warmup
+        self.remote = remote
+        self._models = {}
+        self._info = {}
+        self._errors = {}
+        self._locks = {name: threading.Lock() for name in self.files}
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __getitem__(self, name):
+        model = self._models.get(name)
+        if model is None:
+            model = self.load(name)
+        return model
+
+    def names(self):
+        return list(self.files)
+
+    def loaded(self):
+        return [name for name in self.files if name in self._models]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def load(self, name):
+        """Load (and warm up) a model if it is not loaded yet; raises KeyError for unknown names."""
+        if name not in self.files:
+            raise KeyError(name)
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is not None:
+                return model
+            from ml.engines import load_engine
+            from ml.forecasting import predict_batch, window_length
+
+            process = psutil.Process(os.getpid())
+            rss_before = process.memory_info().rss
+            t0 = time.perf_counter()
+            try:
+                if self.remote is not None:
+                    from ml.model_server import RemoteModel
+                    model = RemoteModel(self.remote, name)
+                else:
+                    model = load_engine(self.engines[name], self.model_dir, name, self.files[name])
+            except Exception as e:
+                self._errors[name] = str(e)
+                print(f"Error loading model '{name}': {e}")
+                raise
+            load_seconds = time.perf_counter() - t0
+            warmup_seconds = 0.0
+            if self.warmup:
+                t1 = time.perf_counter()
+                predict_batch(model, np.zeros((1, window_length(model) or 1, 1), dtype=np.float32))
+                warmup_seconds = time.perf_counter() - t1
+            self._info[name] = {
+                "engine": "remote:" + self.engines[name] if self.remote is not None else self.engines[name],
+                "load_seconds": round(load_seconds, 3),
+                "warmup_seconds": round(warmup_seconds, 3),
+                "rss_delta_mb": round((process.memory_info().rss - rss_before) / (1024 * 1024), 2),
+                "parameters": int(model.count_params()),
+            }
+            self._errors.pop(name, None)
+            self._models[name] = model
+            print(f"Model loaded: {name} [{self.engines[name]}] ({load_seconds:.2f}s load, {warmup_seconds:.2f}s warm-up)")
+            return model
+
+    def version(self, name):
+        """
+        Identifier of the model file currently served (engine, size and mtime),
+        used in cache keys so results are not reused across model updates.
+        """
+        from ml.engines import tflite_path
+        if self.remote is not None and name in self._models:
+            return self._models[name].version  # reported by the model server, which owns the files
+        engine = self.engines[name]
+        if engine == "keras":
+            path = self.model_dir / self.files[name]
+        else:
+            path = tflite_path(self.model_dir, name, engine.partition("-")[2] or None)
+        try:
+            stat = path.stat()
+            return f"{engine}:{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            return engine
+
+    def preload(self, names):
+        """Eagerly load a list of model names ('all' loads every model); failures are logged, not raised."""
+        if names == ["all"]:
+            names = self.names()
+        for name in names:
+            try:
+                self.load(name)
+            except Exception:
+                pass
+
+    def info(self):
+        """Per-model load status, timings and memory, for /health and /models."""
+        status = {}
+        for name in self.files:
+            entry = {"loaded": name in self._models, "engine": self.engines[name]}
+            entry.update(self._info.get(name, {}))
+            if name in self._errors:
+                entry["error"] = self._errors[name]
+            status[name] = entry
+        return status
@@ -0,0 +1,376 @@
+"""
+Historical series kept on the server, so clients can ask for a forecast by
+series ID instead of re-uploading the history.
+
+Each series is a directory under the store root holding one generation of
+two flat files, `values.<gen>.f32` (little-endian float32) and
+`times.<gen>.i64` (int64 unix milliseconds, strictly increasing), plus
+`meta.json` naming the current generation. Readers memory-map both files and
+slice the window they need as a view of the mapping, so a lookup copies
+nothing and does not read the rest of the series.
+
+Writes are append-only. Rows newer than the last stored (and pending)
+timestamp are appended to the current files in place, also when the same
+batch overlaps stored history. Older or duplicate rows go to
+`pending.bin` and are merged by `compact`, which writes a new generation
+(sorted, the latest write winning on duplicate timestamps) and switches
+`meta.json` to it atomically. Compaction runs on a background thread,
+every `compact_interval` seconds and as soon as a series has `compact_rows`
+pending rows; reads never compact, so pending rows become visible to
+lookups once they have been merged. With `compact_interval` <= 0 there is
+no background thread and appends reaching `compact_rows` compact inline.
+
+Writers lock the series with flock, so several uvicorn workers can share a
+store directory.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+SERIES_ID = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]{0,127}$")
+PENDING_DTYPE = np.dtype([("t", "<i8"), ("v", "<f4")])
+
+
+def to_millis(times):
+    """
+    Timestamps as int64 unix milliseconds: numbers are unix seconds, strings
+    are ISO 8601 (naive ones taken as UTC), datetime64 arrays are converted.
+    """
+    times = np.asarray(times)
+    if times.dtype.kind == "M":
+        return times.astype("datetime64[ms]").astype(np.int64)
+    try:
+        return np.round(times.astype(np.float64) * 1000).astype(np.int64)
+    except ValueError:
+        pass
+    try:
+        return times.astype("datetime64[ms]").astype(np.int64)  # naive ISO 8601, vectorized
+    except ValueError:
+        from datetime import datetime, timezone
+        parsed = [datetime.fromisoformat(str(t)) for t in times]
+        return np.array([round((d if d.tzinfo else d.replace(tzinfo=timezone.utc)).timestamp() * 1000)
+                         for d in parsed], dtype=np.int64)
+
+
+class SeriesNotFoundError(LookupError):
+    """Raised for a series ID the store has no data for."""
+
+    def __init__(self, series_id):
+        super().__init__(f"No stored series '{series_id}'")
+        self.series_id = series_id
+
+
+class _Mapping:
+    """Read-only float32/int64 memory maps of one generation of a series."""
+
+    def __init__(self, generation, times, values):
+        self.generation = generation
+        self.times = times
+        self.values = values
+        self.length = min(times.shape[0], values.shape[0])
+
+
+def _map(path, dtype):
+    """Read-only memory map of a flat file (an empty array for an empty file, which cannot be mapped)."""
+    count = path.stat().st_size // np.dtype(dtype).itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class SeriesStore:
+    """
+    Append-only store of timestamped float32 series with zero-copy window
+    lookups; see the module docstring for the on-disk layout.
+    """
+
+    def __init__(self, root, compact_rows=100_000, compact_interval=60.0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compact_rows = max(1, int(compact_rows))
+        self.compact_interval = float(compact_interval)
+        self._maps = {}  # series_id -> (meta mtime, times size, values size, _Mapping)
+        self._lock = threading.Lock()
+        self._stats = {"appended": 0, "pending_writes": 0, "compactions": 0, "lookups": 0}
+        self._series = len(self.list())  # kept current by list() and appends, so metrics() never scans
+        self._closed = threading.Event()
+        self._due = set()  # series with compact_rows pending rows, for the compactor
+        self._wake = threading.Event()
+        self._compactor = None
+        if self.compact_interval > 0:
+            self._compactor = threading.Thread(target=self._run, name="series-compactor", daemon=True)
+            self._compactor.start()
+
+    # Paths and locking
+
+    def _dir(self, series_id):
+        if not isinstance(series_id, str) or not SERIES_ID.match(series_id):
+            raise ValueError(f"Invalid series ID '{series_id}' (letters, digits, '_', '.', '-'; at most 128)")
+        return self.root / series_id
+
+    @staticmethod
+    def _files(path, generation):
+        return path / f"times.{generation}.i64", path / f"values.{generation}.f32"
+
+    @staticmethod
+    def _generation(path):
+        try:
+            return json.loads((path / "meta.json").read_text())["generation"]
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_meta(path, generation):
+        tmp = path / "meta.json.tmp"
+        tmp.write_text(json.dumps({"generation": generation}))
+        os.replace(tmp, path / "meta.json")
+
+    @contextmanager
+    def _locked(self, path):
+        path.mkdir(parents=True, exist_ok=True)
+        with open(path / "lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # Writes
+
+    def append(self, series_id, times, values):
+        """
+        Add rows to a series (created on first append). `times` are int64 unix
+        milliseconds (see to_millis); NaN values are dropped. Returns info().
+        """
+        path = self._dir(series_id)
+        times = np.asarray(times, dtype=np.int64).reshape(-1)
+        values = np.asarray(values, dtype=np.float32).reshape(-1)
+        if times.shape != values.shape:
+            raise ValueError(f"{times.shape[0]} timestamps for {values.shape[0]} values")
+        keep = ~np.isnan(values)
+        times, values = times[keep], values[keep]
+        if times.size:
+            # Sort the batch and keep the last value given for each timestamp
+            order = np.argsort(times, kind="stable")
+            times, values = times[order], values[order]
+            last = np.append(times[1:] != times[:-1], True)
+            times, values = times[last], values[last]
+        with self._locked(path):
+            generation = self._generation(path)
+            if generation is None:
+                generation = 0
+                for f in self._files(path, generation):
+                    f.touch()
+                self._write_meta(path, generation)
+                with self._lock:
+                    self._series += 1
+            times_path, values_path = self._files(path, generation)
+            pending_path = path / "pending.bin"
+            pending = pending_path.stat().st_size // PENDING_DTYPE.itemsize if pending_path.exists() else 0
+            self._repair(times_path, values_path)
+            end = self._last_time(times_path)
+            if pending:
+                # Rows only go in place after everything pending, so the later write wins at compaction
+                latest = int(np.fromfile(pending_path, dtype=PENDING_DTYPE, count=pending)["t"].max())
+                end = latest if end is None else max(end, latest)
+            # Rows after the stored end extend the current generation in place; the rest wait in pending
+            split = 0 if end is None else int(np.searchsorted(times, end, side="right"))
+            head_times, head_values = times[:split], values[:split]
+            times, values = times[split:], values[split:]
+            if times.size:
+                # Values first, so a concurrent reader never sees a timestamp without its value
+                with open(values_path, "ab") as f:
+                    f.write(values.astype("<f4").tobytes())
+                with open(times_path, "ab") as f:
+                    f.write(times.astype("<i8").tobytes())
+                self._stats["appended"] += int(times.size)
+            if head_times.size:
+                rows = np.empty(head_times.size, dtype=PENDING_DTYPE)
+                rows["t"], rows["v"] = head_times, head_values
+                with open(pending_path, "ab") as f:
+                    f.write(rows.tobytes())
+                self._stats["pending_writes"] += int(head_times.size)
+                if pending + head_times.size >= self.compact_rows:
+                    if self._compactor is None:
+                        self._compact_locked(path)
+                    else:
+                        with self._lock:
+                            self._due.add(series_id)
+                        self._wake.set()
+        return self.info(series_id)
+
+    @staticmethod
+    def _repair(times_path, values_path):
+        """Cut a half-written append (values written, timestamps not) so the two files line up again."""
+        n = min(times_path.stat().st_size // 8, values_path.stat().st_size // 4)
+        for f, itemsize in ((times_path, 8), (values_path, 4)):
+            if f.stat().st_size != n * itemsize:
+                os.truncate(f, n * itemsize)
+
+    @staticmethod
+    def _last_time(times_path):
+        size = times_path.stat().st_size
+        if size < 8:
+            return None
+        with open(times_path, "rb") as f:
+            f.seek((size // 8 - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype="<i8")[0])
+
+    def compact(self, series_id):
+        """Merge a series' pending rows into a new sorted generation. Returns the rows merged."""
+        path = self._dir(series_id)
+        if not (path / "meta.json").exists():
+            raise SeriesNotFoundError(series_id)
+        with self._locked(path):
+            return self._compact_locked(path)
+
+    def _compact_locked(self, path):
+        pending_path = path / "pending.bin"
+        if not pending_path.exists() or pending_path.stat().st_size < PENDING_DTYPE.itemsize:
+            return 0
+        generation = self._generation(path) or 0
+        old_times, old_values = self._files(path, generation)
+        times = _map(old_times, "<i8")
+        values = _map(old_values, "<f4")
+        n = min(times.shape[0], values.shape[0])
+        rows = np.fromfile(pending_path, dtype=PENDING_DTYPE)
+        all_times = np.concatenate([times[:n], rows["t"]])
+        all_values = np.concatenate([values[:n], rows["v"]])
+        # Stable sort keeps pending rows after stored rows with the same timestamp, so the later write wins
+        order = np.argsort(all_times, kind="stable")
+        all_times, all_values = all_times[order], all_values[order]
+        last = np.append(all_times[1:] != all_times[:-1], True)
+        new_times, new_values = self._files(path, generation + 1)
+        all_times[last].astype("<i8").tofile(new_times)
+        all_values[last].astype("<f4").tofile(new_values)
+        self._write_meta(path, generation + 1)
+        os.remove(pending_path)
+        # Open mappings of the old generation stay valid after the unlink
+        for f in (old_times, old_values):
+            try:
+                os.remove(f)
+            except FileNotFoundError:
+                pass
+        self._stats["compactions"] += 1
+        return int(rows.shape[0])
+
+    def compact_all(self):
+        """Compact every series with pending rows. Returns the rows merged."""
+        merged = 0
+        for series_id in self.list():
+            if (self.root / series_id / "pending.bin").exists():
+                merged += self.compact(series_id)
+        return merged
+
+    def _run(self):
+        """Compactor thread: series that reached compact_rows as they do, every series each interval."""
+        next_sweep = time.monotonic() + self.compact_interval
+        while not self._closed.is_set():
+            self._wake.wait(max(0.0, next_sweep - time.monotonic()))
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            with self._lock:
+                due, self._due = self._due, set()
+            try:
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.compact_interval
+                    self.compact_all()
+                else:
+                    for series_id in due:
+                        self.compact(series_id)
+            except Exception as e:
+                print(f"Warning: series compaction failed: {e}")
+
+    # Reads
+
+    def _mapping(self, series_id):
+        path = self._dir(series_id)
+        for _ in range(3):
+            try:
+                meta_mtime = (path / "meta.json").stat().st_mtime_ns
+                generation = self._generation(path)
+            except FileNotFoundError:
+                raise SeriesNotFoundError(series_id)
+            if generation is None:
+                raise SeriesNotFoundError(series_id)
+            times_path, values_path = self._files(path, generation)
+            try:
+                times_size = times_path.stat().st_size
+                values_size = values_path.stat().st_size
+            except FileNotFoundError:
+                continue  # compacted between reading meta.json and the files
+            with self._lock:
+                cached = self._maps.get(series_id)
+            if cached is not None and cached[:3] == (meta_mtime, times_size, values_size):
+                return cached[3]
+            try:
+                times = _map(times_path, "<i8")
+                values = _map(values_path, "<f4")
+            except FileNotFoundError:
+                continue
+            mapping = _Mapping(generation, times, values)
+            with self._lock:
+                self._maps[series_id] = (meta_mtime, times_size, values_size, mapping)
+            return mapping
+        raise RuntimeError(f"Series '{series_id}' kept changing while being opened")
+
+    def window(self, series_id, length, as_of=None):
+        """
+        The `length` values up to and including `as_of` (unix ms; default: the
+        latest), as a read-only float32 view of the memory map, and the
+        timestamp of its last value. ValueError if fewer values precede as_of.
+        Pending (not yet compacted) rows are not included.
+        """
+        mapping = self._mapping(series_id)
+        end = mapping.length
+        if as_of is not None:
+            end = int(np.searchsorted(mapping.times[:end], int(as_of), side="right"))
+        length = int(length or end)
+        if end < length or end == 0:
+            raise ValueError(f"Series '{series_id}' has {end} values up to as_of, model needs ≥ {length}")
+        self._stats["lookups"] += 1
+        return mapping.values[end - length:end], int(mapping.times[end - 1])
+
+    def info(self, series_id):
+        """Length, first/last timestamp (unix ms) and pending rows of a series."""
+        mapping = self._mapping(series_id)
+        path = self._dir(series_id)
+        pending_path = path / "pending.bin"
+        pending = pending_path.stat().st_size // PENDING_DTYPE.itemsize if pending_path.exists() else 0
+        n = mapping.length
+        return {
+            "series_id": series_id,
+            "length": n,
+            "start": int(mapping.times[0]) if n else None,
+            "end": int(mapping.times[n - 1]) if n else None,
+            "pending": pending,
+            "generation": mapping.generation,
+        }
+
+    def list(self):
+        """IDs of all stored series."""
+        ids = sorted(p.name for p in self.root.iterdir() if (p / "meta.json").exists())
+        with self._lock:
+            self._series = len(ids)
+        return ids
+
+    def metrics(self):
+        """Counters and the series count as of the last list() (the compactor lists every interval)."""
+        with self._lock:
+            return self._stats | {"series": self._series}
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+        with self._lock:
+            self._maps.clear()
@@ -0,0 +1,102 @@
+import time
+import uuid
+
+import numpy as np
+
+from ml.parsing import SeriesBuffer
+
+
+class ForecastSession:
+    """
+    Live forecast state for one meter: the last `window` scaled readings in a
+    bounded buffer plus the model/transform/horizon the client asked for.
+    Appending a reading scales only that reading, so the cost of an update
+    does not depend on how much history the client has sent.
+    """
+
+    def __init__(self, model_name, window, transform=None, horizon=10, mode="auto"):
+        self.id = uuid.uuid4().hex
+        self.model_name = model_name
+        self.window = window
+        self.transform = transform
+        self.horizon = horizon
+        self.mode = mode
+        self.values = SeriesBuffer(keep_last=window, capacity=4 * window)
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+
+    def append(self, scaled_values):
+        self.values.extend(np.asarray(scaled_values, dtype=np.float32).reshape(-1))
+        self.last_active = time.monotonic()
+
+    def ready(self):
+        return self.values.size >= self.window
+
+    def current_window(self):
+        """Copy of the trailing (1, window) scaled values, safe to hand to a worker thread."""
+        return np.array(self.values.values()[-self.window:], dtype=np.float32).reshape(1, -1)
+
+    def info(self):
+        return {
+            "session_id": self.id,
+            "model": self.model_name,
+            "transform": self.transform,
+            "horizon": self.horizon,
+            "window": self.window,
+            "readings_seen": self.values.total,
+            "ready": self.ready(),
+        }
+
+
+class SessionManager:
+    """
+    Bounded set of ForecastSessions. Sessions idle for longer than
+    `idle_timeout` seconds are evicted, and creating a session beyond
+    `max_sessions` evicts the least recently active one.
+    """
+
+    def __init__(self, max_sessions=1000, idle_timeout=300.0):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self._sessions = {}
+        self.created = 0
+        self.evicted = 0
+
+    def create(self, *args, **kwargs):
+        self.evict_idle()
+        if len(self._sessions) >= self.max_sessions:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_active)
+            self.close(oldest.id)
+            self.evicted += 1
+        session = ForecastSession(*args, **kwargs)
+        self._sessions[session.id] = session
+        self.created += 1
+        return session
+
+    def get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is not None and time.monotonic() - session.last_active > self.idle_timeout:
+            self.close(session_id)
+            self.evicted += 1
+            return None
+        return session
+
+    def close(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = [sid for sid, s in self._sessions.items() if s.last_active < cutoff]
+        for sid in stale:
+            self.close(sid)
+        self.evicted += len(stale)
+        return len(stale)
+
+    def metrics(self):
+        return {
+            "active": len(self._sessions),
+            "created": self.created,
+            "evicted": self.evicted,
+            "max_sessions": self.max_sessions,
+            "idle_timeout_s": self.idle_timeout,
+        }
@@ -0,0 +1,126 @@
+"""
+SHAP computation that runs inside the SHAP process pool.
+
+Worker processes do not share the server's models, so each one loads the
+Keras model files it is asked about once and keeps them for later jobs.
+Explainers are cached per (model, transform, window length) with LRU
+eviction under SHAP_EXPLAINER_CACHE_MB, and always use the fixed,
+precomputed background from ml.backgrounds so results are reproducible. The cheaper
+attribution methods in ml.attribution also run here, via compute_attribution.
+"""
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml.attribution import divergence, integrated_gradients, segment_attributions
+from ml.backgrounds import load_background
+from ml.cache import LRUCache
+from ml.transforms import apply_transform
+
+SHAP_SEED = 0
+
+# Models loaded in this worker process, keyed by file path
+_models = {}
+_explainers = LRUCache(
+    max_entries=int(os.environ.get("SHAP_EXPLAINER_CACHE_SIZE", "16")),
+    max_bytes=int(float(os.environ.get("SHAP_EXPLAINER_CACHE_MB", "256")) * 1024 * 1024),
+)
+
+
+def _load_model(model_path):
+    model = _models.get(model_path)
+    if model is None:
+        from tensorflow import keras
+        model = keras.models.load_model(model_path, compile=False)
+        _models[model_path] = model
+    return model
+
+
+def _get_explainer(model_name, model_path, transform, length, background_size=None):
+    key = (model_name, transform, length, background_size)
+    explainer = _explainers.get(key)
+    if explainer is None:
+        import shap
+        model = _load_model(model_path)
+        background = load_background(Path(model_path).parent, model_name, length)[:background_size]
+        background = apply_transform(transform, background)
+        background = background.reshape(background.shape[0], length, 1)
+        explainer = shap.GradientExplainer(model, background)
+        # Rough footprint: the background plus a copy of the model's weights for the gradient graph
+        nbytes = background.nbytes + sum(w.nbytes for w in model.get_weights())
+        _explainers.put(key, explainer, nbytes)
+    return explainer
+
+
+def _reference(model_path, model_name, transform, length):
+    """Mean of the (transformed) background: the reference input for IG and occlusion."""
+    background = apply_transform(transform, load_background(Path(model_path).parent, model_name, length))
+    return background.mean(axis=0).reshape(1, length, 1).astype(np.float32)
+
+
+def compute_attribution(model_name, model_path, transform, arr_input, method="exact",
+                        steps=32, segments=8, refine=2, compare=False, background_size=None):
+    """
+    Per-timestep attributions with the selected method: "exact"
+    (GradientExplainer over the first `background_size` background rows, all
+    by default), "ig" (integrated gradients with `steps` path samples) or
+    "segment" (`segments` occluded blocks, `refine` of them refined per
+    timestep). Returns a dict with base_value, values, latency_ms and, when
+    `compare` is set for a non-exact method, the exact latency and divergence.
+    """
+    t0 = time.perf_counter()
+    if method == "exact":
+        base_value, values = compute_shap(model_name, model_path, transform, arr_input, background_size)
+    else:
+        model = _load_model(model_path)
+        reference = _reference(model_path, model_name, transform, arr_input.shape[1])
+        if method == "ig":
+            base_value, values = integrated_gradients(model, arr_input, reference, steps=steps)
+        elif method == "segment":
+            base_value, values = segment_attributions(model, arr_input, reference, segments=segments, refine=refine)
+        else:
+            raise ValueError(f"Unknown attribution method '{method}'")
+        values = [float(v) for v in values]
+    result = {
+        "base_value": base_value,
+        "values": values,
+        "latency_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+    }
+    if compare and method != "exact":
+        t1 = time.perf_counter()
+        _, exact = compute_shap(model_name, model_path, transform, arr_input)
+        result["exact_latency_ms"] = round((time.perf_counter() - t1) * 1000.0, 3)
+        result["divergence"] = divergence(values, exact)
+    return result
+
+
+def compute_shap(model_name, model_path, transform, arr_input, background_size=None):
+    """
+    Explain one (1, timesteps, 1) input with a cached GradientExplainer
+    (over the first `background_size` background rows, all by default).
+    `transform` is the lower-case transform already applied to `arr_input`
+    ('none' if untransformed); the background gets the same transform.
+    Returns (base_value, flat list of per-timestep SHAP values).
+    """
+    explainer = _get_explainer(model_name, model_path, transform, arr_input.shape[1], background_size)
+    # GradientExplainer samples background rows and interpolation points with np.random
+    np.random.seed(SHAP_SEED)
+    shap_result = explainer(arr_input)
+
+    # Handle base value safely
+    base_value = shap_result.base_values
+    if base_value is None:
+        base_value = 0.0
+    elif isinstance(base_value, (list, np.ndarray)):
+        base_value = float(np.array(base_value).flatten()[0])
+    else:
+        base_value = float(base_value)
+
+    # SHAP values
+    shap_vals = shap_result.values
+    if isinstance(shap_vals, list):
+        shap_vals = shap_vals[0]
+    shap_flat = np.array(shap_vals).flatten()
+    return base_value, [float(v) for v in shap_flat]
@@ -2,21 +2,97 @@ import numpy as np
 from scipy.fftpack import dct
 import pywt
 
-def apply_dct(data: np.ndarray) -> np.ndarray:
+# All kernels are batch-first: they take an (N, L) array of windows (a 1-D
+# series is treated as N=1), keep the input's floating dtype and optionally
+# write into a preallocated (N, L) `out` buffer instead of returning a new
+# array. They still allocate temporaries up to about the input's size (the
+# DCT/DWT results, and cs's copy of its input when `out` is the input).
+
+
+def _as_batch(data):
+    data = np.asarray(data)
     if data.ndim == 1:
         data = data.reshape(1, -1)  # (1, N)
-    return dct(data, norm='ortho', axis=1)
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+    return data
 
-def apply_dwt(data: np.ndarray) -> np.ndarray:
-    if data.ndim == 1:
-        data = data.reshape(1, -1)
-    coeffs = [pywt.dwt(row, 'haar')[0] for row in data]
-    padded = [np.pad(c, (0, data.shape[1] - len(c))) for c in coeffs]
-    return np.array(padded)
 
-def apply_cs(data: np.ndarray) -> np.ndarray:
-    if data.ndim == 1:
-        data = data.reshape(1, -1)
-    compressed = [row[::2] for row in data]  # keep every 2nd sample
-    padded = [np.pad(row, (0, data.shape[1] - len(row))) for row in compressed]
-    return np.array(padded)
+def _output(data, out):
+    if out is None:
+        return np.empty_like(data)
+    if out.shape != data.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {data.shape}")
+    return out
+
+
+def apply_dct(data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    data = _as_batch(data)
+    out = _output(data, out)
+    out[...] = dct(data, norm='ortho', axis=1)
+    return out
+
+
+def apply_dwt(data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    # Haar approximation coefficients, zero-padded back to the window length
+    data = _as_batch(data)
+    out = _output(data, out)
+    approx = pywt.dwt(data, 'haar', axis=1)[0]
+    m = approx.shape[1]
+    out[:, :m] = approx
+    out[:, m:] = 0
+    return out
+
+
+def apply_cs(data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    # Keep every 2nd sample, zero-padded back to the window length
+    data = _as_batch(data)
+    out = _output(data, out)
+    m = (data.shape[1] + 1) // 2
+    out[:, :m] = data[:, ::2]
+    out[:, m:] = 0
+    return out
+
+
+# Transform registry: request names are matched case-insensitively
+TRANSFORMS = {
+    'dct': apply_dct,
+    'dwt': apply_dwt,
+    'cs': apply_cs,
+}
+TRANSFORM_NAMES = [name.upper() for name in TRANSFORMS]
+
+
+def resolve_transform(name):
+    """
+    Registry name ('dct', 'dwt', 'cs' or 'none') for a request's transform
+    name, matched case-insensitively; ValueError for names not in the registry.
+    """
+    if not name or str(name).lower() == "none":
+        return "none"
+    key = str(name).lower()
+    if key not in TRANSFORMS:
+        raise ValueError(f"Unknown transform '{name}' (expected one of {TRANSFORM_NAMES} or none)")
+    return key
+
+
+def get_transform(name):
+    """Kernel for a transform name, or None for no/unknown transform."""
+    if not name:
+        return None
+    return TRANSFORMS.get(str(name).lower())
+
+
+def apply_transform(name, data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Apply the named transform to an (N, L) batch (or a 1-D series).
+    'none', empty and unknown names leave the data unchanged.
+    """
+    kernel = get_transform(name)
+    if kernel is not None:
+        return kernel(data, out=out)
+    data = _as_batch(data)
+    if out is None:
+        return data
+    out[...] = data
+    return out
@@ -0,0 +1,108 @@
+"""
+Probabilistic forecasts from K stochastic rollouts run as one (K, L, 1) batch.
+
+Two sources of randomness are supported:
+  - "dropout": MC dropout, i.e. the Keras model called with training=True so
+    its Dropout layers sample a different sub-network per row and per step.
+    Only models that contain Dropout layers (of the bundled ones, the
+    transformer) can use it.
+  - "bootstrap": the deterministic model plus one-step residuals resampled
+    from the backtest errors (`python -m ml.backtest --save-residuals`),
+    added to each prediction before it is fed back into the window.
+"auto" picks dropout when the model has Dropout layers, else bootstrap.
+Either way every step is a single model call for all K samples.
+
+A seed makes bootstrap paths repeatable. It is rejected for dropout: the
+Dropout layers draw from TensorFlow's global generator inside an already
+traced step function, which a per-request seed cannot reset without
+touching every other request's randomness.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from ml.forecasting import RingWindow, get_step_fn, predict_batch
+
+METHODS = ["auto", "dropout", "bootstrap"]
+DEFAULT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+_residuals = {}
+
+
+def residuals_path(model_dir, model_name, transform=None):
+    """Where the backtest saves one-step residuals (scaled units): <model>_<transform>_residuals.npy."""
+    return Path(model_dir) / f"{model_name}_{(transform or 'none').lower()}_residuals.npy"
+
+
+def load_residuals(model_dir, model_name, transform=None):
+    """Cached residual pool for a (model, transform), or None if the backtest has not saved one."""
+    path = residuals_path(model_dir, model_name, transform)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    entry = _residuals.get(path)
+    if entry is None or entry[0] != mtime:
+        values = np.load(path).astype(np.float32).reshape(-1)
+        entry = _residuals[path] = (mtime, values[np.isfinite(values)])
+    return entry[1] if entry[1].size else None
+
+
+def has_dropout(model):
+    """True for Keras models with at least one Dropout layer (engines and remote models have no layers)."""
+    layers = getattr(model, "layers", None)
+    if not layers:
+        return False
+    stack = list(layers)
+    while stack:
+        layer = stack.pop()
+        if "Dropout" in type(layer).__name__:
+            return True
+        stack.extend(getattr(layer, "layers", []) or [])
+    return False
+
+
+def resolve_method(method, model, residuals):
+    """The concrete sampling method for a request, or ValueError if it cannot be used."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown uncertainty method '{method}' (expected one of {METHODS})")
+    if method == "auto":
+        method = "dropout" if has_dropout(model) else "bootstrap"
+    if method == "dropout" and not has_dropout(model):
+        raise ValueError("MC dropout needs a Keras model with Dropout layers")
+    if method == "bootstrap" and residuals is None:
+        raise ValueError("No backtest residuals for this model and transform; "
+                         "run python -m ml.backtest <history.csv> --save-residuals")
+    return method
+
+
+def sample_rollouts(model, window, horizon, samples, method="bootstrap", residuals=None, seed=None):
+    """
+    K = `samples` recursive rollouts of one (L,) scaled window, all advanced
+    together, one model call per step. Returns a (K, horizon) float32 array
+    of sampled paths in scaled units. `seed` (bootstrap only; ValueError
+    for dropout) makes the paths repeatable.
+    """
+    if seed is not None and method == "dropout":
+        raise ValueError("'seed' applies to bootstrap sampling only; MC-dropout paths cannot be made repeatable "
+                         "(use \"uncertainty\": \"bootstrap\" for repeatable bands)")
+    rng = np.random.default_rng(seed)
+    horizon = max(int(horizon), 0)
+    ring = RingWindow(np.broadcast_to(np.asarray(window, dtype=np.float32).reshape(1, -1), (samples, np.size(window))))
+    paths = np.empty((samples, horizon), dtype=np.float32)
+    step = get_step_fn(model, training=True) if method == "dropout" else None
+    for t in range(horizon):
+        x = ring.view()[:, :, None]
+        if step is not None:
+            y = np.asarray(step(x)).reshape(samples, -1)[:, 0]
+        else:
+            y = predict_batch(model, x)[:, 0] + rng.choice(residuals, size=samples)
+        paths[:, t] = y
+        ring.push(y)
+    return paths
+
+
+def quantile_bands(paths, quantiles=DEFAULT_QUANTILES):
+    """{"0.05": [per-step values], ...} for (K, horizon) sampled paths."""
+    bands = np.quantile(paths, quantiles, axis=0)
+    return {f"{q:g}": band.tolist() for q, band in zip(quantiles, bands)}
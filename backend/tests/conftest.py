@@ -0,0 +1,74 @@
+"""
+Shared fixtures. The backend is imported once, with its stores in a
+temporary directory, result caches and admission control off, and the
+LLM pool shrunk to one worker with a short queue timeout, so saturation
+is quick to provoke. Run from the backend directory: python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update({
+    "CUDA_VISIBLE_DEVICES": "-1",
+    "RESULT_CACHE": "0",
+    "ADMISSION": "0",
+    "LLM_WORKERS": "1",
+    "LLM_QUEUE_TIMEOUT": "0.2",
+    "FEEDBACK_DB": str(Path(_tmp) / "feedback.db"),
+    "SERIES_DIR": str(Path(_tmp) / "series"),
+    "OLLAMA_HOST": "http://fake-ollama",
+})
+
+
+# Everything importing main (and driving it over httpx) needs; tests using the app skip without them
+MAIN_DEPENDENCIES = ["numpy", "joblib", "psutil", "scipy", "pywt", "pydantic", "fastapi", "httpx"]
+
+
+@pytest.fixture(scope="session")
+def main():
+    for name in MAIN_DEPENDENCIES:
+        pytest.importorskip(name)
+    import main as backend
+    return backend
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run a coroutine on one loop shared by all tests (the pools' semaphores bind to the first loop using them)."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def client(main):
+    """An httpx client for the backend app, in process."""
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://backend", timeout=30)
+
+
+@pytest.fixture
+def fake_ollama(main):
+    """install(first_token_ms, token_ms, timeout) points the backend's Ollama client at a fresh fake server app."""
+    import httpx
+    from benchmarks.fake_ollama import create_app
+
+    def install(first_token_ms=0.0, token_ms=0.0, timeout=5.0):
+        app = create_app(first_token_ms=first_token_ms, token_ms=token_ms)
+        main.ollama._client = httpx.AsyncClient(
+            base_url="http://fake-ollama", transport=httpx.ASGITransport(app=app), timeout=timeout
+        )
+        main.ollama._available = None
+        return app
+
+    yield install
+    main.ollama._client = None
+    main.ollama._available = None
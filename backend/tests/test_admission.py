@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+ORIGIN = "http://localhost:5173"
+_questions = itertools.count()
+
+
+def explain_body(stream=False):
+    return {"question": f"What drives the peak? #{next(_questions)}", "shap_values": {"t0": 0.1}, "stream": stream}
+
+
+@pytest.fixture
+def llm_class(main, monkeypatch):
+    monkeypatch.setattr(main, "ADMISSION", True)
+    return main.admission.classes["llm"]
+
+
+def test_invalid_deadline_gets_400_with_cors_headers(run, client, llm_class):
+    resp = run(client.post("/explain", json=explain_body(), headers={"Origin": ORIGIN, "X-Deadline-Ms": "soon"}))
+    assert resp.status_code == 400
+    assert resp.headers["access-control-allow-origin"] == ORIGIN
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_shed_requests_get_status_retry_after_and_cors_headers(run, client, llm_class, monkeypatch, status):
+    # Hold every slot of the class, so the request would have to queue
+    tickets = [run(llm_class.admit()) for _ in range(llm_class.max_concurrent)]
+    rejected = llm_class.metrics()["rejected_deadline" if status == 503 else "rejected_queue_full"]
+    if status == 429:
+        monkeypatch.setattr(llm_class, "max_queue", 0)  # queue already full
+    try:
+        # A zero deadline cannot cover any wait for a slot
+        headers = {"Origin": ORIGIN, "X-Deadline-Ms": "0"}
+        resp = run(client.post("/explain", json=explain_body(), headers=headers))
+    finally:
+        for ticket in tickets:
+            llm_class.release(ticket)
+    assert resp.status_code == status
+    assert int(resp.headers["retry-after"]) >= 1
+    assert resp.headers["access-control-allow-origin"] == ORIGIN
+    assert llm_class.metrics()["rejected_deadline" if status == 503 else "rejected_queue_full"] == rejected + 1
+    assert llm_class.metrics()["active"] == 0
+
+
+def test_preflight_is_not_admitted(run, client, llm_class):
+    admitted = llm_class.metrics()["admitted"]
+    headers = {"Origin": ORIGIN, "Access-Control-Request-Method": "POST"}
+    resp = run(client.options("/explain", headers=headers))
+    assert resp.status_code == 200
+    assert resp.headers["access-control-allow-origin"] == ORIGIN
+    assert llm_class.metrics()["admitted"] == admitted
+
+
+def test_streamed_response_holds_its_slot_until_the_body_is_sent(run, client, fake_ollama, llm_class):
+    fake_ollama(token_ms=20)
+
+    async def mid_stream():
+        request = asyncio.create_task(client.post("/explain", json=explain_body(stream=True)))
+        await asyncio.sleep(0.1)  # the handler has returned; tokens are still being sent
+        active = llm_class.metrics()["active"]
+        return active, await request
+
+    active, resp = run(mid_stream())
+    assert resp.status_code == 200
+    assert active == 1
+    assert llm_class.metrics()["active"] == 0
+
+
+def test_degraded_forecast_is_not_served_to_a_full_request(run, client, main, monkeypatch):
+    pytest.importorskip("tensorflow")
+    monkeypatch.setattr(main, "RESULT_CACHE", True)
+    body = {"model": "lstm", "data": list(range(48)), "horizon": 3,
+            "samples": main.FORECAST_DEGRADED_SAMPLES + 1, "seed": 0}
+
+    monkeypatch.setattr(main, "admission_degraded", lambda: True)  # as if the request had queued
+    resp = run(client.post("/forecast", json=body))
+    assert resp.status_code == 200
+    assert resp.json()["degraded"] == {"samples": main.FORECAST_DEGRADED_SAMPLES}
+
+    monkeypatch.setattr(main, "admission_degraded", lambda: False)
+    resp = run(client.post("/forecast", json=body))
+    assert resp.status_code == 200
+    assert "degraded" not in resp.json()
@@ -0,0 +1,84 @@
+import itertools
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from benchmarks.fake_ollama import ANSWER  # noqa: E402
+
+SHAP_VALUES = {f"Timestep t{i}": 0.01 * i for i in range(24)}
+_questions = itertools.count()
+
+
+def explain_body(stream=False):
+    # A new question each time, so answers never come from the explain cache
+    return {"question": f"Why did the forecast rise? #{next(_questions)}", "shap_values": SHAP_VALUES, "stream": stream}
+
+
+def test_explain_answer_from_ollama(main, run, client, fake_ollama):
+    ollama = fake_ollama()
+    resp = run(client.post("/explain", json=explain_body()))
+    assert resp.status_code == 200
+    assert resp.json() == {"answer": ANSWER}
+    assert ollama.state.calls == 1
+    assert main.llm_pool.metrics()["active"] == 0
+
+
+def test_explain_streams_ndjson_tokens(main, run, client, fake_ollama):
+    fake_ollama(token_ms=1)
+    resp = run(client.post("/explain", json=explain_body(stream=True)))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+    assert lines[-1] == {"done": True, "cached": False}
+    assert len(lines) > 2
+    assert "".join(line["token"] for line in lines[:-1]).strip() == ANSWER
+    assert main.llm_pool.metrics()["active"] == 0
+
+
+def test_explain_falls_back_when_ollama_times_out(main, run, client, fake_ollama, monkeypatch):
+    fake_ollama(first_token_ms=2000, timeout=0.2)
+    monkeypatch.setattr(main, "hf_generate", lambda prompt: "fallback answer")
+    resp = run(client.post("/explain", json=explain_body()))
+    assert resp.status_code == 200
+    assert resp.json() == {"answer": "fallback answer"}
+    assert main.llm_pool.metrics()["active"] == 0
+
+
+def test_explain_returns_503_when_llm_pool_is_saturated(main, run, client, fake_ollama):
+    import asyncio
+    fake_ollama(first_token_ms=600)
+
+    async def overlapping():
+        first = asyncio.create_task(client.post("/explain", json=explain_body(stream=True)))
+        await asyncio.sleep(0.1)  # the first request now holds the only LLM slot
+        second = await client.post("/explain", json=explain_body(stream=True))
+        return await first, second
+
+    first, second = run(overlapping())
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert "Retry-After" in second.headers
+    assert main.llm_pool.metrics()["active"] == 0
+
+
+def test_streaming_slot_released_when_client_disconnects_before_body(main, run, fake_ollama):
+    fake_ollama()
+    response = run(main.explain_endpoint(main.ExplainRequest(**explain_body(stream=True))))
+    assert main.llm_pool.metrics()["active"] == 1
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}, "method": "POST", "path": "/explain", "headers": []}
+    try:
+        run(response(scope, receive, send))
+    except Exception:  # the send error, possibly wrapped by Starlette's task group
+        pass
+    assert main.llm_pool.metrics()["active"] == 0
@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+keras = pytest.importorskip("tensorflow").keras
+
+from ml.backgrounds import load_background  # noqa: E402
+from ml.engines import TFLiteEngine, tflite_path  # noqa: E402
+from ml.export import MODEL_DIR, PARITY_TOLERANCES, check_parity, convert  # noqa: E402
+from ml.forecasting import window_length  # noqa: E402
+
+MODELS = ["lstm", "cnn_lstm", "transformer"]
+
+
+@pytest.fixture(scope="module")
+def keras_models():
+    return {}
+
+
+@pytest.mark.parametrize("quantize", [None, "float16", "int8"])
+@pytest.mark.parametrize("name", MODELS)
+def test_exported_engine_matches_keras(tmp_path, keras_models, name, quantize):
+    model = keras_models.get(name)
+    if model is None:
+        model = keras_models[name] = keras.models.load_model(str(MODEL_DIR / f"{name}_model.h5"), compile=False)
+    windows = load_background(MODEL_DIR, name, window_length(model))
+    path = tflite_path(tmp_path, name, quantize)
+    path.write_bytes(convert(model, quantize, representative=windows))
+    assert check_parity(model, TFLiteEngine(path), windows) <= PARITY_TOLERANCES[quantize]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+keras = pytest.importorskip("tensorflow").keras
+
+from ml.forecasting import rollout, window_length  # noqa: E402
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'ml' / 'models'
+HORIZON = 12
+
+
+def reference_forecast(model, window, horizon, per_call=1):
+    """The per-step loop /forecast used before rollout: predict, take outputs, vstack them onto the window."""
+    arr = np.asarray(window, dtype=float).reshape(-1, 1)
+    predictions = []
+    while len(predictions) < horizon:
+        y_pred = model.predict(arr.reshape(1, arr.shape[0], 1), verbose=0).flatten()
+        for y_val in y_pred[:min(per_call, horizon - len(predictions))]:
+            predictions.append(float(y_val))
+            arr = np.vstack([arr[1:], np.array([[y_val]], dtype=float)])
+    return np.array(predictions)
+
+
+@pytest.fixture(scope="module")
+def windows():
+    return np.random.default_rng(0).random((3, 24)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def multi_output_model():
+    """A small 3-step model, for the direct path (the bundled models emit one step)."""
+    keras.utils.set_random_seed(0)
+    return keras.Sequential([
+        keras.layers.Input(shape=(24, 1)),
+        keras.layers.Flatten(),
+        keras.layers.Dense(16, activation="tanh"),
+        keras.layers.Dense(3),
+    ])
+
+
+@pytest.mark.parametrize("name", ["lstm", "cnn_lstm", "transformer"])
+def test_recursive_rollout_matches_per_step_loop(windows, name):
+    model = keras.models.load_model(str(MODEL_DIR / f"{name}_model.h5"), compile=False)
+    windows = windows[:, -window_length(model):]
+    predictions, _ = rollout(model, windows, HORIZON, mode="recursive")
+    for i, window in enumerate(windows):
+        np.testing.assert_allclose(predictions[i], reference_forecast(model, window, HORIZON), rtol=1e-4, atol=1e-5)
+
+
+def test_direct_rollout_matches_per_call_loop(windows, multi_output_model):
+    predictions, final = rollout(multi_output_model, windows, HORIZON + 1, mode="direct")
+    for i, window in enumerate(windows):
+        expected = reference_forecast(multi_output_model, window, HORIZON + 1, per_call=3)
+        np.testing.assert_allclose(predictions[i], expected, rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(final[:, -(HORIZON + 1):], predictions, rtol=1e-6)
+
+
+def test_recursive_rollout_of_multi_output_model_uses_first_output(windows, multi_output_model):
+    predictions, _ = rollout(multi_output_model, windows[:1], HORIZON, mode="recursive")
+    np.testing.assert_allclose(predictions[0], reference_forecast(multi_output_model, windows[0], HORIZON),
+                               rtol=1e-4, atol=1e-5)
@@ -0,0 +1,13 @@
+from ml.llm import prompt_cache_key
+
+
+def test_small_shap_values_keep_distinct_keys():
+    a = {"Timestep t0": 0.00012, "Timestep t1": -0.00034}
+    b = {"Timestep t0": 0.00021, "Timestep t1": -0.00043}
+    assert prompt_cache_key("Why?", a) != prompt_cache_key("Why?", b)
+
+
+def test_key_ignores_noise_beyond_three_significant_digits():
+    a = {"Timestep t0": 0.000123401, "Timestep t1": 12.3401}
+    b = {"Timestep t1": 12.3399, "Timestep t0": 0.000123399}
+    assert prompt_cache_key("Why did it rise?", a) == prompt_cache_key("  why did it RISE ", b)
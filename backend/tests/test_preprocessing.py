@@ -0,0 +1,113 @@
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("pywt")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+from ml.preprocessing import PreprocessPlan  # noqa: E402
+from ml.transforms import apply_transform  # noqa: E402
+
+LENGTH = 4096  # long enough that one buffer dwarfs the Python objects a call creates
+TRANSFORMS = [None, "dct", "dwt", "cs"]
+
+
+class WindowShape:
+    """Stands in for a loaded model: the plan only reads input_shape."""
+
+    def __init__(self, length):
+        self.input_shape = (None, length, 1)
+
+
+@pytest.fixture(scope="module")
+def history():
+    rng = np.random.default_rng(0)
+    return (rng.random((LENGTH + 100, 1)) * 100).astype(np.float32)  # what parse_input returns
+
+
+@pytest.fixture(scope="module")
+def scaler(history):
+    return preprocessing.MinMaxScaler().fit(history)
+
+
+def peak_bytes(fn, calls=20):
+    """Most memory allocated at once during a call, temporaries included."""
+    fn()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_window_matches_scaler_and_transform(history, scaler, transform):
+    plan = PreprocessPlan(WindowShape(LENGTH), transform, scaler)
+    expected = scaler.transform(history[-LENGTH:]).reshape(1, -1)
+    if transform:
+        expected = apply_transform(transform, expected)
+    with plan.window(history) as x:
+        assert x.shape == (1, LENGTH, 1) and x.dtype == np.float32
+        np.testing.assert_allclose(x.reshape(1, -1), expected, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_window_reuses_its_buffer(history, scaler, transform):
+    plan = PreprocessPlan(WindowShape(LENGTH), transform, scaler)
+    with plan.window(history) as x:
+        first = x.__array_interface__["data"][0]
+    for _ in range(3):
+        with plan.window(history) as x:
+            assert x.__array_interface__["data"][0] == first
+
+
+# Most a fill may allocate, in buffers: the affine scaling allocates nothing, the kernels
+# need their result (dct, dwt) or a copy of the overlapping input half (cs)
+FILL_LIMITS = {None: 0.25, "cs": 0.75, "dct": 2.5, "dwt": 3.5}
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_fill_allocates_within_the_kernels_limit(history, scaler, transform):
+    plan = PreprocessPlan(WindowShape(LENGTH), transform, scaler)
+    series = plan.trim(history)
+    buf = np.empty((1, LENGTH), dtype=np.float32)
+    assert peak_bytes(lambda: plan.fill(series, buf)) < FILL_LIMITS[transform] * buf.nbytes
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_window_allocation_does_not_grow_with_history(scaler, transform):
+    plan = PreprocessPlan(WindowShape(LENGTH), transform, scaler)
+    long_history = np.random.default_rng(1).random((LENGTH * 50, 1)).astype(np.float32)
+
+    def one_request():
+        with plan.window(long_history) as x:
+            return x
+
+    assert peak_bytes(one_request) < FILL_LIMITS[transform] * LENGTH * 4 + 4096
+
+
+@pytest.mark.parametrize("options", [{}, {"with_mean": False}, {"with_std": False}])
+def test_standard_scaler_options_are_respected(history, options):
+    scaler = preprocessing.StandardScaler(**options).fit(history)
+    plan = PreprocessPlan(WindowShape(LENGTH), None, scaler)
+    expected = scaler.transform(history[-LENGTH:]).reshape(1, -1)
+    with plan.window(history) as x:
+        np.testing.assert_allclose(x.reshape(1, -1), expected, rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(plan.inverse(expected[0]), history[-LENGTH:, 0], rtol=1e-4, atol=1e-3)
+
+
+def test_inverse_allocates_only_its_result(history, scaler):
+    plan = PreprocessPlan(WindowShape(LENGTH), None, scaler)
+    scaled = scaler.transform(history[-LENGTH:]).reshape(-1).astype(np.float32)
+    restored = plan.inverse(scaled)
+    np.testing.assert_allclose(restored, history[-LENGTH:, 0], rtol=1e-4, atol=1e-3)
+    # One float32 result array; a float64 round trip would need several times that
+    assert peak_bytes(lambda: plan.inverse(scaled)) < 1.5 * restored.nbytes
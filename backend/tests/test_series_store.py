@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ml.series_store import SeriesStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SeriesStore(tmp_path, compact_interval=0)
+    yield store
+    store.close()
+
+
+def test_overlapping_append_stores_newer_rows_in_place(store):
+    store.append("meter", np.arange(10) * 1000, np.arange(10))
+    info = store.append("meter", np.arange(5, 15) * 1000, np.arange(105, 115))
+    assert info["length"] == 15 and info["pending"] == 5
+    window, last = store.window("meter", 3)
+    assert window.tolist() == [112, 113, 114] and last == 14000
+
+
+def test_later_pending_write_wins_at_compaction(store):
+    store.append("meter", np.arange(10) * 1000, np.arange(10))
+    store.append("meter", [3000], [33])
+    store.append("meter", [3000, 20000], [44, 20])
+    assert store.info("meter")["pending"] == 2
+    store.compact("meter")
+    window, _ = store.window("meter", 11)
+    assert window[3] == 44 and window[-1] == 20
+
+
+def test_metrics_count_series_without_listing(store):
+    assert store.metrics()["series"] == 0
+    store.append("a", [1000], [1.0])
+    store.append("b", [1000], [1.0])
+    assert store.metrics()["series"] == 2